@@ -0,0 +1,55 @@
+"""Bytes on the wire and end-to-end latency of a 10,000-record bulk_create
+over a simulated 20 Mbit/s uplink, without request compression and with
+gzip and zstd (when zstandard is installed). Only request bodies are
+counted, not headers.
+
+    python -m benchmarks.compression
+"""
+from leapcell import Leapcell
+from leapcell.compress import RequestCompression, zstandard
+from benchmarks.stub_server import StubServer
+import time
+
+RECORDS = 10000
+BANDWIDTH = 20 * 1000 * 1000 / 8
+
+
+def records():
+    return [
+        {
+            "name": "user {}".format(i),
+            "email": "user{}@example.com".format(i),
+            "age": i % 90,
+            "city": ["Berlin", "Paris", "Tokyo", "Lima"][i % 4],
+            "tags": ["customer", "newsletter"] if i % 3 else ["customer"],
+            "bio": "lorem ipsum dolor sit amet, consectetur adipiscing elit",
+        }
+        for i in range(RECORDS)
+    ]
+
+
+def run(server: StubServer, compression) -> None:
+    client = Leapcell("bench", base_url=server.url, compression=compression)
+    table = client.table("bench/repo", "tbl1")
+    data = records()
+    server.reset()
+    start = time.perf_counter()
+    table.bulk_create(data)
+    elapsed = time.perf_counter() - start
+    client.close()
+    print(
+        "{:<6} requests: {:>3}  on the wire: {:>8.1f}KB  latency: {:>8.1f}ms".format(
+            compression.algorithm if compression else "none",
+            server.requests,
+            server.bytes_received / 1024,
+            elapsed * 1000,
+        )
+    )
+
+
+if __name__ == "__main__":
+    with StubServer({"data": {"records": []}}, bandwidth=BANDWIDTH) as server:
+        run(server, None)
+        run(server, RequestCompression("gzip"))
+        if zstandard is not None:
+            run(server, RequestCompression("zstd"))
@@ -0,0 +1,36 @@
+"""Count TCP connections (handshakes) per 1,000 get_by_id calls, comparing a
+fresh pool per request (the old behaviour) with the shared client pool.
+
+    python -m benchmarks.connection_pool
+"""
+from leapcell import Leapcell
+from benchmarks.stub_server import StubServer
+import time
+
+REQUESTS = 1000
+
+
+def run(server: StubServer, shared: bool) -> None:
+    server.reset()
+    client = Leapcell("bench", base_url=server.url)
+    table = client.table("bench/repo", "tbl1")
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        if not shared:
+            table = Leapcell("bench", base_url=server.url).table("bench/repo", "tbl1")
+        table.get_by_id("rec{}".format(i))
+    elapsed = time.perf_counter() - start
+    client.close()
+    print(
+        "{:<22} handshakes/1000 req: {:>5}  total: {:.3f}s".format(
+            "shared pool" if shared else "pool per request",
+            server.connections * 1000 // server.requests,
+            elapsed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    with StubServer() as server:
+        run(server, shared=False)
+        run(server, shared=True)
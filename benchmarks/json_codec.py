@@ -0,0 +1,54 @@
+"""Encode/decode time of a 10,000-record query page for every installed json
+backend, the work HTTPClient does for bulk_create bodies and query responses.
+
+    python -m benchmarks.json_codec
+"""
+from leapcell.codec import available_codecs, get_codec
+import time
+
+RECORDS = 10000
+ROUNDS = 5
+
+
+def page():
+    return {
+        "data": [
+            {
+                "record_id": "rec{:08d}".format(i),
+                "fields": {
+                    "name": "user {}".format(i),
+                    "title": "Ünïcode title {}".format(i),
+                    "age": i % 90,
+                    "score": i * 0.25,
+                    "active": i % 2 == 0,
+                    "tags": ["a", "b", "c"],
+                    "created": 1700000000 + i,
+                },
+            }
+            for i in range(RECORDS)
+        ]
+    }
+
+
+def best(fn) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    data = page()
+    print("{} records per page, best of {}".format(RECORDS, ROUNDS))
+    for name in available_codecs():
+        codec = get_codec(name)
+        body = codec.dumps(data)
+        encode = best(lambda: codec.dumps(data))
+        decode = best(lambda: codec.loads(body))
+        print(
+            "{:<8} encode: {:>7.2f}ms  decode: {:>7.2f}ms  body: {:>8} bytes".format(
+                name, encode * 1000, decode * 1000, len(body)
+            )
+        )
@@ -0,0 +1,64 @@
+"""Bytes per record of 100,000 decoded records with 10 fields, comparing the
+slotted positional Record with the previous dict-based layout (instance
+__dict__, copied field dict and an empty dirty dict per record). Field values
+are shared by both and not counted.
+
+    python -m benchmarks.record_memory
+"""
+from typing import Any, Dict, Optional
+from leapcell.http_client import HTTPClient
+from leapcell.record import Record
+import tracemalloc
+
+RECORDS = 100000
+FIELDS = ["field_{}".format(i) for i in range(10)]
+
+
+class DictRecord(object):
+    def __init__(
+        self,
+        requester: Any,
+        record_id: Optional[str] = None,
+        fields: Optional[Dict[str, Any]] = None,
+        create_time: Optional[int] = None,
+        update_time: Optional[int] = None,
+    ) -> None:
+        self._data = {}
+        if fields is not None:
+            for field, item in fields.items():
+                self._data[field] = item
+            self._record_id = record_id
+        self._new_data: Dict[str, Any] = {}
+        self._requester = requester
+        self._create_time = create_time
+        self._update_time = update_time
+
+
+def measure(cls, requester: HTTPClient, raw) -> float:
+    tracemalloc.start()
+    records = [
+        cls(requester, r["record_id"], r["fields"], r["create_time"], r["update_time"])
+        for r in raw
+    ]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(records) == RECORDS
+    return current / RECORDS
+
+
+if __name__ == "__main__":
+    requester = HTTPClient("bench", "http://127.0.0.1", "bench/repo", "tbl1")
+    raw = [
+        {
+            "record_id": "rec{:08d}".format(i),
+            "fields": {name: i for name in FIELDS},
+            "create_time": 1700000000,
+            "update_time": 1700000000,
+        }
+        for i in range(RECORDS)
+    ]
+    before = measure(DictRecord, requester, raw)
+    after = measure(Record, requester, raw)
+    print("{} records, {} fields".format(RECORDS, len(FIELDS)))
+    print("dict-based record: {:>6.0f} bytes/record".format(before))
+    print("slotted record:    {:>6.0f} bytes/record".format(after))
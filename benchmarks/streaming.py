@@ -0,0 +1,67 @@
+"""Time to first record, total time and peak python heap of one 5,000-record
+query page, comparing query() (read, parse, then build every Record) with
+stream() (records decoded while the response is read). Timings include the
+tracemalloc overhead.
+
+    python -m benchmarks.streaming
+"""
+from leapcell import Leapcell
+from benchmarks.stub_server import StubServer
+import time
+import tracemalloc
+
+RECORDS = 5000
+
+
+def payload():
+    return {
+        "data": {
+            "records": [
+                {
+                    "record_id": "rec{:08d}".format(i),
+                    "fields": {
+                        "name": "user {}".format(i),
+                        "bio": "lorem ipsum dolor sit amet " * 8,
+                        "age": i % 90,
+                        "tags": ["a", "b", "c"],
+                    },
+                    "create_time": 1700000000 + i,
+                    "update_time": 1700000000 + i,
+                }
+                for i in range(RECORDS)
+            ]
+        }
+    }
+
+
+def run(server: StubServer, streaming: bool) -> None:
+    client = Leapcell("bench", base_url=server.url)
+    table = client.table("bench/repo", "tbl1")
+    query = table.select()
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in query.stream() if streaming else query.query():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    client.close()
+    print(
+        "{:<8} records: {}  first record: {:>7.2f}ms  total: {:>7.2f}ms  peak heap: {:>6.1f}MB".format(
+            "stream" if streaming else "query",
+            count,
+            first * 1000,
+            elapsed * 1000,
+            peak / 1024 / 1024,
+        )
+    )
+
+
+if __name__ == "__main__":
+    with StubServer(payload()) as server:
+        run(server, streaming=False)
+        run(server, streaming=True)
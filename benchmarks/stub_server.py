@@ -0,0 +1,102 @@
+"""Minimal local HTTP server answering every Leapcell endpoint with a canned
+response, used by the benchmarks to measure client-side behaviour offline."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+import threading
+import time
+import json
+
+
+class StubServer(object):
+    """`bandwidth` (bytes per second) simulates a slow uplink shared by all
+    connections, request bodies are read no faster than that"""
+
+    def __init__(
+        self, payload: Optional[Dict[str, Any]] = None, bandwidth: Optional[float] = None
+    ) -> None:
+        self._payload = json.dumps(payload or {"data": {"record": None}}).encode()
+        self._lock = threading.Lock()
+        self._bandwidth = bandwidth
+        self._link_free = 0.0
+        self.connections = 0
+        self.requests = 0
+        self.bytes_received = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _read(self, length: int) -> None:
+                # drained in chunks, so upload bodies do not count in the client heap
+                while length > 0:
+                    n = len(self.rfile.read(min(length, 64 * 1024)))
+                    if not n:
+                        return
+                    length -= n
+                    server._transfer(n)
+
+            def _reply(self) -> None:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    while True:
+                        line = self.rfile.readline()
+                        server._transfer(len(line))
+                        size = int(line.split(b";")[0], 16)
+                        self._read(size + 2)
+                        if size == 0:
+                            break
+                else:
+                    self._read(int(self.headers.get("Content-Length") or 0))
+                with server._lock:
+                    server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(server._payload)))
+                self.end_headers()
+                self.wfile.write(server._payload)
+
+            do_GET = _reply
+            do_POST = _reply
+            do_PUT = _reply
+            do_DELETE = _reply
+
+            def log_message(self, *args) -> None:
+                return
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def _transfer(self, n: int) -> None:
+        with self._lock:
+            self.bytes_received += n
+            if self._bandwidth is None:
+                return
+            now = time.monotonic()
+            self._link_free = max(now, self._link_free) + n / self._bandwidth
+            delay = self._link_free - now
+        time.sleep(delay)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self.bytes_received = 0
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
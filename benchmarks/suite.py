@@ -0,0 +1,305 @@
+"""Throughput and p50/p99 latency of the client hot path against the mock
+server (leapcell.mock) running in a child process, so that every CPU second
+measured here is spent by the client:
+
+- create, bulk_create of 10, 100 and 1,000 records
+- get_by_id, a filtered and ordered query page of 100 records, count, search
+- upload_file of 4KB
+
+Every scenario runs at each concurrency level with that many threads
+sharing one client. Three passes are made:
+
+1. timed: throughput, latency percentiles and client CPU per request
+2. split: client CPU per request spent in JSON encoding and decoding,
+   Record construction and filter building (leapcell.profile),
+   single-threaded
+3. memory: peak python heap (tracemalloc) of the scenario, single-threaded
+
+Results are printed and written as JSON, with the client version, Python
+version and JSON codec, so runs of different releases can be compared.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --concurrency 1 16 256 --requests 1000 --output results.json
+    python -m benchmarks.suite --scenarios get_by_id query --latency 0.005
+"""
+from leapcell import Leapcell
+from leapcell.codec import get_codec
+from leapcell.mock import MockLeapcell
+from leapcell.profile import ClientProfiler
+from leapcell.version import VERSION
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+RESOURCE = "bench/repo"
+READ_TABLE = "reads"
+WRITE_TABLE = "writes"
+FIELDS = {"title": "STR", "body": "LONG_TEXT", "views": "INT_NUMBER", "tags": "LABELS"}
+SEED_RECORDS = 10000
+PAGE_SIZE = 100
+UPLOAD_SIZE = 4 * 1024
+CONCURRENCY = (1, 4, 16, 64, 256)
+REQUESTS = 500
+# single-threaded operations of the split and memory passes
+PROFILE_REQUESTS = 100
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo")
+
+
+def record(i: int) -> Dict[str, Any]:
+    return {
+        "title": "post {} {}".format(i, WORDS[i % len(WORDS)]),
+        "body": "lorem ipsum dolor sit amet, consectetur adipiscing elit " * 4,
+        "views": i % 1000,
+        "tags": ["news", "tech"] if i % 2 else ["news"],
+    }
+
+
+def serve(conn: Any, latency: float) -> None:
+    """child process: seed the mock server, send its url and serve until told to stop"""
+    with MockLeapcell(latency=latency) as server:
+        server.add_table(RESOURCE, READ_TABLE, FIELDS, (record(i) for i in range(SEED_RECORDS)))
+        server.add_table(RESOURCE, WRITE_TABLE, FIELDS)
+        conn.send(server.url)
+        conn.recv()
+
+
+class Context(object):
+    """tables and data shared by the operations of a scenario"""
+
+    def __init__(self, client: Leapcell) -> None:
+        self.reads = client.table(RESOURCE, READ_TABLE)
+        self.writes = client.table(RESOURCE, WRITE_TABLE)
+        # field metas are loaded once, before anything is measured
+        self.reads.meta()
+        self.writes.meta()
+        self.ids = [r.id for r in self.reads.select().limit(SEED_RECORDS).query()]
+        self.upload = bytes(range(256)) * (UPLOAD_SIZE // 256)
+
+
+Operation = Callable[[Context, int], Any]
+
+
+def _query(ctx: Context, i: int) -> Any:
+    table = ctx.reads
+    return (
+        table.select()
+        .where((table["views"] >= i % 500) & (table["tags"].contain("news")))
+        .order_by(table["views"].asc())
+        .offset(i % 10 * PAGE_SIZE)
+        .limit(PAGE_SIZE)
+        .query()
+    )
+
+
+def _bulk_create(size: int) -> Operation:
+    def run(ctx: Context, i: int) -> Any:
+        return ctx.writes.bulk_create([record(i * size + j) for j in range(size)])
+
+    return run
+
+
+# name -> (operation, requests per REQUESTS), large batches run fewer requests
+SCENARIOS: Dict[str, Tuple[Operation, float]] = {
+    "create": (lambda ctx, i: ctx.writes.create(record(i)), 1),
+    "bulk_create_10": (_bulk_create(10), 1),
+    "bulk_create_100": (_bulk_create(100), 0.2),
+    "bulk_create_1000": (_bulk_create(1000), 0.05),
+    "get_by_id": (lambda ctx, i: ctx.reads.get_by_id(ctx.ids[i % len(ctx.ids)]), 1),
+    "query": (_query, 1),
+    "count": (lambda ctx, i: ctx.reads.select().where(ctx.reads["views"] > i % 1000).count(), 1),
+    "search": (lambda ctx, i: ctx.reads.search(WORDS[i % len(WORDS)], search_fields=["title"], limit=20), 1),
+    "upload_file": (lambda ctx, i: ctx.reads.upload_file(ctx.upload, "file{}.bin".format(i)), 1),
+}
+
+
+def percentile(values: List[float], p: float) -> float:
+    """nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def run_timed(ctx: Context, op: Operation, requests: int, concurrency: int) -> Dict[str, Any]:
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker() -> None:
+        own = []
+        while True:
+            i = next(counter)
+            if i >= requests:
+                break
+            start = time.perf_counter()
+            try:
+                op(ctx, i)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors[0],
+        "seconds": round(elapsed, 4),
+        "throughput": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+    }
+
+
+# profiler phases reported by the split pass
+SPLIT_PARTS = {
+    "json": ("json_encode", "json_decode", "request_key"),
+    "record": ("record_init",),
+    "filter": ("build_filter", "get_filter", "gen_order"),
+}
+
+
+def run_split(url: str, op: Operation, requests: int) -> Dict[str, Any]:
+    client = Leapcell("bench", base_url=url, coalesce_reads=False)
+    ctx = Context(client)
+    profiler = ClientProfiler(clock="cpu")
+    try:
+        with profiler:
+            # process time, bulk_create encodes and sends on worker threads
+            cpu = time.process_time_ns()
+            for i in range(requests):
+                op(ctx, i)
+            cpu = time.process_time_ns() - cpu
+    finally:
+        client.close()
+    ns = dict.fromkeys(SPLIT_PARTS, 0.0)
+    for row in profiler.snapshot().values():
+        for part, phases in SPLIT_PARTS.items():
+            ns[part] += sum(row["phases"][p]["total_ms"] * 1e6 for p in phases if p in row["phases"])
+    out = {
+        "{}_us_per_request".format(part): round(ns[part] / requests / 1000, 1)
+        for part in SPLIT_PARTS
+    }
+    out["other_us_per_request"] = round((cpu - sum(ns.values())) / requests / 1000, 1)
+    out["total_us_per_request"] = round(cpu / requests / 1000, 1)
+    return out
+
+
+def run_memory(ctx: Context, op: Operation, requests: int) -> Dict[str, Any]:
+    tracemalloc.start()
+    try:
+        for i in range(requests):
+            op(ctx, i)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_heap_kb": round(peak / 1024, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="client hot path benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=list(CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per scenario and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the server adds to every request")
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    mp = multiprocessing.get_context("spawn")
+    conn, child_conn = mp.Pipe()
+    server = mp.Process(target=serve, args=(child_conn, args.latency), daemon=True)
+    server.start()
+    url = conn.recv()
+    try:
+        client = Leapcell(
+            "bench",
+            base_url=url,
+            pool_maxsize=max(args.concurrency),
+            pool_block=True,
+            coalesce_reads=False,
+        )
+        ctx = Context(client)
+        results = []
+        for name in args.scenarios:
+            op, share = SCENARIOS[name]
+            timed = []
+            for concurrency in args.concurrency:
+                requests = max(concurrency, int(args.requests * share))
+                row = run_timed(ctx, op, requests, concurrency)
+                timed.append(row)
+                print(
+                    "{:<17} c={:<4} {:>9.1f} req/s  p50 {:>8.2f}ms  p99 {:>8.2f}ms  cpu {:>8.1f}us/req{}".format(
+                        name,
+                        concurrency,
+                        row["throughput"],
+                        row["p50_ms"],
+                        row["p99_ms"],
+                        row["cpu_us_per_request"],
+                        "  errors {}".format(row["errors"]) if row["errors"] else "",
+                    )
+                )
+            requests = max(1, int(PROFILE_REQUESTS * share))
+            split = run_split(url, op, requests)
+            memory = run_memory(ctx, op, requests)
+            print(
+                "{:<17} cpu split us/req: json {} record {} filter {} other {}  peak heap {}KB".format(
+                    name,
+                    split["json_us_per_request"],
+                    split["record_us_per_request"],
+                    split["filter_us_per_request"],
+                    split["other_us_per_request"],
+                    memory["peak_heap_kb"],
+                )
+            )
+            results.append({"scenario": name, "timed": timed, "cpu_split": split, "memory": memory})
+        client.close()
+    finally:
+        conn.send("stop")
+        server.join(10)
+
+    report = {
+        "leapcell_version": VERSION,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "json_codec": get_codec().name,
+        "timestamp": int(time.time()),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "server_latency": args.latency,
+            "seed_records": SEED_RECORDS,
+        },
+        # kilobytes on linux, bytes on macos
+        "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("results written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Throughput and peak python heap of uploading files from disk, comparing
+reading them into bytes for upload_files() (ten per request) with
+upload_many() streaming them from their paths, for growing batch sizes.
+Throughput is timed without tracemalloc, the peak heap in a second pass.
+
+    python -m benchmarks.upload
+"""
+from leapcell import Leapcell
+from benchmarks.stub_server import StubServer
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+FILE_SIZE = 2 * 1024 * 1024
+BATCH_SIZES = (10, 40, 160)
+
+
+def upload(table, paths, streaming: bool) -> None:
+    if streaming:
+        table.upload_many(paths, concurrency=4)
+        return
+    for i in range(0, len(paths), 10):
+        files = []
+        for path in paths[i : i + 10]:
+            with open(path, "rb") as f:
+                files.append(f.read())
+        table.upload_files(files)
+
+
+def run(server: StubServer, paths, streaming: bool) -> None:
+    client = Leapcell("bench", base_url=server.url)
+    table = client.table("bench/repo", "tbl1")
+    start = time.perf_counter()
+    upload(table, paths, streaming)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    upload(table, paths, streaming)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    client.close()
+    print(
+        "{:<12} files: {:>4}  throughput: {:>7.1f}MB/s  peak heap: {:>6.1f}MB".format(
+            "upload_many" if streaming else "upload_files",
+            len(paths),
+            len(paths) * FILE_SIZE / elapsed / 1024 / 1024,
+            peak / 1024 / 1024,
+        )
+    )
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(max(BATCH_SIZES)):
+            path = os.path.join(directory, "file{:04d}.bin".format(i))
+            with open(path, "wb") as f:
+                f.write(os.urandom(FILE_SIZE))
+            paths.append(path)
+        with StubServer({"data": {"file": {}, "files": []}}) as server:
+            for size in BATCH_SIZES:
+                run(server, paths[:size], streaming=False)
+                run(server, paths[:size], streaming=True)
+    finally:
+        shutil.rmtree(directory)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 from leapcell.core import Leapcell
+from leapcell.aio import AsyncLeapcell
 from leapcell.version import VERSION
 
 __version__ = VERSION
-__all__ = ["Leapcell", "VERSION"]
\ No newline at end of file
+__all__ = ["Leapcell", "AsyncLeapcell", "VERSION"]
\ No newline at end of file
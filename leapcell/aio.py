@@ -0,0 +1,937 @@
+from typing import Dict, Any, Union, List, Optional, Tuple, AsyncIterator, Iterable
+import asyncio
+import os
+from leapcell.exp import LeapcellException, LeapcellRequestError
+from leapcell.http_client import (
+    HTTPClient,
+    TIMEOUT_SECS,
+    FILE_UPLOAD_MAX_SIZE,
+    DEFAULT_POOL_MAXSIZE,
+)
+from leapcell.const import TableFieldType, RECORD_ID_FIELD
+from leapcell.table_meta import TableMeta
+from leapcell.field_meta import FieldMeta
+from leapcell.record import Record
+from leapcell.schema import Schema
+from leapcell.columnar import ColumnBatch, field_types
+from leapcell.file import LeapcellFile
+from leapcell.upload import UploadSource, Progress
+from leapcell.retry import RetryPolicy
+from leapcell.throttle import TokenBucket
+from leapcell.codec import JSONCodec, get_codec, encode_body
+from leapcell.compress import RequestCompression, get_compression
+from leapcell.cache import (
+    TTLCache,
+    LRUCache,
+    META_CACHE_TTL_SECS,
+    RECORD_CACHE_MAX_ENTRIES,
+    RECORD_CACHE_MAX_BYTES,
+    RECORD_CACHE_TTL_SECS,
+)
+from leapcell.bulk import (
+    BatchResult,
+    run_batches_async,
+    flatten_batches,
+    batch_retryable,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_BYTES,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BATCH_RETRIES,
+)
+from leapcell.table import (
+    KaithQuery,
+    LeapcellField,
+    LeapcellFilter,
+    create_params,
+    bulk_params,
+    GET_MANY_CHUNK_SIZE,
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None  # type: ignore
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+class AsyncTransport(object):
+    """AsyncTransport owns the aiohttp session, connection pool and concurrency
+    limit shared by all tables of one AsyncLeapcell client."""
+
+    def __init__(
+        self,
+        pool_maxsize: int = DEFAULT_MAX_CONCURRENCY,
+        pool_maxsize_per_host: int = DEFAULT_POOL_MAXSIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        keep_alive: bool = True,
+        coalesce_reads: bool = True,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp is required for the async client, install it with `pip install leapcell[async]`"
+            )
+        self._pool_maxsize = pool_maxsize
+        self._pool_maxsize_per_host = pool_maxsize_per_host
+        self._max_concurrency = max_concurrency
+        self._keep_alive = keep_alive
+        self.coalesce_reads = coalesce_reads
+        self.in_flight: Dict[str, "asyncio.Future[Any]"] = {}
+        # writes finished, part of the key of coalesced reads
+        self.writes = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # the session and semaphore must be created inside the running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_maxsize,
+                limit_per_host=self._pool_maxsize_per_host,
+                force_close=not self._keep_alive,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=TIMEOUT_SECS),
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Optional[bytes | str] = None,
+        form: Optional["aiohttp.FormData"] = None,
+    ) -> Tuple[int, Any, bytes]:
+        session = self._get_session()
+        assert self._semaphore is not None
+        async with self._semaphore:
+            async with session.request(
+                method,
+                url,
+                headers=headers,
+                data=form if form is not None else body,
+            ) as response:
+                return response.status, response.headers, await response.read()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class AsyncHTTPClient(HTTPClient):
+    """AsyncHTTPClient exposes the same endpoints as HTTPClient, every endpoint
+    method returns an awaitable."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        resource: str,
+        table_id: str,
+        transport: AsyncTransport,
+        version="v1",
+        name_type="id",
+        meta_cache: Optional[TTLCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+    ) -> None:
+        self._transport = transport
+        super().__init__(
+            api_key=api_key,
+            base_url=base_url,
+            resource=resource,
+            table_id=table_id,
+            version=version,
+            name_type=name_type,
+            meta_cache=meta_cache,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            codec=codec,
+            compression=compression,
+        )
+
+    def _new_pool(self) -> Any:
+        return None
+
+    async def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:  # type: ignore[override]
+        if self._record_cache is None:
+            return await self._get_record(record_id)
+        data = self._record_cache.get(record_id)
+        if data is None:
+            # an update that finishes while the record is fetched makes it stale
+            generation = self._record_cache.generation
+            data = await self._get_record(record_id, generation)
+            if data:
+                self._record_cache.set(
+                    record_id, data, len(self._codec.dumps(data)), generation
+                )
+        return data
+
+    # the cache is invalidated around the awaited request, not around the
+    # creation of its coroutine as the inherited methods would
+
+    async def update_records(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:  # type: ignore[override]
+        data["name_type"] = self._name_type
+        # a filter may match any cached record
+        self._invalidate_record()
+        resp = await self._request(
+            url_path="{}/record".format(self._url_prefix),
+            method="PUT",
+            data=data,
+        )
+        self._invalidate_record()
+        return resp
+
+    async def update_record(  # type: ignore[override]
+        self, record_id: str, data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        data["name_type"] = self._name_type
+        self._invalidate_record(record_id)
+        resp = await self._request(
+            url_path="{}/record/{}".format(self._url_prefix, record_id),
+            method="PUT",
+            data=data,
+        )
+        self._invalidate_record(record_id)
+        return resp
+
+    async def delete_records(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:  # type: ignore[override]
+        data["name_type"] = self._name_type
+        self._invalidate_record()
+        resp = await self._request(
+            url_path="{}/record".format(self._url_prefix),
+            method="DELETE",
+            data=data,
+        )
+        self._invalidate_record()
+        return resp
+
+    async def delete_record(self, record_id) -> Optional[Dict[str, Any]]:  # type: ignore[override]
+        self._invalidate_record(record_id)
+        resp = await self._request(
+            url_path="{}/record/{}".format(self._url_prefix, record_id),
+            method="DELETE",
+        )
+        self._invalidate_record(record_id)
+        return resp
+
+    async def table_meta(self) -> Any:  # type: ignore[override]
+        if self._meta_cache is None:
+            return await self._table_meta()
+        key = self._meta_cache_key()
+        data = self._meta_cache.get(key)
+        if data is None:
+            data = await self._table_meta()
+            self._meta_cache.set(key, data)
+        return data
+
+    def close(self) -> None:
+        return
+
+    async def _request(  # type: ignore[override]
+        self,
+        url_path: str,
+        method: str,
+        data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        files: Optional[List[Tuple[str, UploadSource]]] = None,
+        read_only: bool = False,
+        generation: Optional[int] = None,
+    ) -> Any:
+        url = self._build_url(url_path, params)
+        transport = self._transport
+        if not transport.coalesce_reads:
+            return await self._send(method, url, data, files, read_only)
+        if not read_only:
+            try:
+                return await self._send(method, url, data, files, read_only)
+            finally:
+                # reads from now on see the write, failed or not
+                transport.writes += 1
+
+        # identical reads in flight share one network call and one parsed result,
+        # only with reads started after the same writes, and reads for the
+        # record cache only with reads of the same cache generation
+        key = "{} @{}".format(self._request_key(method, url, data), transport.writes)
+        if generation is not None:
+            key = "{} #{}".format(key, generation)
+        in_flight = transport.in_flight
+        future = in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._send(method, url, data, files, read_only)
+            )
+            in_flight[key] = future
+            future.add_done_callback(lambda _: in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _send(  # type: ignore[override]
+        self,
+        method: str,
+        url: str,
+        data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
+        files: Optional[List[Tuple[str, UploadSource]]] = None,
+        read_only: bool = False,
+    ) -> Any:
+        body = None
+        headers = self._build_header()
+        if data is not None:
+            body = encode_body(self._codec, data)
+            headers["Content-Type"] = "application/json"
+            if self._compression is not None and self._compression.applies(body):
+                # compressed once, aiohttp can not send a stream again on retry
+                headers["Content-Encoding"] = self._compression.encoding
+                body = self._compression.compress_bytes(body)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._rate_limiter is not None:
+                wait = self._rate_limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            try:
+                status, response_headers, content = await self._transport.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    body=body,
+                    # a FormData can only be sent once, build it for every attempt
+                    form=self._build_form(files),
+                )
+            except asyncio.TimeoutError as e:
+                raise LeapcellRequestError("timeout error, error: {}".format(e))
+            except aiohttp.ClientConnectorError as e:
+                # the connection could not be opened, nothing was sent
+                raise LeapcellRequestError(
+                    "connection error, error: {}".format(e), sent=False
+                )
+            except aiohttp.ClientConnectionError as e:
+                raise LeapcellRequestError("connection error, error: {}".format(e))
+            except aiohttp.ClientError as e:
+                raise LeapcellRequestError("http error, http error: {}".format(e))
+            except Exception as e:
+                raise LeapcellException("unknown error, error: {}".format(e))
+
+            policy = self._retry_policy
+            if policy is not None and policy.should_retry(
+                method, status, attempt, read_only
+            ):
+                await asyncio.sleep(
+                    policy.backoff(attempt, response_headers.get("Retry-After"))
+                )
+                continue
+            return self._parse_response(status, content)
+
+    @staticmethod
+    def _build_form(
+        files: Optional[List[Tuple[str, UploadSource]]]
+    ) -> Optional["aiohttp.FormData"]:
+        if not files:
+            return None
+        form = aiohttp.FormData()
+        for field, source in files:
+            # memoryviews are sent without a copy, paths are read by aiohttp as a file
+            value: Any = source.view
+            if value is None:
+                value = open(source.path, "rb")  # type: ignore[arg-type]
+            form.add_field(
+                field, value, filename=source.filename, content_type=source.content_type
+            )
+        return form
+
+    async def _upload(  # type: ignore[override]
+        self, source: UploadSource, progress: Optional[Progress] = None
+    ) -> LeapcellFile:
+        if source.size > FILE_UPLOAD_MAX_SIZE:
+            raise LeapcellException("file is too large, file should be less than 5KB")
+        response = await self._request(
+            url_path="{}/{}".format(self._url_prefix, "upload"),
+            method="POST",
+            files=[("file", source)],
+        )
+        return LeapcellFile(response.get("file", {}))
+
+    async def _upload_multi(self, sources: List[UploadSource]) -> List[LeapcellFile]:  # type: ignore[override]
+        for source in sources:
+            if source.size > FILE_UPLOAD_MAX_SIZE:
+                raise LeapcellException(
+                    "file is too large, file should be less than 5KB"
+                )
+        response = await self._request(
+            url_path="{}/{}".format(self._url_prefix, "upload_multi"),
+            method="POST",
+            files=[("files", source) for source in sources],
+        )
+        return [LeapcellFile(item) for item in response.get("files", [])]
+
+
+class AsyncRecord(Record):
+    """Leapcell Record returned by the async client, save and delete are coroutines"""
+
+    __slots__ = ()
+
+    async def save(self) -> None:  # type: ignore[override]
+        update_values = dict()
+        for field_name, value in self.updated().items():
+            update_values[field_name] = value
+
+        if not self._record_id:
+            return
+
+        await self._requester.update_record(
+            record_id=self._record_id,
+            data={
+                "fields": update_values,
+            },
+        )
+        return
+
+    async def delete(self) -> None:  # type: ignore[override]
+        await self._requester.delete_record(
+            record_id=self._record_id,
+        )
+        return
+
+
+def _new_record(requester: AsyncHTTPClient, record: Dict[str, Any]) -> AsyncRecord:
+    return AsyncRecord(
+        requester=requester,
+        record_id=record["record_id"],
+        fields=record["fields"],
+        create_time=record.get("create_time", None),
+        update_time=record.get("update_time", None),
+    )
+
+
+class AsyncKaithQuery(KaithQuery):
+    """Leapcell async Query class, builds the same requests as KaithQuery"""
+
+    async def search(  # type: ignore[override]
+        self,
+        query: str,
+        search_fields: List[str] = [],
+        boost_fields: Dict[str, int] = {},
+    ) -> List[AsyncRecord]:
+        resp = await self._requester.search(
+            self._search_params(query, search_fields, boost_fields)
+        )
+        if not resp or not resp["records"]:
+            return []
+        return [_new_record(self._requester, record) for record in resp["records"]]
+
+    async def query(self) -> List[AsyncRecord]:  # type: ignore[override]
+        resp = await self._requester.get_records(self._query_params())
+        if resp["records"] is None:
+            return []
+        return [_new_record(self._requester, record) for record in resp["records"]]
+
+    async def stream(self) -> AsyncIterator[AsyncRecord]:  # type: ignore[override]
+        """execute query and yield its records, the async client reads the
+        response as a whole before the first record is yielded
+
+        Returns:
+            AsyncIterator[AsyncRecord]: Record iterator
+        """
+        for record in await self.query():
+            yield record
+
+    async def search_stream(  # type: ignore[override]
+        self,
+        query: str,
+        search_fields: List[str] = [],
+        boost_fields: Dict[str, int] = {},
+    ) -> AsyncIterator[AsyncRecord]:
+        """search records by keyword and yield them, see stream"""
+        for record in await self.search(query, search_fields, boost_fields):
+            yield record
+
+    async def iter(  # type: ignore[override]
+        self,
+        page_size: int = 100,
+        prefetch: bool = True,
+        keyset: Optional[str] = None,
+    ) -> AsyncIterator[AsyncRecord]:
+        pages = self._iter_pages(page_size, prefetch, keyset)
+        try:
+            async for records in pages:
+                for record in records:
+                    yield _new_record(self._requester, record)
+        finally:
+            await pages.aclose()
+
+    async def query_columns(self) -> ColumnBatch:  # type: ignore[override]
+        batch = ColumnBatch(await self._field_types())
+        resp = await self._requester.get_records(self._query_params())
+        batch.extend(resp["records"] or [])
+        return batch
+
+    async def iter_column_batches(  # type: ignore[override]
+        self,
+        batch_size: int = 1000,
+        prefetch: bool = True,
+        keyset: Optional[str] = None,
+    ) -> AsyncIterator[ColumnBatch]:
+        types = await self._field_types()
+        pages = self._iter_pages(batch_size, prefetch, keyset)
+        try:
+            async for records in pages:
+                batch = ColumnBatch(types)
+                batch.extend(records)
+                yield batch
+        finally:
+            await pages.aclose()
+
+    async def _field_types(self) -> Dict[str, Optional[str]]:  # type: ignore[override]
+        return field_types(
+            await self._requester.table_meta(), self._requester.name_type, self.fields
+        )
+
+    async def _iter_pages(  # type: ignore[override]
+        self,
+        page_size: int,
+        prefetch: bool,
+        keyset: Optional[str],
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        if page_size <= 0:
+            raise ValueError("page_size must be positive")
+        offset = self._offset
+        resp = await self._page_query(page_size, offset, None)._query()
+        next_resp: Any = None
+        try:
+            while True:
+                records = (resp or {}).get("records") or []
+                next_resp = None
+                if len(records) == page_size:
+                    offset += page_size
+                    after = self._keyset_value(records[-1], keyset)
+                    next_resp = self._page_query(page_size, offset, after, keyset)._query()
+                    if prefetch:
+                        next_resp = asyncio.ensure_future(next_resp)
+                if records:
+                    yield records
+                if next_resp is None:
+                    return
+                resp = await next_resp
+        finally:
+            if asyncio.isfuture(next_resp):
+                next_resp.cancel()
+            elif asyncio.iscoroutine(next_resp):
+                next_resp.close()
+
+    async def first(self) -> Optional[AsyncRecord]:  # type: ignore[override]
+        self._limit = 1
+        resp = await self._requester.get_records(self._query_params())
+        if not resp["records"]:
+            return None
+        return _new_record(self._requester, resp["records"][0])
+
+    async def update(self, values: Dict[str, Any]) -> Optional[int]:  # type: ignore[override]
+        resp = await self._requester.update_records(self._update_params(values))
+        if not resp:
+            return None
+        return resp["affect_count"]
+
+    async def delete(self) -> Optional[int]:  # type: ignore[override]
+        resp = await self._requester.delete_records(self._delete_params())
+        if not resp:
+            return None
+        return resp["affect_count"]
+
+    async def count(self, distinct: Optional[bool] = None) -> Optional[int]:  # type: ignore[override]
+        resp = await self._requester.aggr_record(self._count_params(distinct))
+        if not resp or not resp["metric"]:
+            return None
+        return resp["metric"]["value"]
+
+
+class AsyncLeapcellTable(object):
+    """Leapcell async table instance, every method mirrors LeapcellTable and must be awaited"""
+
+    def __init__(
+        self,
+        repository: str,
+        api_key: str,
+        table_id: str,
+        base_url: str,
+        transport: AsyncTransport,
+        name_type: str = "name",
+        version: str = "v1",
+        meta_cache: Optional[TTLCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+    ) -> None:
+        if name_type == "name":
+            self._field_name_type = TableFieldType.NAME
+        else:
+            self._field_name_type = TableFieldType.ID
+        self._resource = repository
+        self._requster = AsyncHTTPClient(
+            api_key=api_key,
+            base_url=base_url,
+            resource=repository,
+            table_id=table_id,
+            transport=transport,
+            version=version,
+            name_type=name_type,
+            meta_cache=meta_cache,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            codec=codec,
+            compression=compression,
+        )
+        self._table_id = table_id
+
+    def __repr__(self) -> str:
+        return "async table instance <table: {}, resource: {}>".format(
+            self._table_id, self._resource
+        )
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+    async def meta(self) -> TableMeta:
+        data = await self._requster.table_meta()
+        field_metas = {
+            field_id: FieldMeta(field_info)
+            for field_id, field_info in data["fields"].items()
+        }
+        return TableMeta(
+            table_id=self._table_id,
+            requster=self._requster,
+            resource=self._resource,
+            field_metas=field_metas,
+            field_name_type=self._field_name_type,
+        )
+
+    async def refresh_meta(self) -> TableMeta:
+        self._requster.invalidate_table_meta()
+        return await self.meta()
+
+    async def schema(self, allow_unknown: bool = False) -> Schema:
+        return Schema.from_meta(await self.meta(), allow_unknown=allow_unknown)
+
+    async def create(
+        self, record: Dict[str, Any], on_conflict: List[str] | str | None = None
+    ) -> AsyncRecord:
+        data = await self._requster.create_record(
+            create_params(record, on_conflict, action="create_if_not_exists"),
+        )
+        return _new_record(self._requster, data["record"])
+
+    async def upsert(
+        self, record: Dict[str, Any], on_conflict: List[str] | str | None = None
+    ) -> AsyncRecord:
+        data = await self._requster.create_record(
+            create_params(record, on_conflict, action="upsert"),
+        )
+        return _new_record(self._requster, data["record"])
+
+    async def bulk_create(
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
+    ) -> Optional[List[AsyncRecord]]:
+        results = await self.bulk_create_batches(
+            records,
+            on_conflict=on_conflict,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            validate=validate,
+        )
+        new_records = flatten_batches(results)
+        if not new_records:
+            return None
+        return new_records
+
+    async def bulk_upsert(
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
+    ) -> Optional[List[AsyncRecord]]:
+        return await self.bulk_create(
+            records,
+            on_conflict=on_conflict,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            validate=validate,
+        )
+
+    async def bulk_create_batches(
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
+    ) -> List[BatchResult]:
+        if validate:
+            # batch by batch, the input is never loaded whole
+            records = (await self.schema()).coerce_iter(records, batch_size)
+
+        async def send(batch: List[Dict[str, Any]]) -> List[AsyncRecord]:
+            data = await self._requster.create_records(bulk_params(batch, on_conflict))
+            if not data or not data["records"]:
+                return []
+            return [_new_record(self._requster, record) for record in data["records"]]
+
+        return await run_batches_async(
+            send,
+            records,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            # with on_conflict a batch sent twice creates its records once
+            retryable=lambda e: batch_retryable(
+                e, bool(on_conflict), self._requster._retry_policy
+            ),
+            codec=self._requster.codec,
+        )
+
+    def enable_record_cache(
+        self,
+        max_entries: int = RECORD_CACHE_MAX_ENTRIES,
+        max_bytes: int = RECORD_CACHE_MAX_BYTES,
+        ttl: float = RECORD_CACHE_TTL_SECS,
+    ) -> None:
+        self._requster.set_record_cache(LRUCache(max_entries, max_bytes, ttl))
+
+    def disable_record_cache(self) -> None:
+        self._requster.set_record_cache(None)
+
+    def record_cache_stats(self) -> Dict[str, int]:
+        cache = self._requster._record_cache
+        if cache is None:
+            return {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "bytes": 0}
+        return cache.stats()
+
+    async def get_by_id(self, id: str) -> Optional[AsyncRecord]:
+        data = await self._requster.get_record(record_id=id)
+        if not data or not data["record"]:
+            return None
+        return _new_record(self._requster, data["record"])
+
+    async def get_many(
+        self,
+        ids: List[str],
+        chunk_size: int = GET_MANY_CHUNK_SIZE,
+    ) -> List[Optional[AsyncRecord]]:
+        unique_ids = list(dict.fromkeys(ids))
+        chunks = [
+            unique_ids[i : i + chunk_size] for i in range(0, len(unique_ids), chunk_size)
+        ]
+        found: Dict[str, Dict[str, Any]] = {}
+        for resp in await asyncio.gather(
+            *[
+                KaithQuery(
+                    self._requster,
+                    filter=LeapcellField(RECORD_ID_FIELD).in_(chunk),
+                    orders=[],
+                    limit=len(chunk),
+                )._query()
+                for chunk in chunks
+            ]
+        ):
+            for record in (resp or {}).get("records") or []:
+                found[record["record_id"]] = record
+        return [_new_record(self._requster, found[id]) if id in found else None for id in ids]
+
+    async def get(
+        self,
+        conditions: Dict[str, Any],
+        orders: List[Tuple[str, str]] = [],
+    ) -> Optional[AsyncRecord]:
+        query = AsyncKaithQuery(self._requster, fields=[], orders=orders, limit=1)
+        query._filter = query._condition2filter(conditions)
+        result = await query.query()
+        return result[0] if len(result) > 0 else None
+
+    def select(self, fields: List[str] = []) -> AsyncKaithQuery:
+        return AsyncKaithQuery(self._requster, fields=fields, orders=[])
+
+    async def delete(self, conditions: Dict[str, Any]) -> Optional[int]:
+        filter = KaithQuery(self._requster)._condition2filter(conditions)
+        return await AsyncKaithQuery(self._requster, filter=filter).delete()
+
+    async def delete_by_id(self, id: str) -> bool:
+        await self._requster.delete_record(record_id=id)
+        return True
+
+    async def count(
+        self,
+        conditions: Optional[Dict[str, Any] | LeapcellFilter] = None,
+    ) -> Optional[int]:
+        filter = KaithQuery(self._requster)._condition2filter(conditions)
+        return await AsyncKaithQuery(self._requster, filter=filter).count()
+
+    async def search(
+        self,
+        query: str,
+        search_fields: List[str] = [],
+        fields: List[str] = [],
+        boost_fields: Dict[str, int] = {},
+        offset: int = 0,
+        limit: int = 10,
+        conditions: Optional[Dict[str, Any] | LeapcellFilter] = None,
+        orders: List[Tuple[str, str]] = [],
+    ) -> List[AsyncRecord]:
+        return await AsyncKaithQuery(
+            self._requster,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+            filter=KaithQuery(self._requster)._condition2filter(conditions),
+            orders=orders,
+        ).search(query, search_fields, boost_fields)
+
+    async def upload_file(
+        self,
+        file: bytes,
+        filename: Optional[str] = None,
+    ) -> LeapcellFile:
+        return await self._requster.upload(data=file, filename=filename)
+
+    async def upload_files(self, files: List[bytes]) -> List[LeapcellFile]:
+        return await self._requster.upload(data=files)
+
+    def __getitem__(self, key: str) -> LeapcellField:
+        return LeapcellField(key)
+
+
+class AsyncLeapcell(object):
+    """AsyncLeapcell is the asyncio counterpart of Leapcell, all tables created from
+    one client share its aiohttp connection pool and concurrency limit."""
+
+    default_base_url = "https://api.leapcell.io"
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        version: str = "v1",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        pool_maxsize: int = DEFAULT_MAX_CONCURRENCY,
+        pool_maxsize_per_host: int = DEFAULT_POOL_MAXSIZE,
+        keep_alive: bool = True,
+        meta_cache_ttl: float = META_CACHE_TTL_SECS,
+        meta_cache_dir: Optional[str] = None,
+        coalesce_reads: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        json_codec: Union[str, JSONCodec, None] = None,
+        compression: Union[str, RequestCompression, None] = None,
+    ) -> None:
+        """_summary_
+
+        Args:
+            api_key (str): Bearer token for authentication, you can find it in your account page: leapcell.io/account.
+            base_url (str, optional): base_url is the url of your Leapcell server. Defaults to None.
+            version (str, optional): version is the version of Leapcell server. Defaults to "v1".
+            max_concurrency (int, optional): max requests in flight at once. Defaults to DEFAULT_MAX_CONCURRENCY.
+            pool_maxsize (int, optional): max open connections in total. Defaults to DEFAULT_MAX_CONCURRENCY.
+            pool_maxsize_per_host (int, optional): max open connections per host. Defaults to DEFAULT_POOL_MAXSIZE.
+            keep_alive (bool, optional): reuse connections between requests. Defaults to True.
+            meta_cache_ttl (float, optional): seconds table meta is cached, 0 disables the cache. Defaults to META_CACHE_TTL_SECS.
+            meta_cache_dir (str, optional): directory to share cached table meta between processes. Defaults to None.
+            coalesce_reads (bool, optional): identical concurrent reads share one request, a read started after a write of this client finished never shares a request started before it. Defaults to True.
+            retry_policy (RetryPolicy, optional): how 429/5xx responses are retried. Defaults to RetryPolicy().
+            rate_limiter (TokenBucket, optional): token bucket limiting the request rate, can be shared with sync clients. Defaults to None.
+            json_codec (Union[str, JSONCodec], optional): "orjson", "ujson", "json" or a JSONCodec for request and response bodies. Defaults to the fastest installed.
+            compression (Union[str, RequestCompression], optional): "gzip", "zstd" or a RequestCompression for request bodies above a size threshold. Defaults to None.
+
+        Raises:
+            Exception: api_key can not be empty, you can find it in your account page: leapcell.io/account
+        """
+        self._base_url = (
+            base_url or os.environ.get("LEAPCELL_API_URL") or self.default_base_url
+        )
+        self._api_key = api_key or os.environ.get("LEAPCELL_API_TOKEN")
+        if not self._api_key:
+            raise Exception(
+                "api_key can not be empty, you can find it in your account page: leapcell.io/account"
+            )
+        self._version = version
+        self._transport = AsyncTransport(
+            pool_maxsize=pool_maxsize,
+            pool_maxsize_per_host=pool_maxsize_per_host,
+            max_concurrency=max_concurrency,
+            keep_alive=keep_alive,
+            coalesce_reads=coalesce_reads,
+        )
+        self._meta_cache = (
+            TTLCache(ttl=meta_cache_ttl, path=meta_cache_dir)
+            if meta_cache_ttl > 0
+            else None
+        )
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._codec = get_codec(json_codec)
+        self._compression = get_compression(compression)
+
+    def retry_stats(self) -> Dict[str, object]:
+        """retries sent by all tables of this client"""
+        return self._retry_policy.stats()
+
+    def meta_cache_stats(self) -> Dict[str, int]:
+        """hits and misses of the table meta cache shared by all tables"""
+        if self._meta_cache is None:
+            return {"hits": 0, "misses": 0, "size": 0}
+        return self._meta_cache.stats()
+
+    def table(
+        self, repository: str, table_id: str, name_type: str = "name"
+    ) -> AsyncLeapcellTable:
+        if not repository:
+            raise ValueError("repository can not be empty")
+        if not table_id:
+            raise ValueError("table_id can not be empty")
+
+        return AsyncLeapcellTable(
+            repository=repository,
+            api_key=self._api_key,
+            table_id=table_id,
+            base_url=self._base_url,
+            transport=self._transport,
+            name_type=name_type,
+            version=self._version,
+            meta_cache=self._meta_cache,
+            retry_policy=self._retry_policy,
+            rate_limiter=self._rate_limiter,
+            codec=self._codec,
+            compression=self._compression,
+        )
+
+    async def close(self) -> None:
+        """close the aiohttp session and all pooled connections"""
+        await self._transport.close()
+
+    async def __aenter__(self) -> "AsyncLeapcell":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
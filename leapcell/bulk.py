@@ -0,0 +1,221 @@
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Callable, Awaitable
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import time
+from leapcell.exp import LeapcellException, LeapcellRequestError
+from leapcell.retry import RetryPolicy, RETRY_STATUS_CODES, NOT_PROCESSED_STATUS_CODES
+from leapcell.codec import JSONCodec, RawJSON, get_codec
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_BYTES = 1024 * 1024 * 4
+DEFAULT_BULK_CONCURRENCY = 4
+DEFAULT_BATCH_RETRIES = 2
+BATCH_RETRY_BACKOFF_SECS = 0.5
+
+
+class BatchResult(object):
+    """result of one bulk batch
+
+    Args:
+        index (int): batch number, in input order
+        start (int): position of the first record of the batch in the input
+        size (int): number of records in the batch
+    """
+
+    def __init__(self, index: int, start: int, size: int) -> None:
+        self.index = index
+        self.start = start
+        self.size = size
+        self.records: Optional[List[Any]] = None
+        self.error: Optional[Exception] = None
+        self.attempts = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return "<batch: {}, start: {}, size: {}, attempts: {}, error: {}>".format(
+            self.index, self.start, self.size, self.attempts, self.error
+        )
+
+
+class RecordBatch(list):
+    """records of one batch with their json, encoded once by iter_batches to
+    size the batch and sent as they are (see bulk_params of table.py)"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.encoded: List[bytes] = []
+
+    def json(self) -> RawJSON:
+        return RawJSON(b"[" + b",".join(self.encoded) + b"]")
+
+
+def iter_batches(
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+    codec: Optional[JSONCodec] = None,
+) -> Iterator[RecordBatch]:
+    """split records into batches bounded by record count and json size, a
+    single record larger than max_batch_bytes is sent alone. Every record is
+    encoded once with `codec`, the client's, and that json is sent."""
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    dumps = get_codec(codec).dumps
+    batch = RecordBatch()
+    batch_bytes = 0
+    for record in records:
+        encoded = dumps(record)
+        size = len(encoded) + 1
+        if batch and (
+            len(batch) >= batch_size or batch_bytes + size > max_batch_bytes
+        ):
+            yield batch
+            batch = RecordBatch()
+            batch_bytes = 0
+        batch.append(record)
+        batch.encoded.append(encoded)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def batch_retryable(
+    error: Exception, idempotent: bool = False, policy: Optional[RetryPolicy] = None
+) -> bool:
+    """whether a failed create batch can be sent again without creating its
+    records twice. Only failures that mean the batch was not processed are
+    retried: the connection could not be opened, or the server answered 429.
+    A timeout or 5xx may come after the records were written, it is retried
+    only for idempotent batches, those with on_conflict.
+
+    Args:
+        error (Exception): error of the last attempt
+        idempotent (bool, optional): sending the batch twice creates its records once. Defaults to False.
+        policy (Optional[RetryPolicy], optional): retry policy of the client, responses it retries are not retried again here. Defaults to None.
+    """
+    if not isinstance(error, LeapcellRequestError):
+        return False
+    if not error.sent:
+        return True
+    status = error.status
+    if status is not None and policy is not None and policy.retries("POST", status):
+        # the client already sent it as many times as the policy allows
+        return False
+    if status in NOT_PROCESSED_STATUS_CODES:
+        return True
+    return idempotent and (status is None or status in RETRY_STATUS_CODES)
+
+
+def _send_with_retry(
+    send: Callable[[List[Dict[str, Any]]], Any],
+    batch: List[Dict[str, Any]],
+    result: BatchResult,
+    max_retries: int,
+    retryable: Callable[[Exception], bool] = batch_retryable,
+) -> BatchResult:
+    while True:
+        result.attempts += 1
+        try:
+            result.records = send(batch)
+            result.error = None
+            return result
+        except Exception as e:
+            result.error = e
+            if result.attempts > max_retries or not retryable(e):
+                return result
+        time.sleep(BATCH_RETRY_BACKOFF_SECS * 2 ** (result.attempts - 1))
+
+
+def run_batches(
+    send: Callable[[List[Dict[str, Any]]], Any],
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+    concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    max_retries: int = DEFAULT_BATCH_RETRIES,
+    retryable: Callable[[Exception], bool] = batch_retryable,
+    codec: Optional[JSONCodec] = None,
+) -> List[BatchResult]:
+    """send records in batches on up to `concurrency` threads, the input is
+    consumed lazily so at most 2 * concurrency batches are held at once.
+    A failed batch is sent again up to `max_retries` times if `retryable`
+    accepts its error. Records are encoded with `codec` when they are
+    batched, `send` gets RecordBatch lists."""
+    results: List[BatchResult] = []
+    start = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pending = set()
+        for index, batch in enumerate(iter_batches(records, batch_size, max_batch_bytes, codec)):
+            result = BatchResult(index, start, len(batch))
+            start += len(batch)
+            results.append(result)
+            pending.add(
+                executor.submit(
+                    _send_with_retry, send, batch, result, max_retries, retryable
+                )
+            )
+            if len(pending) >= 2 * max(1, concurrency):
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        wait(pending)
+    return results
+
+
+async def run_batches_async(
+    send: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+    records: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+    concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    max_retries: int = DEFAULT_BATCH_RETRIES,
+    retryable: Callable[[Exception], bool] = batch_retryable,
+    codec: Optional[JSONCodec] = None,
+) -> List[BatchResult]:
+    """asyncio counterpart of run_batches"""
+
+    async def send_with_retry(batch: List[Dict[str, Any]], result: BatchResult) -> None:
+        while True:
+            result.attempts += 1
+            try:
+                result.records = await send(batch)
+                result.error = None
+                return
+            except Exception as e:
+                result.error = e
+                if result.attempts > max_retries or not retryable(e):
+                    return
+            await asyncio.sleep(BATCH_RETRY_BACKOFF_SECS * 2 ** (result.attempts - 1))
+
+    results: List[BatchResult] = []
+    start = 0
+    pending = set()
+    try:
+        for index, batch in enumerate(iter_batches(records, batch_size, max_batch_bytes, codec)):
+            result = BatchResult(index, start, len(batch))
+            start += len(batch)
+            results.append(result)
+            pending.add(asyncio.ensure_future(send_with_retry(batch, result)))
+            if len(pending) >= max(1, concurrency):
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # batches already sent finish even if reading the input fails
+        if pending:
+            await asyncio.wait(pending)
+    return results
+
+
+def flatten_batches(results: List[BatchResult]) -> List[Any]:
+    """records of all batches in input order, raises the first batch error"""
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise LeapcellException(
+            "{} of {} batches failed, first failed batch starts at record {}, error: {}".format(
+                len(failed), len(results), failed[0].start, failed[0].error
+            )
+        )
+    records: List[Any] = []
+    for r in results:
+        records.extend(r.records or [])
+    return records
@@ -0,0 +1,401 @@
+from typing import Dict, Any, Optional, Tuple, Callable, List
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+META_CACHE_TTL_SECS = 60
+
+
+class TTLCache(object):
+    """thread-safe key value cache whose entries expire after `ttl` seconds,
+    optionally mirrored to json files under `path` so other processes can
+    reuse entries fetched by the first one.
+
+    Args:
+        ttl (float): seconds an entry stays valid
+        path (str, optional): dedicated directory for the on-disk copy. Defaults to None.
+    """
+
+    def __init__(self, ttl: float = META_CACHE_TTL_SECS, path: Optional[str] = None) -> None:
+        self._ttl = ttl
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._hits = 0
+        self._misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+                return entry[1]
+        entry = self._load(key)
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                self._entries[key] = entry
+                self._hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        entry = (time.time() + self._ttl, value)
+        with self._lock:
+            self._entries[key] = entry
+        self._store(key, entry)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """drop one entry, or every entry if key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if self._path is None:
+            return
+        if key is not None:
+            self._remove(self._file(key))
+            return
+        for name in os.listdir(self._path):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self._path, name))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._entries),
+            }
+
+    def _file(self, key: str) -> str:
+        assert self._path is not None
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._path, name + ".json")
+
+    def _load(self, key: str) -> Optional[Tuple[float, Any]]:
+        if self._path is None:
+            return None
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            if obj.get("key") != key:
+                return None
+            return (obj["expires_at"], obj["value"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, Any]) -> None:
+        if self._path is None:
+            return
+        file = self._file(key)
+        tmp = "{}.{}.{}.tmp".format(file, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": entry[0], "value": entry[1]}, f)
+            os.replace(tmp, file)
+        except (OSError, TypeError, ValueError):
+            self._remove(tmp)
+
+    @staticmethod
+    def _remove(file: str) -> None:
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+
+RECORD_CACHE_MAX_ENTRIES = 1024
+RECORD_CACHE_MAX_BYTES = 1024 * 1024 * 16
+RECORD_CACHE_TTL_SECS = 60
+
+
+class LRUCache(object):
+    """thread-safe least recently used cache bounded by entry count and by the
+    total size reported for the entries, every entry expires after `ttl` seconds.
+
+    Args:
+        max_entries (int): max number of entries
+        max_bytes (int): max total size of the entries
+        ttl (float): seconds an entry stays valid
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RECORD_CACHE_MAX_ENTRIES,
+        max_bytes: int = RECORD_CACHE_MAX_BYTES,
+        ttl: float = RECORD_CACHE_TTL_SECS,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # bumped by every invalidation, see set()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """number of invalidations so far, read it before fetching a value to set"""
+        return self._generation
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._pop(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[2]
+
+    def set(
+        self, key: str, value: Any, size: int, generation: Optional[int] = None
+    ) -> None:
+        """cache a value. With `generation`, the value read when the cache was
+        at that generation is dropped if an invalidation happened since, it
+        may be older than the write that invalidated."""
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (time.time() + self._ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                self._pop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """drop one entry, or every entry if key is None"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._pop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+
+UPLOAD_CACHE_MAX_ENTRIES = 4096
+UPLOAD_CACHE_MAX_DISK_ENTRIES = 65536
+UPLOAD_CACHE_TTL_SECS = 60 * 60 * 24 * 7
+
+
+class UploadCache(object):
+    """content-addressed cache of uploaded files: the digest of a blob maps to
+    the file (id, link, meta) returned when it was first uploaded. Entries
+    live in a least recently used map and, with `path`, in json files under a
+    dedicated directory shared by processes, the least recently used files
+    are removed once there are more than `max_disk_entries`.
+
+    With `verify`, an entry found on disk but not in memory is passed to it
+    before use (e.g. to check the link still resolves) and dropped when it
+    returns False, entries uploaded by this process are trusted.
+
+    Args:
+        max_entries (int): max entries in memory
+        ttl (float): seconds an entry stays valid
+        path (str, optional): dedicated directory for the on-disk store. Defaults to None.
+        max_disk_entries (int): max entries on disk
+        verify (Callable[[Dict[str, Any]], bool], optional): check of entries loaded from disk. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = UPLOAD_CACHE_MAX_ENTRIES,
+        ttl: float = UPLOAD_CACHE_TTL_SECS,
+        path: Optional[str] = None,
+        max_disk_entries: int = UPLOAD_CACHE_MAX_DISK_ENTRIES,
+        verify: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._path = path
+        self._max_disk_entries = max_disk_entries
+        self._verify = verify
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._disk_entries = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._verify_failures = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._disk_entries = len(self._files())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+        entry = self._load(key)
+        if entry is not None and entry[0] > now:
+            if self._verify is not None and not self._verify(entry[1]):
+                self._remove_key(key)
+                with self._lock:
+                    self._verify_failures += 1
+                    self._misses += 1
+                return None
+            with self._lock:
+                self._put(key, entry)
+                self._disk_hits += 1
+            return entry[1]
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        entry = (time.time() + self._ttl, value)
+        with self._lock:
+            self._put(key, entry)
+        self._store(key, entry)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """drop one entry, or every entry if key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if self._path is None:
+            return
+        if key is not None:
+            self._remove_key(key)
+            return
+        for file in self._files():
+            TTLCache._remove(file)
+        with self._lock:
+            self._disk_entries = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "verify_failures": self._verify_failures,
+                "size": len(self._entries),
+                "disk_size": self._disk_entries,
+            }
+
+    def _put(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _files(self) -> List[str]:
+        assert self._path is not None
+        return [
+            os.path.join(self._path, name)
+            for name in os.listdir(self._path)
+            if name.endswith(".json")
+        ]
+
+    def _file(self, key: str) -> str:
+        assert self._path is not None
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._path, name + ".json")
+
+    def _load(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if self._path is None:
+            return None
+        file = self._file(key)
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                obj = json.load(f)
+            if obj.get("key") != key:
+                return None
+            # the mtime orders files for eviction
+            os.utime(file)
+            return (obj["expires_at"], obj["value"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        if self._path is None:
+            return
+        file = self._file(key)
+        tmp = "{}.{}.{}.tmp".format(file, os.getpid(), threading.get_ident())
+        existed = os.path.exists(file)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": entry[0], "value": entry[1]}, f)
+            os.replace(tmp, file)
+        except (OSError, TypeError, ValueError):
+            TTLCache._remove(tmp)
+            return
+        with self._lock:
+            if not existed:
+                self._disk_entries += 1
+            prune = self._disk_entries > self._max_disk_entries
+        if prune:
+            self._prune()
+
+    def _prune(self) -> None:
+        # down to 90% of the limit, so pruning does not run on every upload
+        files = []
+        for file in self._files():
+            try:
+                files.append((os.path.getmtime(file), file))
+            except OSError:
+                pass
+        files.sort()
+        keep = int(self._max_disk_entries * 0.9)
+        removed = files[: max(0, len(files) - keep)]
+        for _, file in removed:
+            TTLCache._remove(file)
+        with self._lock:
+            self._disk_entries = len(files) - len(removed)
+            self._evictions += len(removed)
+
+    def _remove_key(self, key: str) -> None:
+        if self._path is None:
+            return
+        file = self._file(key)
+        if os.path.exists(file):
+            TTLCache._remove(file)
+            with self._lock:
+                self._disk_entries = max(0, self._disk_entries - 1)
@@ -0,0 +1,175 @@
+from typing import Any, Dict, List, Union
+import json
+import math
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson  # type: ignore
+except ImportError:  # pragma: no cover
+    ujson = None
+
+# fastest first, the first installed backend is the default
+CODEC_PREFERENCE = ["orjson", "ujson", "json"]
+# types orjson would encode but stdlib json rejects are left to the fallback
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None
+    else 0
+)
+
+
+def _check_finite(obj: Any) -> None:
+    """raise ValueError on a nan or infinite float in obj, as stdlib json does"""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError(
+                    "Out of range float values are not JSON compliant: {!r}".format(value)
+                )
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+
+class JSONCodec(object):
+    """JSONCodec encodes request bodies straight to utf-8 bytes and decodes
+    response bodies, decode errors are ValueErrors for every backend. nan and
+    infinite floats are not valid json, every backend raises ValueError on them."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson backend. datetime, date, time and dataclass values are passed
+    through to the stdlib fallback and raise TypeError as with JSONCodec,
+    numpy values are not serialized either. orjson always encodes uuid.UUID
+    and Enum values, convert them with str() or .value to stay portable."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            data = orjson.dumps(obj, option=ORJSON_OPTIONS)
+        except TypeError:
+            # non-str keys, ints beyond 64 bit and similar stdlib-only inputs,
+            # stdlib raises for the rest
+            return JSONCodec.dumps(self, obj)
+        # orjson writes nan and infinity as null, only then is obj scanned
+        if b"null" in data:
+            _check_finite(obj)
+        return data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            data = ujson.dumps(
+                obj, ensure_ascii=False, escape_forward_slashes=False
+            ).encode("utf-8")
+        except OverflowError:
+            # ints beyond 64 bit, and nan on ujson versions that reject it
+            return JSONCodec.dumps(self, obj)
+        # ujson writes nan and infinity as NaN and Infinity
+        if b"NaN" in data or b"Infinity" in data:
+            _check_finite(obj)
+        return data
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return ujson.loads(data)
+
+
+class RawJSON(object):
+    """json encoded ahead of time, a top-level value of a request body that
+    encode_body places in the body as it is
+
+    Args:
+        data (bytes): the json
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+
+def encode_body(codec: JSONCodec, data: Any) -> bytes:
+    """encode a request body with `codec`, RawJSON values of a dict body are
+    spliced in without being encoded again"""
+    if not isinstance(data, dict):
+        return codec.dumps(data)
+    raw = [(key, value) for key, value in data.items() if isinstance(value, RawJSON)]
+    if not raw:
+        return codec.dumps(data)
+    body = codec.dumps(
+        {key: value for key, value in data.items() if not isinstance(value, RawJSON)}
+    )
+    parts = b",".join(codec.dumps(key) + b":" + value.data for key, value in raw)
+    if body == b"{}":
+        return b"{" + parts + b"}"
+    return body[:-1] + b"," + parts + b"}"
+
+
+_CODECS: Dict[str, type] = {"json": JSONCodec}
+if orjson is not None:
+    _CODECS["orjson"] = OrjsonCodec
+if ujson is not None:
+    _CODECS["ujson"] = UjsonCodec
+
+
+def available_codecs() -> List[str]:
+    """names of the installed backends, fastest first"""
+    return [name for name in CODEC_PREFERENCE if name in _CODECS]
+
+
+def get_codec(codec: Union[str, JSONCodec, None] = None) -> JSONCodec:
+    """resolve a codec by name, None picks the default codec
+
+    Args:
+        codec (Union[str, JSONCodec], optional): "orjson", "ujson", "json" or a JSONCodec. Defaults to None.
+
+    Raises:
+        ValueError: the named backend is unknown or not installed
+
+    Returns:
+        JSONCodec: the codec
+    """
+    if codec is None:
+        return _default
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec not in _CODECS:
+        raise ValueError(
+            "json codec {} is not available, installed: {}".format(
+                codec, ", ".join(available_codecs())
+            )
+        )
+    return _CODECS[codec]()
+
+
+def set_default_codec(codec: Union[str, JSONCodec]) -> None:
+    """set the codec of clients created without json_codec"""
+    global _default
+    _default = get_codec(codec)
+
+
+_default: JSONCodec = _CODECS[available_codecs()[0]]()
@@ -0,0 +1,299 @@
+from typing import Dict, Any, List, Optional, Iterable, Union
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+try:
+    import pandas
+except ImportError:
+    pandas = None  # type: ignore
+
+# array typecodes of numeric field types, TIME is an epoch int
+NUMERIC_TYPECODES = {
+    "INT_NUMBER": "q",
+    "TIME": "q",
+    "FLOAT_NUMBER": "d",
+}
+# ints a float array holds exactly
+_EXACT_FLOAT_INT = 2 ** 53
+DICTIONARY_TYPES = frozenset(["STR", "LABEL"])
+RECORD_ID_COLUMN = "record_id"
+# raw records decoded before they are appended to the columns
+COLUMN_CHUNK_SIZE = 1024
+
+
+def _require(module: Any, name: str) -> None:
+    if module is None:
+        raise ImportError(
+            "{} is required for this conversion, install it with `pip install leapcell[{}]`".format(
+                name, name
+            )
+        )
+
+
+class Column(object):
+    """one field of a ColumnBatch, values of any type in a list, None for nulls"""
+
+    def __init__(self, name: str, type: Optional[str] = None) -> None:
+        self.name = name
+        self.type = type
+        self.values: List[Any] = []
+
+    def extend(self, values: List[Any]) -> None:
+        self.values.extend(values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i: int) -> Any:
+        return self.values[i]
+
+    def to_list(self) -> List[Any]:
+        return list(self.values)
+
+    def to_numpy(self) -> Any:
+        _require(numpy, "numpy")
+        return numpy.array(self.values, dtype=object)
+
+    def __repr__(self) -> str:
+        return "<column: {}, type: {}, rows: {}>".format(self.name, self.type, len(self))
+
+
+class NumericColumn(Column):
+    """contiguous typed array of an INT_NUMBER, FLOAT_NUMBER or TIME field.
+    Nulls are stored as 0 and flagged in `validity`, which is None while
+    every value is present. A ColumnBatch replaces it with a generic Column
+    once a value can not be stored in the array exactly."""
+
+    def __init__(self, name: str, type: str) -> None:
+        super().__init__(name, type)
+        self.data = array(NUMERIC_TYPECODES[type])
+        self.validity: Optional[bytearray] = None
+
+    def extend(self, values: List[Any]) -> None:
+        """append values, nothing is appended when one is rejected
+
+        Raises:
+            TypeError: a value is not a number, or a cast to the array type would change it
+            OverflowError: a value is out of the range of the array type
+        """
+        start = len(self.data)
+        present = [0 if v is None else v for v in values] if None in values else values
+        try:
+            try:
+                if self.data.typecode == "d" and any(
+                    type(v) is int and not -_EXACT_FLOAT_INT <= v <= _EXACT_FLOAT_INT
+                    for v in present
+                ):
+                    # a float array would round them
+                    raise TypeError("int too large for a float array")
+                self.data.extend(present)
+            except TypeError:
+                # ints sent as floats (or the other way round)
+                del self.data[start:]
+                self.data.extend(self._cast(present))
+        except (TypeError, OverflowError):
+            del self.data[start:]
+            raise
+        if present is not values:
+            if self.validity is None:
+                self.validity = bytearray(b"\x01") * start
+            self.validity.extend(0 if v is None else 1 for v in values)
+        elif self.validity is not None:
+            self.validity.extend(b"\x01" * len(values))
+
+    def _cast(self, values: List[Any]) -> List[Any]:
+        cast = float if self.data.typecode == "d" else int
+        out = []
+        for v in values:
+            if isinstance(v, float) and cast is int and not v.is_integer():
+                raise TypeError("{!r} is not an integer".format(v))
+            if not isinstance(v, (int, float)):
+                raise TypeError("{!r} is not a number".format(v))
+            c = cast(v)
+            if c != v:
+                raise TypeError("{!r} can not be stored as {} exactly".format(v, cast.__name__))
+            out.append(c)
+        return out
+
+    def to_column(self) -> Column:
+        """the values so far in a generic Column"""
+        column = Column(self.name, self.type)
+        column.values = self.to_list()
+        return column
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, i: int) -> Any:
+        if self.validity is not None and not self.validity[i]:
+            return None
+        return self.data[i]
+
+    def to_list(self) -> List[Any]:
+        if self.validity is None:
+            return self.data.tolist()
+        return [v if ok else None for v, ok in zip(self.data.tolist(), self.validity)]
+
+    def to_numpy(self) -> Any:
+        """zero-copy view of the values, a masked array when there are nulls"""
+        _require(numpy, "numpy")
+        data = numpy.frombuffer(self.data, dtype=self.data.typecode)
+        if self.validity is None:
+            return data
+        mask = numpy.frombuffer(self.validity, dtype=numpy.uint8) == 0
+        return numpy.ma.MaskedArray(data, mask=mask)
+
+
+class DictionaryColumn(Column):
+    """dictionary encoded STR or LABEL field: each distinct value is kept once
+    in `dictionary` and rows hold its index in `codes`, -1 for nulls"""
+
+    def __init__(self, name: str, type: str) -> None:
+        super().__init__(name, type)
+        self.codes = array("i")
+        self.dictionary: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def extend(self, values: List[Any]) -> None:
+        index = self._index
+        dictionary = self.dictionary
+        codes = []
+        for v in values:
+            if v is None:
+                codes.append(-1)
+                continue
+            code = index.get(v)
+            if code is None:
+                code = len(dictionary)
+                index[v] = code
+                dictionary.append(v)
+            codes.append(code)
+        self.codes.extend(codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Any:
+        code = self.codes[i]
+        return None if code < 0 else self.dictionary[code]
+
+    def to_list(self) -> List[Any]:
+        dictionary = self.dictionary
+        return [None if c < 0 else dictionary[c] for c in self.codes]
+
+    def to_numpy(self) -> Any:
+        _require(numpy, "numpy")
+        return numpy.array(self.to_list(), dtype=object)
+
+    def to_categorical(self) -> Any:
+        """pandas Categorical sharing the codes buffer"""
+        _require(numpy, "numpy")
+        _require(pandas, "pandas")
+        codes = numpy.frombuffer(self.codes, dtype=numpy.int32)
+        return pandas.Categorical.from_codes(codes, categories=self.dictionary)
+
+
+def new_column(name: str, type: Optional[str]) -> Column:
+    if type in NUMERIC_TYPECODES:
+        return NumericColumn(name, type)  # type: ignore[arg-type]
+    if type in DICTIONARY_TYPES:
+        return DictionaryColumn(name, type)  # type: ignore[arg-type]
+    return Column(name, type)
+
+
+class ColumnBatch(object):
+    """ColumnBatch holds query results column by column: one Column per field
+    plus the `record_id` column, built from raw response records without
+    creating a Record per row.
+
+    Args:
+        field_types (Dict[str, str]): field name (or id) to field type, e.g. {"age": "INT_NUMBER"}
+    """
+
+    def __init__(self, field_types: Dict[str, Optional[str]]) -> None:
+        self.record_ids = Column(RECORD_ID_COLUMN)
+        self.columns: Dict[str, Column] = {
+            name: new_column(name, type) for name, type in field_types.items()
+        }
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        """append raw response records"""
+        records = list(records)
+        self.record_ids.extend([r["record_id"] for r in records])
+        fields = [r["fields"] for r in records]
+        for name, column in list(self.columns.items()):
+            values = [f.get(name) for f in fields]
+            try:
+                column.extend(values)
+            except (TypeError, OverflowError):
+                # numbers a typed array can not hold exactly are kept as they are
+                column = self.columns[name] = column.to_column()  # type: ignore[attr-defined]
+                column.extend(values)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.record_ids)
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __getitem__(self, name: str) -> Column:
+        if name == RECORD_ID_COLUMN and name not in self.columns:
+            return self.record_ids
+        return self.columns[name]
+
+    def to_pydict(self) -> Dict[str, List[Any]]:
+        data = {RECORD_ID_COLUMN: self.record_ids.to_list()}
+        for name, column in self.columns.items():
+            data[name] = column.to_list()
+        return data
+
+    def to_pandas(self) -> Any:
+        """DataFrame indexed by record_id, numeric values and the codes of
+        dictionary columns are handed over without copying, numeric columns
+        with nulls become nullable Int64/Float64 columns"""
+        _require(pandas, "pandas")
+        data: Dict[str, Any] = {}
+        for name, column in self.columns.items():
+            if isinstance(column, DictionaryColumn):
+                data[name] = column.to_categorical()
+            elif isinstance(column, NumericColumn) and column.validity is None:
+                data[name] = column.to_numpy()
+            elif isinstance(column, NumericColumn):
+                masked = column.to_numpy()
+                nullable = (
+                    pandas.arrays.IntegerArray
+                    if column.data.typecode == "q"
+                    else pandas.arrays.FloatingArray
+                )
+                data[name] = nullable(masked.data, masked.mask)
+            else:
+                data[name] = column.values
+        return pandas.DataFrame(
+            data, index=pandas.Index(self.record_ids.values, name=RECORD_ID_COLUMN)
+        )
+
+    def __repr__(self) -> str:
+        return "<column batch: {} rows, columns: {}>".format(
+            self.num_rows, self.column_names
+        )
+
+
+def field_types(
+    meta: Dict[str, Any], name_type: str, fields: Union[List[str], None] = None
+) -> Dict[str, Optional[str]]:
+    """map record field keys to field types from raw table meta, limited to
+    `fields` when a query selects some, unknown fields get no type"""
+    key = "name" if name_type == "name" else "id"
+    types = {info[key]: info["type"] for info in meta["fields"].values()}
+    if not fields:
+        return dict(types)
+    return {name: types.get(name) for name in fields}
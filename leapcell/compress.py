@@ -0,0 +1,110 @@
+from typing import Any, Iterator, Optional, Union
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+COMPRESSION_ALGORITHMS = ("gzip", "zstd")
+# bodies smaller than this are sent as they are, compressing them costs more than it saves
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+# body bytes handed to the compressor at once
+COMPRESSION_CHUNK_SIZE = 256 * 1024
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "zstd": 3}
+
+
+class CompressedBody(object):
+    """compressed request body produced chunk by chunk while it is sent, with
+    chunked transfer encoding since the compressed size is not known up
+    front. Every iteration compresses again from the start, so the body can
+    be sent again on retry.
+
+    Args:
+        body (bytes): uncompressed body
+        compression (RequestCompression): algorithm and level
+    """
+
+    def __init__(self, body: bytes, compression: "RequestCompression") -> None:
+        self._body = body
+        self._compression = compression
+
+    def __iter__(self) -> Iterator[bytes]:
+        compressor = self._compression.compressor()
+        view = memoryview(self._body)
+        for start in range(0, len(view), COMPRESSION_CHUNK_SIZE):
+            out = compressor.compress(view[start : start + COMPRESSION_CHUNK_SIZE])
+            if out:
+                yield out
+        yield compressor.flush()
+
+
+class RequestCompression(object):
+    """RequestCompression compresses request bodies of at least `threshold`
+    bytes, e.g. the repetitive json of bulk creates and updates, and sets
+    the Content-Encoding header. Responses are compressed by the server
+    independently of this (Accept-Encoding: gzip).
+
+    Args:
+        algorithm (str, optional): "gzip" or "zstd" (needs `pip install leapcell[zstd]`). Defaults to "gzip".
+        threshold (int, optional): smallest body compressed, in bytes. Defaults to DEFAULT_COMPRESSION_THRESHOLD.
+        level (Optional[int], optional): compression level. Defaults to 6 for gzip and 3 for zstd.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "gzip",
+        threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        level: Optional[int] = None,
+    ) -> None:
+        if algorithm not in COMPRESSION_ALGORITHMS:
+            raise ValueError(
+                "invalid compression {}, it should be one of {}".format(
+                    algorithm, ", ".join(COMPRESSION_ALGORITHMS)
+                )
+            )
+        if algorithm == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstandard is required for zstd compression, install it with `pip install leapcell[zstd]`"
+            )
+        if threshold < 0:
+            raise ValueError("threshold can not be negative")
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.level = level if level is not None else DEFAULT_COMPRESSION_LEVELS[algorithm]
+
+    @property
+    def encoding(self) -> str:
+        """value of the Content-Encoding header"""
+        return self.algorithm
+
+    def applies(self, body: bytes) -> bool:
+        return len(body) >= self.threshold
+
+    def compressor(self) -> Any:
+        if self.algorithm == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compressobj()
+        # wbits 31 writes the gzip header and trailer
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, body: bytes) -> CompressedBody:
+        """stream of the compressed body"""
+        return CompressedBody(body, self)
+
+    def compress_bytes(self, body: bytes) -> bytes:
+        """the compressed body at once, for clients that can not send a stream again"""
+        return b"".join(CompressedBody(body, self))
+
+    def __repr__(self) -> str:
+        return "<request compression: {}, level: {}, threshold: {}>".format(
+            self.algorithm, self.level, self.threshold
+        )
+
+
+def get_compression(
+    compression: Union[str, RequestCompression, None] = None
+) -> Optional[RequestCompression]:
+    """RequestCompression of an algorithm name, None disables compression"""
+    if compression is None or isinstance(compression, RequestCompression):
+        return compression
+    return RequestCompression(compression)
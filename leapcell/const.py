@@ -2,4 +2,7 @@ from enum import Enum
 
 class TableFieldType(Enum):
     ID = 1
-    NAME = 2
\ No newline at end of file
+    NAME = 2
+
+# record id is filterable like a field, used by multi-get and batched updates
+RECORD_ID_FIELD = "record_id"
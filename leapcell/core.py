@@ -1,6 +1,18 @@
 from leapcell.table import LeapcellTable, LeapcellField, LeapcellFilter
+from leapcell.http_client import (
+    new_pool_manager,
+    DEFAULT_NUM_POOLS,
+    DEFAULT_POOL_MAXSIZE,
+)
+from leapcell.cache import TTLCache, META_CACHE_TTL_SECS
+from leapcell.singleflight import SingleFlight
+from leapcell.retry import RetryPolicy
+from leapcell.throttle import TokenBucket, AdaptiveConcurrency
+from leapcell.codec import JSONCodec, get_codec
+from leapcell.compress import RequestCompression, get_compression
+from leapcell.trace import RequestHook
 import os
-from typing import List, Tuple, Dict, Union
+from typing import List, Tuple, Dict, Union, Optional
 
 
 class Leapcell(object):
@@ -9,7 +21,23 @@ class Leapcell(object):
     default_base_url = "https://api.leapcell.io"
 
     def __init__(
-        self, api_key: str, base_url: str | None = None, version: str = "v1"
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        version: str = "v1",
+        num_pools: int = DEFAULT_NUM_POOLS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        meta_cache_ttl: float = META_CACHE_TTL_SECS,
+        meta_cache_dir: Optional[str] = None,
+        coalesce_reads: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrency] = None,
+        json_codec: Union[str, JSONCodec, None] = None,
+        compression: Union[str, RequestCompression, None] = None,
+        hooks: Optional[List[RequestHook]] = None,
     ) -> None:
         """_summary_
 
@@ -17,6 +45,19 @@ class Leapcell(object):
             api_key (str): Bearer token for authentication, api_key is the api token of your Leapcell account, you can find it in your account page: leapcell.io/account.
             base_url (str, optional): base_url is the url of your Leapcell server, if you use the Leapcell cloud service, you can ignore this parameter. Defaults to None.
             version (str, optional): version is the version of Leapcell server, if you use the Leapcell cloud service, you can ignore this parameter. Defaults to "v1".
+            num_pools (int, optional): number of per-host connection pools to keep. Defaults to DEFAULT_NUM_POOLS.
+            pool_maxsize (int, optional): connections kept open per host, shared by all tables of this client. Defaults to DEFAULT_POOL_MAXSIZE.
+            pool_block (bool, optional): if True, pool_maxsize is a hard per-host limit and requests wait for a free connection. Defaults to False.
+            keep_alive (bool, optional): enable TCP keep-alive on pooled connections. Defaults to True.
+            meta_cache_ttl (float, optional): seconds table meta is cached, shared by all tables of this client, 0 disables the cache. Defaults to META_CACHE_TTL_SECS.
+            meta_cache_dir (str, optional): directory to share cached table meta between processes, e.g. cold-started workers. Defaults to None.
+            coalesce_reads (bool, optional): identical concurrent reads (get_by_id, query, count, search, meta) share one request and its result, a read started after a write of this client finished never shares a request started before it. Defaults to True.
+            retry_policy (RetryPolicy, optional): how 429/5xx responses are retried, shared by all tables of this client. Defaults to RetryPolicy().
+            rate_limiter (TokenBucket, optional): token bucket limiting the request rate, can be shared with other clients and threads. Defaults to None.
+            concurrency_limiter (AdaptiveConcurrency, optional): AIMD limit on requests in flight that adapts to latency and 429s, can be shared with other clients. Defaults to None.
+            json_codec (Union[str, JSONCodec], optional): "orjson", "ujson", "json" or a JSONCodec for request and response bodies. Defaults to the fastest installed.
+            compression (Union[str, RequestCompression], optional): "gzip", "zstd" or a RequestCompression for request bodies above a size threshold. Defaults to None, bodies are sent uncompressed.
+            hooks (List[RequestHook], optional): called before and after every request of all tables, e.g. HistogramHook or OpenTelemetryHook. Defaults to None.
 
         Raises:
             Exception: api_key can not be empty, you can find it in your account page: leapcell.io/account
@@ -30,6 +71,77 @@ class Leapcell(object):
                 "api_key can not be empty, you can find it in your account page: leapcell.io/account"
             )
         self._version = version
+        self._pool = new_pool_manager(
+            num_pools=num_pools,
+            maxsize=pool_maxsize,
+            block=pool_block,
+            keep_alive=keep_alive,
+        )
+        self._meta_cache = (
+            TTLCache(ttl=meta_cache_ttl, path=meta_cache_dir)
+            if meta_cache_ttl > 0
+            else None
+        )
+        self._single_flight = SingleFlight() if coalesce_reads else None
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._concurrency_limiter = concurrency_limiter
+        self._codec = get_codec(json_codec)
+        self._compression = get_compression(compression)
+        self._hooks: List[RequestHook] = list(hooks or [])
+
+    def meta_cache_stats(self) -> Dict[str, int]:
+        """hits and misses of the table meta cache shared by all tables
+
+        Returns:
+            Dict[str, int]: hits, misses and size
+        """
+        if self._meta_cache is None:
+            return {"hits": 0, "misses": 0, "size": 0}
+        return self._meta_cache.stats()
+
+    def retry_stats(self) -> Dict[str, object]:
+        """retries sent by all tables of this client
+
+        Returns:
+            Dict[str, object]: retries, exhausted and retries per http code
+        """
+        return self._retry_policy.stats()
+
+    def throttle_stats(self) -> Dict[str, Dict[str, float]]:
+        """state of the rate and concurrency limiters, empty for unset ones
+
+        Returns:
+            Dict[str, Dict[str, float]]: stats under "rate" and "concurrency"
+        """
+        stats = {}
+        if self._rate_limiter is not None:
+            stats["rate"] = self._rate_limiter.stats()
+        if self._concurrency_limiter is not None:
+            stats["concurrency"] = self._concurrency_limiter.stats()
+        return stats
+
+    def add_hook(self, hook: RequestHook) -> None:
+        """add a request hook to all tables, including those created before"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        """remove a request hook
+
+        Raises:
+            ValueError: hook was not added
+        """
+        self._hooks.remove(hook)
+
+    def close(self) -> None:
+        """close all pooled connections of this client"""
+        self._pool.clear()
+
+    def __enter__(self) -> "Leapcell":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
 
     def table(
         self, repository: str, table_id: str, name_type: str = "name"
@@ -63,4 +175,13 @@ class Leapcell(object):
             base_url=self._base_url,
             name_type=name_type,
             version=self._version,
+            pool=self._pool,
+            meta_cache=self._meta_cache,
+            single_flight=self._single_flight,
+            retry_policy=self._retry_policy,
+            rate_limiter=self._rate_limiter,
+            concurrency_limiter=self._concurrency_limiter,
+            codec=self._codec,
+            compression=self._compression,
+            hooks=self._hooks,
         )
@@ -1,2 +1,22 @@
+from typing import Optional
+
+
 class LeapcellException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class LeapcellRequestError(LeapcellException):
+    """a request failed on the network or was answered with an error
+
+    Args:
+        message (str): error message
+        status (Optional[int], optional): http code of the response, None if there was no response. Defaults to None.
+        sent (bool, optional): the request may have reached the server, False when the connection could not be opened. Defaults to True.
+    """
+
+    def __init__(
+        self, message: str, status: Optional[int] = None, sent: bool = True
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.sent = sent
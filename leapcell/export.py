@@ -0,0 +1,361 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import json
+import os
+import threading
+from leapcell.exp import LeapcellException
+from leapcell.codec import JSONCodec, get_codec
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # type: ignore
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+DEFAULT_EXPORT_RANGES = 16
+DEFAULT_EXPORT_CONCURRENCY = 4
+DEFAULT_EXPORT_PAGE_SIZE = 1000
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# record attributes written before the fields
+RECORD_COLUMNS = ("record_id", "create_time", "update_time")
+
+# fetch(range, offset, limit) -> raw records of the range ordered by the split field
+FetchPage = Callable[[Dict[str, Any], int, int], List[Dict[str, Any]]]
+
+
+def split_ranges(low: Any, high: Any, count: int) -> List[Dict[str, Any]]:
+    """split [low, high] into `count` disjoint ranges, [low, b1), [b1, b2), ...
+    [bn, high], followed by a range of the records whose value is null, which
+    no bounded range matches. Non-numeric bounds are not split and give one
+    unbounded range."""
+    numeric = (int, float)
+    if (
+        not isinstance(low, numeric)
+        or not isinstance(high, numeric)
+        or isinstance(low, bool)
+        or high <= low
+    ):
+        return [{"index": 0, "low": None, "high": None, "last": True}]
+    if isinstance(low, int) and isinstance(high, int):
+        count = max(1, min(count, high - low))
+        bounds = [low + (high - low) * i // count for i in range(count)]
+    else:
+        bounds = [low + (high - low) * i / count for i in range(count)]
+    bounds.append(high)
+    ranges = [
+        {"index": i, "low": bounds[i], "high": bounds[i + 1], "last": i == count - 1}
+        for i in range(count)
+    ]
+    ranges.append({"index": count, "low": None, "high": None, "last": False, "null": True})
+    return ranges
+
+
+class _NDJSONWriter(object):
+    def __init__(self, path: str, offset: int, columns: Dict[str, Any], codec: JSONCodec) -> None:
+        self._file = open(path, "r+b" if offset else "wb")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._codec = codec
+
+    def write(self, records: List[Dict[str, Any]]) -> int:
+        dumps = self._codec.dumps
+        self._file.write(b"".join(dumps(record) + b"\n" for record in records))
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _CSVWriter(object):
+    def __init__(self, path: str, offset: int, columns: Dict[str, Any], codec: JSONCodec) -> None:
+        self._file = open(path, "r+b" if offset else "wb")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._codec = codec
+        self._fields = list(columns)
+        if not offset:
+            self._write_rows([list(RECORD_COLUMNS) + self._fields])
+
+    def _cell(self, value: Any) -> Any:
+        if value is None:
+            return ""
+        if isinstance(value, (list, dict)):
+            return self._codec.dumps(value).decode("utf-8")
+        return value
+
+    def _write_rows(self, rows: List[List[Any]]) -> None:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        self._file.write(buf.getvalue().encode("utf-8"))
+
+    def write(self, records: List[Dict[str, Any]]) -> int:
+        cell = self._cell
+        self._write_rows(
+            [
+                [cell(record.get(c)) for c in RECORD_COLUMNS]
+                + [cell(record["fields"].get(f)) for f in self._fields]
+                for record in records
+            ]
+        )
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# parquet column kinds of field types, other types are written as json text
+PARQUET_TYPES = {
+    "INT_NUMBER": "int64",
+    "TIME": "int64",
+    "FLOAT_NUMBER": "float64",
+    "STR": "string",
+    "LONG_TEXT": "string",
+    "LINK": "string",
+    "LABEL": "string",
+    "IMAGE": "string",
+    "LABELS": "list",
+    "IMAGES": "list",
+}
+
+
+class _ParquetWriter(object):
+    """one row group per page, a parquet file can not be appended to after a
+    crash so an unfinished range is written again from its start"""
+
+    def __init__(self, path: str, offset: int, columns: Dict[str, Any], codec: JSONCodec) -> None:
+        self._path = path
+        self._codec = codec
+        self._columns = columns
+        fields = [
+            ("record_id", pyarrow.string()),
+            ("create_time", pyarrow.int64()),
+            ("update_time", pyarrow.int64()),
+        ]
+        for name, type in columns.items():
+            kind = PARQUET_TYPES.get(type)
+            if kind == "int64":
+                fields.append((name, pyarrow.int64()))
+            elif kind == "float64":
+                fields.append((name, pyarrow.float64()))
+            elif kind == "list":
+                fields.append((name, pyarrow.list_(pyarrow.string())))
+            else:
+                fields.append((name, pyarrow.string()))
+        self._schema = pyarrow.schema(fields)
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, records: List[Dict[str, Any]]) -> int:
+        data: Dict[str, List[Any]] = {
+            c: [record.get(c) for record in records] for c in RECORD_COLUMNS
+        }
+        for name, type in self._columns.items():
+            values = [record["fields"].get(name) for record in records]
+            if type not in PARQUET_TYPES:
+                values = [
+                    None if v is None else self._codec.dumps(v).decode("utf-8")
+                    for v in values
+                ]
+            data[name] = values
+        self._writer.write_table(pyarrow.Table.from_pydict(data, schema=self._schema))
+        return 0
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+_WRITERS = {"ndjson": _NDJSONWriter, "csv": _CSVWriter, "parquet": _ParquetWriter}
+
+
+class TableExport(object):
+    """TableExport copies a whole table into one file per range of the split
+    field, ranges are fetched concurrently page by page and every page is
+    written to disk before the next one is requested, so memory stays at one
+    page per worker.
+
+    `manifest.json` in the export directory records the ranges, their files
+    and how many rows and bytes of each are complete. It is rewritten after
+    every page, an export started again on the same directory skips finished
+    ranges and continues the others from the last complete page.
+
+    Args:
+        path (str): export directory, created if missing
+        fetch (FetchPage): loads one page of a range
+        columns (Dict[str, Any]): field name (or id) to field type, in output order
+        format (str, optional): "ndjson", "csv" or "parquet". Defaults to "ndjson".
+        split_field (str, optional): sortable field the table is split on. Defaults to "create_time".
+        ranges (int, optional): number of ranges. Defaults to DEFAULT_EXPORT_RANGES.
+        concurrency (int, optional): ranges fetched at once. Defaults to DEFAULT_EXPORT_CONCURRENCY.
+        page_size (int, optional): records per request. Defaults to DEFAULT_EXPORT_PAGE_SIZE.
+        codec (JSONCodec, optional): json encoder of ndjson lines and nested values. Defaults to the default codec.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fetch: FetchPage,
+        columns: Dict[str, Any],
+        format: str = "ndjson",
+        split_field: str = "create_time",
+        ranges: int = DEFAULT_EXPORT_RANGES,
+        concurrency: int = DEFAULT_EXPORT_CONCURRENCY,
+        page_size: int = DEFAULT_EXPORT_PAGE_SIZE,
+        codec: Optional[JSONCodec] = None,
+    ) -> None:
+        if format not in EXPORT_FORMATS:
+            raise ValueError(
+                "invalid format {}, it should be one of {}".format(
+                    format, ", ".join(EXPORT_FORMATS)
+                )
+            )
+        if format == "parquet" and pyarrow is None:
+            raise ImportError(
+                "pyarrow is required for parquet export, install it with `pip install leapcell[parquet]`"
+            )
+        if page_size <= 0:
+            raise ValueError("page_size must be positive")
+        self._path = path
+        self._fetch = fetch
+        self._columns = columns
+        self._format = format
+        self._split_field = split_field
+        self._ranges = max(1, ranges)
+        self._concurrency = max(1, concurrency)
+        self._page_size = page_size
+        self._codec = get_codec(codec)
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Any] = {}
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self._path, MANIFEST_NAME)
+
+    def run(
+        self, bounds: Callable[[], Tuple[Any, Any]], resume: bool = True
+    ) -> Dict[str, Any]:
+        """export the table, `bounds` returns the lowest and highest value of
+        the split field and is only called when a new export starts
+
+        Raises:
+            LeapcellException: some ranges failed, run again to resume them
+
+        Returns:
+            Dict[str, Any]: the manifest
+        """
+        os.makedirs(self._path, exist_ok=True)
+        manifest = self._load_manifest() if resume else None
+        if manifest is None:
+            low, high = bounds()
+            manifest = self._new_manifest(low, high)
+        self._manifest = manifest
+        self._save_manifest()
+
+        pending = [r for r in manifest["ranges"] if not r["done"]]
+        errors: List[Exception] = []
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            for future in [executor.submit(self._export_range, r) for r in pending]:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise LeapcellException(
+                "export of {} ranges failed, run it again to resume, first error: {}".format(
+                    len(errors), errors[0]
+                )
+            )
+        with self._lock:
+            manifest["complete"] = True
+            manifest["rows"] = sum(r["rows"] for r in manifest["ranges"])
+        self._save_manifest()
+        return manifest
+
+    def _new_manifest(self, low: Any, high: Any) -> Dict[str, Any]:
+        # a table without split values is exported as one unbounded range
+        ranges = split_ranges(low, high, self._ranges)
+        for r in ranges:
+            r.update(
+                {
+                    "file": "part-{:05d}.{}".format(r["index"], self._format),
+                    "rows": 0,
+                    "bytes": 0,
+                    "done": False,
+                }
+            )
+        return {
+            "version": MANIFEST_VERSION,
+            "format": self._format,
+            "split_field": self._split_field,
+            "page_size": self._page_size,
+            "columns": self._columns,
+            "low": low,
+            "high": high,
+            "complete": False,
+            "rows": 0,
+            "ranges": ranges,
+        }
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise LeapcellException(
+                "bad export manifest {}: {}".format(self.manifest_path, e)
+            )
+        if (
+            manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("format") != self._format
+            or manifest.get("split_field") != self._split_field
+        ):
+            raise LeapcellException(
+                "export in {} was started with format {} split on {}, use another directory or resume=False".format(
+                    self._path, manifest.get("format"), manifest.get("split_field")
+                )
+            )
+        # pages of a resumed range must line up with the rows already written
+        self._page_size = manifest["page_size"]
+        self._columns = manifest["columns"]
+        return manifest
+
+    def _save_manifest(self) -> None:
+        with self._lock:
+            data = json.dumps(self._manifest, indent=2)
+            tmp = self.manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(data)
+            os.replace(tmp, self.manifest_path)
+
+    def _export_range(self, r: Dict[str, Any]) -> None:
+        if self._format == "parquet":
+            r["rows"] = 0
+            r["bytes"] = 0
+        path = os.path.join(self._path, r["file"])
+        writer = _WRITERS[self._format](path, r["bytes"], self._columns, self._codec)
+        try:
+            offset = r["rows"]
+            while True:
+                records = self._fetch(r, offset, self._page_size)
+                if records:
+                    size = writer.write(records)
+                    offset += len(records)
+                    with self._lock:
+                        r["rows"] = offset
+                        r["bytes"] = size
+                    self._save_manifest()
+                if len(records) < self._page_size:
+                    break
+        finally:
+            writer.close()
+        with self._lock:
+            r["done"] = True
+            if self._format == "parquet":
+                r["bytes"] = os.path.getsize(path)
+        self._save_manifest()
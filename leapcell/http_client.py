@@ -1,12 +1,28 @@
-from typing import Dict, Any, Union, List, Optional, Tuple
+from typing import Dict, Any, Union, List, Optional, Tuple, Iterator
 import os
-from leapcell.exp import LeapcellException
+from leapcell.exp import LeapcellException, LeapcellRequestError
 from leapcell.version import VERSION
 import urllib.parse
 from functools import reduce
 from leapcell.utils import multi_urljoin, build_header
 from leapcell.file import LeapcellFile
-from io import BytesIO
+from leapcell.cache import TTLCache, LRUCache, UploadCache
+from leapcell.singleflight import SingleFlight
+from leapcell.retry import RetryPolicy
+from leapcell.throttle import TokenBucket, AdaptiveConcurrency
+from leapcell.codec import JSONCodec, get_codec, encode_body
+from leapcell.compress import RequestCompression
+from leapcell.stream import JSONArrayStream, STREAM_CHUNK_SIZE
+from leapcell.layout import FieldLayouts
+from leapcell.upload import UploadSource, UploadData, MultipartBody, Progress
+from leapcell.trace import (
+    RequestHook,
+    RequestTrace,
+    TRACED_POOL_CLASSES,
+    set_current_trace,
+)
+import socket
+import time
 import urllib3
 import json
 
@@ -19,12 +35,58 @@ MAX_CONNECTION_RETRIES = 2
 TIMEOUT_SECS = 600
 FILE_UPLOAD_TIMEOUT = 600
 FILE_UPLOAD_MAX_SIZE = 1024 * 1024 * 3
+DEFAULT_NUM_POOLS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def new_pool_manager(
+    num_pools: int = DEFAULT_NUM_POOLS,
+    maxsize: int = DEFAULT_POOL_MAXSIZE,
+    block: bool = False,
+    keep_alive: bool = True,
+) -> urllib3.PoolManager:
+    """new_pool_manager creates the connection pool shared by HTTPClient instances.
+
+    Args:
+        num_pools (int, optional): number of per-host pools to keep. Defaults to DEFAULT_NUM_POOLS.
+        maxsize (int, optional): connections kept open per host. Defaults to DEFAULT_POOL_MAXSIZE.
+        block (bool, optional): if True, maxsize is a hard per-host limit and callers wait for a free connection. Defaults to False.
+        keep_alive (bool, optional): enable TCP keep-alive on pooled sockets. Defaults to True.
+
+    Returns:
+        urllib3.PoolManager: pool manager
+    """
+    socket_options = list(urllib3.connection.HTTPConnection.default_socket_options)
+    if keep_alive:
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    pool = urllib3.PoolManager(
+        num_pools=num_pools,
+        maxsize=maxsize,
+        block=block,
+        socket_options=socket_options,
+    )
+    # connections time their phases for request hooks, untraced requests are unaffected
+    pool.pool_classes_by_scheme = TRACED_POOL_CLASSES
+    return pool
+
+
+def _connect_failed(error: Exception) -> bool:
+    """whether urllib3 gave up opening the connection, the request was never sent"""
+    # connection retries end in a MaxRetryError with the last error as reason
+    reason = getattr(error, "reason", error)
+    return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
 
 
 def endpoint(resource: str, table_id: str, version="v1", name_type="id") -> str:
     return multi_urljoin("/api/", version + "/", resource + "/", "/table/", table_id)
 
 
+# record/{x} paths that are actions, not record ids
+RECORD_ACTIONS = ("query", "search", "metrics")
+
+
 class HTTPClient(object):
     def __init__(
         self,
@@ -34,14 +96,59 @@ class HTTPClient(object):
         table_id: str,
         version="v1",
         name_type="id",
+        pool: Optional[urllib3.PoolManager] = None,
+        meta_cache: Optional[TTLCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrency] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+        hooks: Optional[List[RequestHook]] = None,
     ) -> None:
         self._base_url = base_url
         self._api_key = api_key
         self._url_prefix = endpoint(
             resource, table_id, version=version, name_type=name_type
         )
+        self._resource = resource
         self._table_id = table_id
         self._name_type = name_type
+        self._owns_pool = pool is None
+        self._pool = pool if pool is not None else self._new_pool()
+        self._meta_cache = meta_cache
+        self._record_cache: Optional[LRUCache] = None
+        self._upload_cache: Optional[UploadCache] = None
+        self._single_flight = single_flight
+        self._retry_policy = retry_policy
+        self._rate_limiter = rate_limiter
+        self._concurrency_limiter = concurrency_limiter
+        self._codec = get_codec(codec)
+        self._compression = compression
+        # shared with the client, hooks added later apply to every table
+        self._hooks = hooks if hooks is not None else []
+        self.write_behind: Optional[Any] = None
+        self.field_layouts = FieldLayouts()
+
+    @property
+    def name_type(self) -> str:
+        return self._name_type
+
+    @property
+    def codec(self) -> JSONCodec:
+        return self._codec
+
+    @property
+    def hooks(self) -> List[RequestHook]:
+        return self._hooks
+
+    def _new_pool(self) -> Any:
+        return new_pool_manager()
+
+    def close(self) -> None:
+        """close the connection pool, only if it is owned by this client"""
+        if self._owns_pool:
+            self._pool.clear()
 
     def _request(
         self,
@@ -49,83 +156,295 @@ class HTTPClient(object):
         method: str,
         data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
         params: Optional[Dict[str, Any]] = None,
-        files: Optional[
-            Dict[str, Tuple[str, BytesIO]] | List[Tuple[str, BytesIO]]
-        ] = None,
+        files: Optional[List[Tuple[str, UploadSource]]] = None,
+        read_only: bool = False,
+        generation: Optional[int] = None,
+    ) -> Any:
+        url = self._build_url(url_path, params)
+        single_flight = self._single_flight
+        if single_flight is None:
+            return self._send(method, url, data, files, read_only)
+        if not read_only:
+            try:
+                return self._send(method, url, data, files, read_only)
+            finally:
+                # reads from now on see the write, failed or not
+                single_flight.written()
+
+        # identical reads in flight share one network call and one parsed result,
+        # only with reads started after the same writes, and reads for the
+        # record cache only with reads of the same cache generation
+        key = "{} @{}".format(self._request_key(method, url, data), single_flight.generation)
+        if generation is not None:
+            key = "{} #{}".format(key, generation)
+        return single_flight.do(
+            key,
+            lambda: self._send(method, url, data, files, read_only),
+        )
+
+    def _endpoint_template(self, url: str) -> str:
+        """url template of a request, e.g. /table/{table_id}/record/{record_id}"""
+        path = urllib.parse.urlsplit(url).path
+        if path.startswith(self._url_prefix):
+            path = path[len(self._url_prefix) :]
+        parts = [part for part in path.split("/") if part]
+        if len(parts) == 2 and parts[0] == "record" and parts[1] not in RECORD_ACTIONS:
+            parts[1] = "{record_id}"
+        return "/".join(["/table/{table_id}"] + parts)
+
+    def _new_trace(self, method: str, url: str) -> RequestTrace:
+        return RequestTrace(
+            method, self._endpoint_template(url), self._resource, self._table_id, url
+        )
+
+    def _finish_trace(self, trace: RequestTrace, response: Any = None) -> None:
+        now = time.perf_counter()
+        if response is not None:
+            trace.response_bytes = response.tell()
+            if trace._headers and not trace.body:
+                trace.body = now - trace._headers
+        trace.duration = now - trace._started
+        for hook in self._hooks:
+            hook.after_request(trace)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
+        files: Optional[List[Tuple[str, UploadSource]]] = None,
+        read_only: bool = False,
+        progress: Optional[Progress] = None,
+    ) -> Any:
+        response = self._urlopen(method, url, data, files, read_only, progress=progress)
+        return self._parse_response(response.status, response.data)
+
+    def _urlopen(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
+        files: Optional[List[Tuple[str, UploadSource]]] = None,
+        read_only: bool = False,
+        preload_content: bool = True,
+        progress: Optional[Progress] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Any:
+        """send a request with retries. With hooks, a preloaded request is
+        traced here, a streamed one by the caller passing `trace`, which
+        finishes it once the body is read."""
+        headers = self._build_header()
+        body: Any = None
+        if data is not None:
+            body = data_bytes = encode_body(self._codec, data)
+            if self._compression is not None and self._compression.applies(body):
+                # compressed while it is sent, the json is the only full copy
+                headers["Content-Encoding"] = self._compression.encoding
+                body = self._compression.compress(body)
+        elif files:
+            # streamed from the sources chunk by chunk, file content is never copied
+            body = MultipartBody(files, progress)
+            headers.update(body.headers)
+
+        if trace is None and preload_content and self._hooks:
+            trace = self._new_trace(method, url)
+        if trace is None:
+            return self._attempts(method, url, headers, body, read_only, preload_content)
+        if isinstance(body, MultipartBody):
+            trace.request_bytes = body.length
+        elif body is not None:
+            trace.request_bytes = len(data_bytes)
+        for hook in self._hooks:
+            hook.before_request(trace)
+        try:
+            response = self._attempts(
+                method, url, headers, body, read_only, preload_content, trace
+            )
+        except Exception as e:
+            trace.error = e
+            self._finish_trace(trace)
+            raise
+        if preload_content:
+            self._finish_trace(trace, response)
+        return response
+
+    def _attempts(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        body: Any,
+        read_only: bool,
+        preload_content: bool,
+        trace: Optional[RequestTrace] = None,
     ) -> Any:
         # use urllib3 instead of requests to avoid requests dependency
-        client = urllib3.PoolManager()
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        client = self._pool
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+            started = 0.0
+            if self._concurrency_limiter is not None:
+                started = self._concurrency_limiter.acquire()
+            if trace is not None:
+                trace._reset_attempt()
+                trace.retries = attempt - 1
+                set_current_trace(trace)
+            try:
+                response = client.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    timeout=TIMEOUT_SECS,
+                    retries=urllib3.Retry(MAX_CONNECTION_RETRIES, redirect=2),
+                    body=body,
+                    preload_content=preload_content,
+                )
+            except urllib3.exceptions.HTTPError as e:
+                self._release(started, error=True)
+                raise LeapcellRequestError(
+                    "http error, http error: {}".format(e), sent=not _connect_failed(e)
+                )
+            except Exception as e:
+                self._release(started, error=True)
+                raise LeapcellException("unknown error, error: {}".format(e))
+            finally:
+                if trace is not None:
+                    set_current_trace(None)
+            self._release(started, status=response.status)
+            if trace is not None:
+                trace.status = response.status
+                if preload_content and trace._headers:
+                    trace.body = time.perf_counter() - trace._headers
+
+            policy = self._retry_policy
+            if policy is not None and policy.should_retry(
+                method, response.status, attempt, read_only
+            ):
+                if not preload_content:
+                    response.drain_conn()
+                    response.release_conn()
+                time.sleep(policy.backoff(attempt, response.headers.get("Retry-After")))
+                continue
+            return response
 
+    def _stream_records(self, url_path: str, data: Dict[str, Any]) -> Iterator[Any]:
+        """send a query and yield the raw records of the response as they are
+        decoded from the socket, the body is never held in memory as a whole.
+        Streamed reads are not coalesced with identical concurrent reads."""
+        url = self._build_url(url_path, None)
+        trace = self._new_trace("POST", url) if self._hooks else None
+        response = self._urlopen(
+            "POST",
+            url,
+            data,
+            read_only=True,
+            preload_content=False,
+            trace=trace,
+        )
+        try:
+            if response.status != 200:
+                self._parse_response(response.status, response.read())
+            yield from JSONArrayStream(response.stream(STREAM_CHUNK_SIZE))
+        except KeyError as e:
+            if trace is not None:
+                trace.error = e
+            # an error-shaped body, the whole response was read to find out
+            raise LeapcellRequestError(
+                "bad request, http code {}, {}".format(response.status, e.args[0]),
+                status=response.status,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            if trace is not None:
+                trace.error = e
+            raise LeapcellRequestError("http error, http error: {}".format(e))
+        except ValueError as e:
+            if trace is not None:
+                trace.error = e
+            raise LeapcellException("bad response, body is not json, {}".format(e))
+        finally:
+            response.release_conn()
+            if trace is not None:
+                self._finish_trace(trace, response)
+
+    def _release(
+        self, started: float, status: Optional[int] = None, error: bool = False
+    ) -> None:
+        if self._concurrency_limiter is not None:
+            self._concurrency_limiter.release(started, status=status, error=error)
+
+    def _build_url(self, url_path: str, params: Optional[Dict[str, Any]]) -> str:
         url = urllib.parse.urljoin(self._base_url, url_path)
         if params is not None:
             query_string = urllib.parse.urlencode(params)
             url = url + "?" + query_string
+        return url
 
-        fields = None
-        if isinstance(files, dict):
-            fields = {
-                "file": (files["file"][0], files["file"][1].getbuffer().tobytes()),
-            }
-        elif isinstance(files, list):
-            fields = [("files", (f[0], f[1].getbuffer().tobytes())) for f in files]
-
-        body = None
+    @staticmethod
+    def _request_key(method: str, url: str, data: Any) -> str:
+        body = ""
         if data is not None:
-            body = json.dumps(data)
+            body = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return "{} {} {}".format(method, url, body)
 
+    def _build_header(self) -> Dict[str, str]:
         headers = build_header(self._api_key)
-        for k, v in build_header(self._api_key).items():
-            headers[k] = v
         headers["Accept-Encoding"] = "gzip"
+        return headers
 
+    def _parse_response(self, status: int, data: bytes) -> Any:
         try:
-            response = client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                timeout=TIMEOUT_SECS,
-                retries=urllib3.Retry(MAX_CONNECTION_RETRIES, redirect=2),
-                fields=fields,
-                body=body,
-            )
-        except urllib3.exceptions.HTTPError as e:
-            raise LeapcellException("http error, http error: {}".format(e))
-        except urllib3.exceptions.TimeoutError as e:
-            raise LeapcellException("timeout error, error: {}".format(e))
-        except urllib3.exceptions.ConnectionError as e:
-            raise LeapcellException("connection error, error: {}".format(e))
-        except Exception as e:
-            raise LeapcellException("unknown error, error: {}".format(e))
-
-        try:
-            body_json = json.loads(response.data)
+            body_json = self._codec.loads(data)
         except ValueError:
-            raise LeapcellException(
+            raise LeapcellRequestError(
                 "bad response, body is not json, http code {}, body: {}".format(
-                    response.status, response.data
-                )
+                    status, data
+                ),
+                status=status,
             )
-        if response.status != 200:
-            raise LeapcellException(
+        if status != 200:
+            raise LeapcellRequestError(
                 "bad request, http code {}, please check apitoken and params, error code: {}, hint: {}".format(
-                    response.status,
+                    status,
                     body_json.get("code", ""),
                     body_json.get("error", ""),
-                )
+                ),
+                status=status,
             )
 
         if "data" not in body_json:
-            raise LeapcellException(
+            raise LeapcellRequestError(
                 "bad request, http code {}, please check apitoken and params, error code: {}, hint: {}".format(
-                    response.status,
+                    status,
                     body_json.get("code", ""),
                     body_json.get("error", ""),
-                )
+                ),
+                status=status,
             )
         return body_json["data"]
 
     def table_meta(self) -> Any:
+        if self._meta_cache is None:
+            return self._table_meta()
+        key = self._meta_cache_key()
+        data = self._meta_cache.get(key)
+        if data is None:
+            data = self._table_meta()
+            self._meta_cache.set(key, data)
+        return data
+
+    def invalidate_table_meta(self) -> None:
+        if self._meta_cache is not None:
+            self._meta_cache.invalidate(self._meta_cache_key())
+
+    def _meta_cache_key(self) -> str:
+        return "{}{}?name_type={}".format(
+            self._base_url, self._url_prefix, self._name_type
+        )
+
+    def _table_meta(self) -> Any:
         name_type = self._name_type
         return self._request(
             url_path="{}".format(self._url_prefix),
@@ -133,6 +452,7 @@ class HTTPClient(object):
             params={
                 "name_type": name_type,
             },
+            read_only=True,
         )
 
     def create_record(self, data: Dict) -> Dict[str, Any]:
@@ -151,13 +471,54 @@ class HTTPClient(object):
             data=data,
         )
 
+    def set_record_cache(self, cache: Optional[LRUCache]) -> None:
+        self._record_cache = cache
+
+    def set_upload_cache(self, cache: Optional[UploadCache]) -> None:
+        self._upload_cache = cache
+
+    def verify_file(self, file: Dict[str, Any]) -> bool:
+        """whether the link of an uploaded file still resolves"""
+        link = file.get("link")
+        if not link:
+            return False
+        try:
+            response = self._pool.request(
+                "HEAD", link, timeout=TIMEOUT_SECS, retries=False, redirect=True
+            )
+        except urllib3.exceptions.HTTPError:
+            return False
+        return response.status < 400
+
+    def _invalidate_record(self, record_id: Optional[str] = None) -> None:
+        if self._record_cache is not None:
+            self._record_cache.invalidate(record_id)
+
     def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        if self._record_cache is None:
+            return self._get_record(record_id)
+        data = self._record_cache.get(record_id)
+        if data is None:
+            # an update that finishes while the record is fetched makes it stale
+            generation = self._record_cache.generation
+            data = self._get_record(record_id, generation)
+            if data:
+                self._record_cache.set(
+                    record_id, data, len(self._codec.dumps(data)), generation
+                )
+        return data
+
+    def _get_record(
+        self, record_id: str, generation: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
         return self._request(
             url_path="{}/record/{}".format(self._url_prefix, record_id),
             method="GET",
             params={
                 "name_type": self._name_type,
             },
+            read_only=True,
+            generation=generation,
         )
 
     def get_records(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -166,39 +527,57 @@ class HTTPClient(object):
             url_path="{}/record/query".format(self._url_prefix),
             method="POST",
             data=data,
+            read_only=True,
         )
 
+    def stream_records(self, data: Dict[str, Any]) -> Iterator[Any]:
+        data["name_type"] = self._name_type
+        return self._stream_records("{}/record/query".format(self._url_prefix), data)
+
     def update_records(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         data["name_type"] = self._name_type
-        return self._request(
+        # a filter may match any cached record
+        self._invalidate_record()
+        resp = self._request(
             url_path="{}/record".format(self._url_prefix),
             method="PUT",
             data=data,
         )
+        self._invalidate_record()
+        return resp
 
     def update_record(
         self, record_id: str, data: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
         data["name_type"] = self._name_type
-        return self._request(
+        self._invalidate_record(record_id)
+        resp = self._request(
             url_path="{}/record/{}".format(self._url_prefix, record_id),
             method="PUT",
             data=data,
         )
+        self._invalidate_record(record_id)
+        return resp
 
     def delete_records(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         data["name_type"] = self._name_type
-        return self._request(
+        self._invalidate_record()
+        resp = self._request(
             url_path="{}/record".format(self._url_prefix),
             method="DELETE",
             data=data,
         )
+        self._invalidate_record()
+        return resp
 
     def delete_record(self, record_id) -> Optional[Dict[str, Any]]:
-        return self._request(
+        self._invalidate_record(record_id)
+        resp = self._request(
             url_path="{}/record/{}".format(self._url_prefix, record_id),
             method="DELETE",
         )
+        self._invalidate_record(record_id)
+        return resp
 
     def aggr_record(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         data["name_type"] = self._name_type
@@ -206,6 +585,7 @@ class HTTPClient(object):
             url_path="{}/record/metrics".format(self._url_prefix),
             method="POST",
             data=data,
+            read_only=True,
         )
 
     def search(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -214,46 +594,53 @@ class HTTPClient(object):
             url_path="{}/record/search".format(self._url_prefix),
             method="POST",
             data=data,
+            read_only=True,
         )
 
+    def stream_search(self, data: Dict[str, Any]) -> Iterator[Any]:
+        data["name_type"] = self._name_type
+        return self._stream_records("{}/record/search".format(self._url_prefix), data)
+
     def upload(
-        self, data: bytes | List[bytes], filename: Optional[str] = None
+        self, data: UploadData | List[UploadData], filename: Optional[str] = None
     ) -> LeapcellFile | List[LeapcellFile]:
-        if isinstance(data, bytes):
-            return self._upload(BytesIO(data), filename)
-        elif isinstance(data, list):
-            return self._upload_multi([BytesIO(d) for d in data])
-        else:
-            raise TypeError("invalid data {}, which should be byteIO".format(data))
-
-    def _upload(self, file: BytesIO, filename: Optional[str]) -> LeapcellFile:
-        if file.getbuffer().nbytes > FILE_UPLOAD_MAX_SIZE:
+        if isinstance(data, list):
+            return self._upload_multi([UploadSource(d, "files") for d in data])
+        return self._upload(UploadSource(data, filename))
+
+    def _upload(
+        self, source: UploadSource, progress: Optional[Progress] = None
+    ) -> LeapcellFile:
+        if source.size > FILE_UPLOAD_MAX_SIZE:
             raise LeapcellException("file is too large, file should be less than 5KB")
-        if filename is not None:
-            files = {"file": (filename, file)}
-        else:
-            files = {"file": ("file", file)}
-        r = self._request(
-            url_path="{}/{}".format(self._url_prefix, "upload"),
-            method="POST",
-            files=files,
+        cache = self._upload_cache
+        if cache is not None:
+            # files of a resource are shared by its tables
+            key = "{}/{}".format(self._resource, source.digest())
+            cached = cache.get(key)
+            if cached is not None:
+                return LeapcellFile(cached)
+        response = self._send(
+            "POST",
+            self._build_url("{}/{}".format(self._url_prefix, "upload"), None),
+            files=[("file", source)],
+            progress=progress,
         )
-        response = r
         image_item = LeapcellFile(response.get("file", {}))
+        if cache is not None and image_item.id():
+            cache.set(key, image_item.tojson())
         return image_item
 
-    def _upload_multi(self, files: List[BytesIO]) -> List[LeapcellFile]:
-        upload_files = []
-        for f in files:
-            if f.getbuffer().nbytes > FILE_UPLOAD_MAX_SIZE:
+    def _upload_multi(self, sources: List[UploadSource]) -> List[LeapcellFile]:
+        for source in sources:
+            if source.size > FILE_UPLOAD_MAX_SIZE:
                 raise LeapcellException(
                     "file is too large, file should be less than 5KB"
                 )
-            upload_files.append(("files", (f)))
         r = self._request(
             url_path="{}/{}".format(self._url_prefix, "upload_multi"),
             method="POST",
-            files=upload_files,
+            files=[("files", source) for source in sources],
         )
         response = r
         image_item = [LeapcellFile(item) for item in response.get("files", [])]
@@ -0,0 +1,397 @@
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple, BinaryIO
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import csv
+import json
+import os
+from leapcell.exp import LeapcellException
+from leapcell.codec import JSONCodec, get_codec
+from leapcell.schema import Schema, ValidationError
+from leapcell.export import RECORD_COLUMNS
+from leapcell.bulk import (
+    BatchResult,
+    _send_with_retry,
+    batch_retryable,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_BYTES,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BATCH_RETRIES,
+)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+IMPORT_EXTENSIONS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+# bytes read from the file at once, lines are cut out of each chunk
+IMPORT_CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_SUFFIX = ".import.json"
+CHECKPOINT_VERSION = 1
+
+# (records, byte offset right after the last one, their size in the file)
+Batch = Tuple[List[Dict[str, Any]], int, int]
+
+
+def guess_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in IMPORT_EXTENSIONS:
+        raise ValueError(
+            "can not tell the format of {}, pass one of {}".format(
+                path, ", ".join(IMPORT_FORMATS)
+            )
+        )
+    return IMPORT_EXTENSIONS[ext]
+
+
+def read_lines(
+    file: BinaryIO, offset: int, chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[Tuple[bytes, int]]:
+    """lines of a file from `offset` with the byte offset after each, the file
+    is read in chunks so only one chunk and one line are held at a time"""
+    file.seek(offset)
+    pos = offset  # offset of data[0]
+    rest = b""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        data = rest + chunk if rest else chunk
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            yield data[start : end + 1], pos + end + 1
+            start = end + 1
+        pos += start
+        rest = data[start:]
+    if rest:
+        yield rest, pos + len(rest)
+
+
+def _csv_lines(file: BinaryIO, offset: int) -> Iterator[Tuple[str, int, int]]:
+    # a quoted value may span lines, a row is complete once its quotes are balanced
+    parts: List[bytes] = []
+    quotes = 0
+    end = offset
+    for line, end in read_lines(file, offset):
+        parts.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2:
+            continue
+        text = b"".join(parts)
+        parts = []
+        quotes = 0
+        if text.strip():
+            yield text.decode("utf-8"), end, len(text)
+    if parts:
+        text = b"".join(parts)
+        yield text.decode("utf-8"), end, len(text)
+
+
+def _parse_int(text: str) -> Any:
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _parse_float(text: str) -> Any:
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _parse_list(text: str) -> Any:
+    # lists are written as json by export()
+    if text.startswith("["):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+
+# csv cells are text, values the schema would reject are left as text so
+# they are reported with the row and field
+CSV_PARSERS: Dict[str, Callable[[str], Any]] = {
+    "INT_NUMBER": _parse_int,
+    "TIME": _parse_int,
+    "FLOAT_NUMBER": _parse_float,
+    "LABELS": _parse_list,
+    "IMAGES": _parse_list,
+}
+
+
+class FileImport(object):
+    """FileImport creates the records of an NDJSON or CSV file in concurrent
+    batches. The file is read chunk by chunk, so at most 2 * concurrency
+    batches are held whatever the file size, every batch is coerced with the
+    table schema before it is sent.
+
+    Progress is checkpointed to a sidecar file next to the input: the byte
+    offset and row count up to which every batch was created. An import run
+    again on the same file continues from that offset. Batches sent after a
+    failed one may be sent again on resume, pass `on_conflict` to the send
+    callback to make that harmless.
+
+    NDJSON lines hold the fields of one record, lines written by export()
+    (with record_id and fields) are accepted too. CSV files start with a
+    header of field names, empty cells are left out and the record_id,
+    create_time and update_time columns of export() are ignored.
+
+    Args:
+        path (str): file to import
+        send (Callable[[List[Dict[str, Any]]], Any]): creates one batch of records
+        schema (Schema): schema of the table, records are coerced with it
+        field_types (Dict[str, Any]): field name (or id) to field type, used to parse csv cells
+        format (Optional[str], optional): "ndjson" or "csv". Defaults to the file extension.
+        batch_size (int, optional): max records per request. Defaults to DEFAULT_BATCH_SIZE.
+        max_batch_bytes (int, optional): max file bytes per request. Defaults to DEFAULT_BATCH_BYTES.
+        concurrency (int, optional): batches sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+        max_retries (int, optional): retries of a failed batch. Defaults to DEFAULT_BATCH_RETRIES.
+        retryable (Callable[[Exception], bool], optional): whether a batch error may be retried. Defaults to batch_retryable, retrying only batches that were not processed.
+        checkpoint_path (Optional[str], optional): sidecar file. Defaults to path + CHECKPOINT_SUFFIX.
+        codec (JSONCodec, optional): decoder of ndjson lines. Defaults to the default codec.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        send: Callable[[List[Dict[str, Any]]], Any],
+        schema: Schema,
+        field_types: Dict[str, Any],
+        format: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        retryable: Callable[[Exception], bool] = batch_retryable,
+        checkpoint_path: Optional[str] = None,
+        codec: Optional[JSONCodec] = None,
+    ) -> None:
+        if format is None:
+            format = guess_format(path)
+        if format not in IMPORT_FORMATS:
+            raise ValueError(
+                "invalid format {}, it should be one of {}".format(
+                    format, ", ".join(IMPORT_FORMATS)
+                )
+            )
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        self._path = path
+        self._send = send
+        self._schema = schema
+        self._field_types = field_types
+        self._format = format
+        self._batch_size = batch_size
+        self._max_batch_bytes = max_batch_bytes
+        self._concurrency = max(1, concurrency)
+        self._max_retries = max_retries
+        self._retryable = retryable
+        self._codec = get_codec(codec)
+        self.checkpoint_path = checkpoint_path or path + CHECKPOINT_SUFFIX
+
+    def run(self, resume: bool = True) -> Dict[str, Any]:
+        """import the file, from the checkpoint if there is one
+
+        Raises:
+            ValidationError: records do not match the schema, rows are numbered from the start of the file
+            LeapcellException: a line is not valid json, a batch failed or the file changed since the checkpoint, import again to resume
+
+        Returns:
+            Dict[str, Any]: the checkpoint, `rows` records were created from the first `offset` bytes
+        """
+        stat = os.stat(self._path)
+        state = self._load_checkpoint(stat) if resume else None
+        if state is None:
+            state = {
+                "version": CHECKPOINT_VERSION,
+                "format": self._format,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "offset": 0,
+                "rows": 0,
+                "complete": False,
+            }
+            self._save_checkpoint(state)
+        if state["complete"]:
+            return state
+
+        # batches done out of order wait here until all earlier ones are done
+        done: Dict[int, Tuple[int, int]] = {}
+        next_index = 0
+        failed: List[BatchResult] = []
+        # an invalid record, or a line that could not be read, stops the import
+        # once the batches already sent are done and checkpointed
+        invalid: Optional[Exception] = None
+        row = state["rows"]
+
+        def collect(futures: Any) -> None:
+            nonlocal next_index
+            for future in futures:
+                result, end = pending.pop(future)
+                if result.ok:
+                    done[result.index] = (end, result.size)
+                else:
+                    failed.append(result)
+            moved = False
+            while next_index in done:
+                end, size = done.pop(next_index)
+                state["offset"] = end
+                state["rows"] += size
+                next_index += 1
+                moved = True
+            if moved:
+                self._save_checkpoint(state)
+
+        pending: Dict[Any, Tuple[BatchResult, int]] = {}
+        batches = enumerate(self._batches(state["offset"]))
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            while not failed:
+                try:
+                    index, (records, end, _) = next(batches)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    invalid = e
+                    break
+                try:
+                    records = self._schema.coerce(records)
+                except ValidationError as e:
+                    invalid = ValidationError(
+                        [(row + r, field, message) for r, field, message in e.errors],
+                        e.count,
+                    )
+                    break
+                result = BatchResult(index, row, len(records))
+                row += len(records)
+                future = executor.submit(
+                    _send_with_retry,
+                    self._send,
+                    records,
+                    result,
+                    self._max_retries,
+                    self._retryable,
+                )
+                pending[future] = (result, end)
+                if len(pending) >= 2 * self._concurrency:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(wait(pending).done)
+
+        if invalid is not None:
+            raise invalid
+        if failed:
+            failed.sort(key=lambda r: r.index)
+            raise LeapcellException(
+                "import of {} stopped at byte {} after {} records, batch starting at record {} failed: {}".format(
+                    self._path, state["offset"], state["rows"], failed[0].start, failed[0].error
+                )
+            )
+        state["complete"] = True
+        self._save_checkpoint(state)
+        return state
+
+    def _batches(self, offset: int) -> Iterator[Batch]:
+        records: List[Dict[str, Any]] = []
+        batch_bytes = 0
+        end = offset
+        for record, record_end, size in self._records(offset):
+            if records and (
+                len(records) >= self._batch_size
+                or batch_bytes + size > self._max_batch_bytes
+            ):
+                yield records, end, batch_bytes
+                records = []
+                batch_bytes = 0
+            records.append(record)
+            batch_bytes += size
+            end = record_end
+        if records:
+            yield records, end, batch_bytes
+
+    def _records(self, offset: int) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+        with open(self._path, "rb") as file:
+            if self._format == "csv":
+                yield from self._csv_records(file, offset)
+            else:
+                yield from self._ndjson_records(file, offset)
+
+    def _ndjson_records(
+        self, file: BinaryIO, offset: int
+    ) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+        loads = self._codec.loads
+        for line, end in read_lines(file, offset):
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except ValueError as e:
+                raise LeapcellException(
+                    "invalid json at byte {} of {}: {}".format(
+                        end - len(line), self._path, e
+                    )
+                )
+            if not isinstance(record, dict):
+                raise LeapcellException(
+                    "invalid record at byte {} of {}, it should be a json object".format(
+                        end - len(line), self._path
+                    )
+                )
+            if "record_id" in record and isinstance(record.get("fields"), dict):
+                record = record["fields"]
+            yield record, end, len(line)
+
+    def _csv_records(
+        self, file: BinaryIO, offset: int
+    ) -> Iterator[Tuple[Dict[str, Any], int, int]]:
+        # the header is read again on resume
+        lines = _csv_lines(file, 0)
+        first = next(lines, None)
+        if first is None:
+            return
+        text, header_end, _ = first
+        header = next(csv.reader([text.lstrip("\ufeff")]))
+        if offset > header_end:
+            lines = _csv_lines(file, offset)
+        columns = [
+            (i, name, CSV_PARSERS.get(self._field_types.get(name)))
+            for i, name in enumerate(header)
+            if name not in RECORD_COLUMNS
+        ]
+        for text, end, size in lines:
+            cells = next(csv.reader([text]))
+            record: Dict[str, Any] = {}
+            for i, name, parse in columns:
+                if i >= len(cells) or cells[i] == "":
+                    continue
+                record[name] = parse(cells[i]) if parse else cells[i]
+            yield record, end, size
+
+    def _load_checkpoint(self, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise LeapcellException(
+                "bad import checkpoint {}: {}".format(self.checkpoint_path, e)
+            )
+        if (
+            state.get("version") != CHECKPOINT_VERSION
+            or state.get("format") != self._format
+            or state.get("size") != stat.st_size
+            or state.get("mtime") != stat.st_mtime
+        ):
+            raise LeapcellException(
+                "{} changed since the import checkpoint {} was written, import with resume=False to start over".format(
+                    self._path, self.checkpoint_path
+                )
+            )
+        return state
+
+    def _save_checkpoint(self, state: Dict[str, Any]) -> None:
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint_path)
@@ -0,0 +1,59 @@
+from typing import Dict, FrozenSet, Iterable, Tuple
+import sys
+import threading
+
+# distinct field sets remembered per table, e.g. select() projections
+MAX_FIELD_LAYOUTS = 256
+
+
+class FieldLayout(object):
+    """interned field names of a record shape, records store their values
+    positionally in this order and share one FieldLayout per shape"""
+
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names: Tuple[str, ...] = tuple(sys.intern(name) for name in names)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+
+class FieldLayouts(object):
+    """FieldLayouts hands out one shared FieldLayout per set of field names of
+    a table. The layout of the table meta is registered when the meta is
+    loaded, records with all fields then share it whatever order the server
+    sent the fields in.
+
+    Args:
+        max_layouts (int, optional): shapes remembered, later shapes get an unshared layout. Defaults to MAX_FIELD_LAYOUTS.
+    """
+
+    def __init__(self, max_layouts: int = MAX_FIELD_LAYOUTS) -> None:
+        self._max_layouts = max_layouts
+        self._lock = threading.Lock()
+        # exact key order seen on the wire -> layout, the hot path
+        self._by_keys: Dict[Tuple[str, ...], FieldLayout] = {}
+        self._by_set: Dict[FrozenSet[str], FieldLayout] = {}
+
+    def register(self, names: Iterable[str]) -> FieldLayout:
+        """layout shared by every record with exactly these fields"""
+        layout = FieldLayout(names)
+        with self._lock:
+            return self._by_set.setdefault(frozenset(layout.names), layout)
+
+    def layout(self, keys: Tuple[str, ...]) -> FieldLayout:
+        layout = self._by_keys.get(keys)
+        if layout is not None:
+            return layout
+        with self._lock:
+            names = frozenset(keys)
+            layout = self._by_set.get(names)
+            if layout is None:
+                layout = FieldLayout(keys)
+                if len(self._by_set) < self._max_layouts:
+                    self._by_set[names] = layout
+            if len(self._by_keys) < self._max_layouts:
+                self._by_keys[keys] = layout
+        return layout
+
+    def __len__(self) -> int:
+        return len(self._by_set)
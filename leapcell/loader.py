@@ -0,0 +1,71 @@
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import Future
+import threading
+
+AUTO_BATCH_WINDOW_SECS = 0.002
+AUTO_BATCH_MAX_SIZE = 100
+
+
+class RecordLoader(object):
+    """RecordLoader collects record ids requested from many threads within a
+    short window and loads them with one `fetch` call, DataLoader style.
+
+    Args:
+        fetch (Callable[[List[str]], Dict[str, Any]]): loads the given ids, returns raw records by id
+        window (float, optional): seconds to wait for more ids after the first one. Defaults to AUTO_BATCH_WINDOW_SECS.
+        max_batch (int, optional): ids that trigger a fetch before the window ends. Defaults to AUTO_BATCH_MAX_SIZE.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[str]], Dict[str, Any]],
+        window: float = AUTO_BATCH_WINDOW_SECS,
+        max_batch: int = AUTO_BATCH_MAX_SIZE,
+    ) -> None:
+        self._fetch = fetch
+        self._window = window
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Future]] = {}
+        self._timer: Optional[threading.Timer] = None
+
+    def load(self, id: str) -> Optional[Any]:
+        future: Future = Future()
+        batch = None
+        with self._lock:
+            self._pending.setdefault(id, []).append(future)
+            if len(self._pending) >= self._max_batch:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future.result()
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _take(self) -> Dict[str, List[Future]]:
+        batch = self._pending
+        self._pending = {}
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _dispatch(self, batch: Dict[str, List[Future]]) -> None:
+        try:
+            found = self._fetch(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        for id, futures in batch.items():
+            for future in futures:
+                future.set_result(found.get(id))
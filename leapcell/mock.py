@@ -0,0 +1,723 @@
+"""In-memory Leapcell server for offline development, tests and benchmarks.
+
+It implements the endpoints used by `HTTPClient`: table meta, record create,
+get, update and delete, query, metrics, search, upload and upload_multi, with
+the filter grammar built by `KaithQuery._get_filter`. Latency and errors
+can be injected to exercise retries, rate limiting and timeouts."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple, Union, Iterable, Callable
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+# record attributes that can be filtered and ordered on like fields
+RECORD_ATTRIBUTES = ("record_id", "create_time", "update_time")
+DEFAULT_SEARCH_LIMIT = 100
+
+_ROUTE = re.compile(
+    r"^/api/(?P<version>[^/]+)/(?P<resource>.+)/table/(?P<table_id>[^/]+)"
+    r"(?:/(?P<action>record|upload|upload_multi)(?:/(?P<record_id>[^/]+))?)?/?$"
+)
+_FILE_ROUTE = re.compile(r"^/files/(?P<file_id>[^/]+)$")
+_DISPOSITION_PARAM = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Latency = Union[float, Tuple[float, float]]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # hundreds of clients may connect at once, the default backlog is 5
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockError(Exception):
+    """error response of the mock server"""
+
+    def __init__(self, status: int, code: str, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or value == "" or value == []
+
+
+def _compare(op: str, value: Any, expected: Any) -> bool:
+    if value is None:
+        return False
+    try:
+        if op == "gt":
+            return value > expected
+        if op == "gte":
+            return value >= expected
+        if op == "lt":
+            return value < expected
+        return value <= expected
+    except TypeError:
+        return False
+
+
+def _match_leaf(value: Any, op: str, expected: Any) -> bool:
+    if op == "eq":
+        return value == expected
+    if op == "neq":
+        return value != expected
+    if op in ("gt", "gte", "lt", "lte"):
+        return _compare(op, value, expected)
+    if op in ("in", "not_in"):
+        if isinstance(value, list):
+            found = any(item in expected for item in value)
+        else:
+            found = value in expected
+        return found if op == "in" else not found
+    if op == "is_null":
+        return _is_null(value)
+    if op == "not_null":
+        return not _is_null(value)
+    if op == "contain":
+        if isinstance(value, str):
+            return isinstance(expected, str) and expected in value
+        if isinstance(value, list):
+            return expected in value
+        return False
+    raise MockError(400, "invalid_filter", "unknown filter op {}".format(op))
+
+
+class MockTable(object):
+    """one table of the mock server, records are kept in creation order with
+    field values keyed by field id
+
+    Args:
+        resource (str): repository of the table, e.g. "issac/blog"
+        table_id (str): id of the table
+        fields (Dict[str, str]): field name to field type, e.g. {"title": "STR"}
+    """
+
+    def __init__(self, resource: str, table_id: str, fields: Dict[str, str]) -> None:
+        self.resource = resource
+        self.table_id = table_id
+        self.field_metas: Dict[str, Dict[str, Any]] = {}
+        self._ids_by_name: Dict[str, str] = {}
+        for index, (name, type) in enumerate(fields.items()):
+            field_id = "fld{:04d}".format(index)
+            self.field_metas[field_id] = {"id": field_id, "name": name, "type": type}
+            self._ids_by_name[name] = field_id
+        self.records: Dict[str, Dict[str, Any]] = {}
+
+    def field_id(self, key: str, name_type: str) -> str:
+        """id of a field given by name or id"""
+        if name_type == "name":
+            field_id = self._ids_by_name.get(key)
+        else:
+            field_id = key if key in self.field_metas else None
+        if field_id is None:
+            raise MockError(
+                400, "field_not_found", "field {} not found in table {}".format(key, self.table_id)
+            )
+        return field_id
+
+    def _now(self) -> int:
+        return int(time.time())
+
+    def getter(self, key: str, name_type: str) -> Callable[[Dict[str, Any]], Any]:
+        """function reading a field or record attribute of a stored record"""
+        if key in RECORD_ATTRIBUTES:
+            return lambda record: record[key]
+        field_id = self.field_id(key, name_type)
+        return lambda record: record["fields"].get(field_id)
+
+    def _to_ids(self, values: Dict[str, Any], name_type: str) -> Dict[str, Any]:
+        return {self.field_id(key, name_type): value for key, value in values.items()}
+
+    def render(
+        self,
+        record: Dict[str, Any],
+        name_type: str,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """record as returned by the api, fields keyed by name or id"""
+        values = record["fields"]
+        if fields:
+            keys = [self.field_id(key, name_type) for key in fields]
+        else:
+            keys = list(self.field_metas)
+        if name_type == "name":
+            out = {self.field_metas[k]["name"]: values.get(k) for k in keys}
+        else:
+            out = {k: values.get(k) for k in keys}
+        return {
+            "record_id": record["record_id"],
+            "fields": out,
+            "create_time": record["create_time"],
+            "update_time": record["update_time"],
+        }
+
+    def insert(self, values: Dict[str, Any], name_type: str = "name") -> Dict[str, Any]:
+        """store a new record, values are keyed like `name_type`"""
+        now = self._now()
+        record = {
+            "record_id": uuid.uuid4().hex,
+            "fields": self._to_ids(values, name_type),
+            "create_time": now,
+            "update_time": now,
+        }
+        self.records[record["record_id"]] = record
+        return record
+
+    def update(self, record: Dict[str, Any], values: Dict[str, Any], name_type: str) -> None:
+        record["fields"].update(self._to_ids(values, name_type))
+        record["update_time"] = self._now()
+
+    def find_conflict(
+        self, values: Dict[str, Any], on_conflict: List[str], name_type: str
+    ) -> Optional[Dict[str, Any]]:
+        """first record with the same values of all `on_conflict` fields"""
+        keys = [(self.field_id(key, name_type), values.get(key)) for key in on_conflict]
+        for record in self.records.values():
+            fields = record["fields"]
+            if all(fields.get(k) == v for k, v in keys):
+                return record
+        return None
+
+    def predicate(
+        self, filter: Optional[Dict[str, Any]], name_type: str
+    ) -> Callable[[Dict[str, Any]], bool]:
+        """compile a filter of `_get_filter`, a leaf {"field", "op", "val"} or
+        {"filterType": "and" | "or" | "not", "filters": [...]}, into a test of
+        a stored record. Fields are resolved once, not per record."""
+        if not filter:
+            return lambda record: True
+        filter_type = filter.get("filterType")
+        if filter_type is not None:
+            tests = [self.predicate(f, name_type) for f in filter.get("filters") or []]
+            if filter_type == "and":
+                return lambda record: all(test(record) for test in tests)
+            if filter_type == "or":
+                return lambda record: any(test(record) for test in tests)
+            if filter_type == "not":
+                return lambda record: not any(test(record) for test in tests)
+            raise MockError(400, "invalid_filter", "unknown filter type {}".format(filter_type))
+        get = self.getter(filter["field"], name_type)
+        op = filter["op"]
+        expected = filter.get("val")
+        # an unknown op fails the request even when no record is stored
+        _match_leaf(None, op, expected)
+        return lambda record: _match_leaf(get(record), op, expected)
+
+    def select(
+        self,
+        filter: Optional[Dict[str, Any]],
+        orders: Optional[List[Dict[str, str]]],
+        name_type: str,
+    ) -> List[Dict[str, Any]]:
+        """records passing the filter, sorted by `orders`, nulls last"""
+        test = self.predicate(filter, name_type)
+        records = [r for r in self.records.values() if test(r)]
+        # stable sorts from the last order to the first give the combined order
+        for order in reversed(orders or []):
+            get = self.getter(order["field"], name_type)
+            desc = order.get("sortType", "DESC").upper() == "DESC"
+            present = [(get(r), r) for r in records]
+            missing = [r for value, r in present if value is None]
+            present = [item for item in present if item[0] is not None]
+            try:
+                present.sort(key=lambda item: item[0], reverse=desc)
+            except TypeError:
+                present.sort(key=lambda item: str(item[0]), reverse=desc)
+            records = [r for _, r in present] + missing
+        return records
+
+
+class MockLeapcell(object):
+    """MockLeapcell serves Leapcell tables from memory on a local port, point
+    a client at it with `Leapcell(api_key, base_url=server.url)`. The server
+    runs on a background thread while the context is open.
+
+    Injected latency is slept before every request is handled, injected
+    errors answer a request with `error_status` and change nothing.
+
+    Args:
+        latency (Latency, optional): seconds added to every request, or a (min, max) range drawn uniformly. Defaults to 0.
+        error_rate (float, optional): share of requests answered with an error. Defaults to 0.
+        error_status (int, optional): http code of injected errors. Defaults to 503.
+        error_routes (Optional[Iterable[str]], optional): routes errors are injected into, e.g. ["query", "create"], None for all. Defaults to None.
+        retry_after (Optional[float], optional): Retry-After header of injected errors. Defaults to None.
+        api_key (Optional[str], optional): token requests must carry, None accepts any. Defaults to None.
+        seed (Optional[int], optional): seed of latency and error draws. Defaults to None.
+        host (str, optional): address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): port to listen on, 0 picks a free one. Defaults to 0.
+    """
+
+    ROUTES = (
+        "meta",
+        "create",
+        "get",
+        "query",
+        "update",
+        "delete",
+        "metrics",
+        "search",
+        "upload",
+        "upload_multi",
+        "file",
+    )
+
+    def __init__(
+        self,
+        latency: Latency = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        error_routes: Optional[Iterable[str]] = None,
+        retry_after: Optional[float] = None,
+        api_key: Optional[str] = None,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_routes = self._check_routes(error_routes)
+        self.retry_after = retry_after
+        self.api_key = api_key
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._tables: Dict[Tuple[str, str], MockTable] = {}
+        self._files: Dict[str, Tuple[str, bytes]] = {}
+        self._fail_next: List[Tuple[int, Optional[str]]] = []
+        self.requests = 0
+        self.errors = 0
+        self.requests_by_route: Dict[str, int] = {}
+        self._httpd = _HTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    def _check_routes(self, routes: Optional[Iterable[str]]) -> Optional[frozenset]:
+        if routes is None:
+            return None
+        routes = frozenset(routes)
+        unknown = routes.difference(self.ROUTES)
+        if unknown:
+            raise ValueError(
+                "unknown routes {}, they should be in {}".format(
+                    ", ".join(sorted(unknown)), ", ".join(self.ROUTES)
+                )
+            )
+        return routes
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def add_table(
+        self,
+        resource: str,
+        table_id: str,
+        fields: Dict[str, str],
+        records: Optional[Iterable[Dict[str, Any]]] = None,
+    ) -> MockTable:
+        """create a table, replacing one with the same id
+
+        Args:
+            resource (str): repository of the table, e.g. "issac/blog"
+            table_id (str): id of the table
+            fields (Dict[str, str]): field name to field type, e.g. {"title": "STR", "views": "INT_NUMBER"}
+            records (Optional[Iterable[Dict[str, Any]]], optional): initial records keyed by field name. Defaults to None.
+
+        Returns:
+            MockTable: the table
+        """
+        table = MockTable(resource, table_id, fields)
+        for values in records or []:
+            table.insert(values)
+        with self._lock:
+            self._tables[(resource, table_id)] = table
+        return table
+
+    def table(self, resource: str, table_id: str) -> MockTable:
+        """a table added before
+
+        Raises:
+            KeyError: table not found
+        """
+        return self._tables[(resource, table_id)]
+
+    def fail_next(self, count: int = 1, status: int = 503, route: Optional[str] = None) -> None:
+        """answer the next `count` requests (of a route) with `status`"""
+        self._check_routes(None if route is None else [route])
+        with self._lock:
+            self._fail_next.extend([(status, route)] * count)
+
+    def reset(self) -> None:
+        """clear request counters and pending failures, the data is kept"""
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.requests_by_route = {}
+            self._fail_next = []
+
+    def start(self) -> "MockLeapcell":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockLeapcell":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _sleep(self) -> None:
+        latency = self.latency
+        if isinstance(latency, tuple):
+            with self._lock:
+                latency = self._random.uniform(*latency)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _injected_status(self, route: str) -> Optional[int]:
+        with self._lock:
+            self.requests += 1
+            self.requests_by_route[route] = self.requests_by_route.get(route, 0) + 1
+            for index, (status, failing) in enumerate(self._fail_next):
+                if failing is None or failing == route:
+                    del self._fail_next[index]
+                    self.errors += 1
+                    return status
+            if (
+                self.error_rate
+                and (self.error_routes is None or route in self.error_routes)
+                and self._random.random() < self.error_rate
+            ):
+                self.errors += 1
+                return self.error_status
+        return None
+
+    def _handler(self) -> Any:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    parts = []
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        parts.append(self.rfile.read(size + 2)[:size])
+                        if size == 0:
+                            break
+                    body = b"".join(parts)
+                else:
+                    body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                encoding = self.headers.get("Content-Encoding", "").lower()
+                if encoding == "gzip":
+                    return gzip.decompress(body)
+                if encoding == "zstd":
+                    if zstandard is None:
+                        raise MockError(415, "unsupported_encoding", "zstandard is not installed")
+                    return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+                if encoding not in ("", "identity"):
+                    raise MockError(415, "unsupported_encoding", "unknown encoding {}".format(encoding))
+                return body
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                headers = dict(headers or {})
+                headers["Content-Type"] = "application/json"
+                self._send(status, json.dumps(payload).encode("utf-8"), headers)
+
+            def _handle(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                try:
+                    body = self._body()
+                    match = _ROUTE.match(url.path)
+                    file_match = _FILE_ROUTE.match(url.path)
+                    if file_match is not None and self.command in ("GET", "HEAD"):
+                        route = "file"
+                    elif match is not None:
+                        route = server._route(self.command, match)
+                    else:
+                        raise MockError(404, "not_found", "no route for {} {}".format(self.command, url.path))
+                    server._sleep()
+                    status = server._injected_status(route)
+                    if status is not None:
+                        headers = {}
+                        if server.retry_after is not None:
+                            headers["Retry-After"] = "{:g}".format(server.retry_after)
+                        self._json(
+                            status,
+                            {"code": "injected_error", "error": "injected error on {}".format(route)},
+                            headers,
+                        )
+                        return
+                    if route == "file":
+                        filename, content = server._file(file_match.group("file_id"))
+                        self._send(200, content, {"Content-Type": "application/octet-stream"})
+                        return
+                    self._authorize(self.headers.get("Authorization", ""))
+                    params = dict(urllib.parse.parse_qsl(url.query))
+                    data = server._dispatch(route, match, params, body, self.headers)
+                    self._json(200, {"data": data})
+                except MockError as e:
+                    self._json(e.status, {"code": e.code, "error": e.message})
+                except (ValueError, KeyError, TypeError) as e:
+                    self._json(400, {"code": "bad_request", "error": str(e)})
+
+            def _authorize(self, header: str) -> None:
+                if server.api_key is not None and header != "Bearer {}".format(server.api_key):
+                    raise MockError(401, "unauthorized", "invalid api key")
+
+            do_GET = _handle
+            do_HEAD = _handle
+            do_POST = _handle
+            do_PUT = _handle
+            do_DELETE = _handle
+
+            def log_message(self, *args) -> None:
+                return
+
+        return Handler
+
+    @staticmethod
+    def _route(method: str, match: Any) -> str:
+        action = match.group("action")
+        record_id = match.group("record_id")
+        if action is None and method == "GET":
+            return "meta"
+        if action == "upload" and method == "POST" and record_id is None:
+            return "upload"
+        if action == "upload_multi" and method == "POST" and record_id is None:
+            return "upload_multi"
+        if action == "record":
+            if record_id in ("query", "search", "metrics") and method == "POST":
+                return record_id
+            if record_id is None and method == "POST":
+                return "create"
+            if record_id is not None and method == "GET":
+                return "get"
+            if method == "PUT":
+                return "update"
+            if method == "DELETE":
+                return "delete"
+        raise MockError(405, "method_not_allowed", "{} is not supported here".format(method))
+
+    def _file(self, file_id: str) -> Tuple[str, bytes]:
+        with self._lock:
+            if file_id not in self._files:
+                raise MockError(404, "not_found", "file {} not found".format(file_id))
+            return self._files[file_id]
+
+    def _dispatch(
+        self, route: str, match: Any, params: Dict[str, str], body: bytes, headers: Any
+    ) -> Any:
+        key = (match.group("resource"), match.group("table_id"))
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                raise MockError(
+                    404, "table_not_found", "table {} of {} not found".format(key[1], key[0])
+                )
+            if route in ("upload", "upload_multi"):
+                return self._upload(route, body, headers)
+            data = json.loads(body) if body else {}
+            name_type = data.get("name_type") or params.get("name_type") or "name"
+            record_id = match.group("record_id")
+            if route == "meta":
+                return {"fields": table.field_metas}
+            if route == "create":
+                return self._create(table, data, name_type)
+            if route == "get":
+                record = table.records.get(record_id)
+                return {"record": None if record is None else table.render(record, name_type)}
+            if route == "query":
+                records = table.select(data.get("filter"), data.get("orders"), name_type)
+                return {"records": self._page(table, records, data, name_type, None)}
+            if route == "search":
+                return {"records": self._search(table, data, name_type)}
+            if route == "metrics":
+                return {"metric": {"value": self._metric(table, data, name_type)}}
+            if route == "update":
+                return self._update(table, record_id, data, name_type)
+            return self._delete(table, record_id, data, name_type)
+
+    def _page(
+        self,
+        table: MockTable,
+        records: List[Dict[str, Any]],
+        data: Dict[str, Any],
+        name_type: str,
+        default_limit: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        offset = data.get("offset") or 0
+        limit = data.get("limit") or default_limit
+        end = None if limit is None else offset + limit
+        fields = data.get("fields")
+        return [table.render(r, name_type, fields) for r in records[offset:end]]
+
+    def _create(self, table: MockTable, data: Dict[str, Any], name_type: str) -> Dict[str, Any]:
+        on_conflict = data.get("on_conflict")
+        action = data.get("action", "create_if_not_exists")
+
+        def create(values: Dict[str, Any]) -> Dict[str, Any]:
+            existing = None
+            if on_conflict:
+                existing = table.find_conflict(values, on_conflict, name_type)
+            if existing is None:
+                record = table.insert(values, name_type)
+            else:
+                record = existing
+                if action == "upsert":
+                    table.update(record, values, name_type)
+            return table.render(record, name_type)
+
+        if "records" in data:
+            # validate every record first, a bad one stores none of them
+            for values in data["records"]:
+                table._to_ids(values, name_type)
+            return {"records": [create(values) for values in data["records"]]}
+        return {"record": create(data.get("record") or {})}
+
+    def _search(self, table: MockTable, data: Dict[str, Any], name_type: str) -> List[Dict[str, Any]]:
+        query = (data.get("query") or "").lower()
+        search_fields = data.get("search_fields") or [
+            meta["name"] if name_type == "name" else field_id
+            for field_id, meta in table.field_metas.items()
+            if meta["type"] in ("STR", "LONG_TEXT")
+        ]
+        boost = data.get("boost_fields") or {}
+        getters = [(table.getter(field, name_type), boost.get(field, 1)) for field in search_fields]
+        scored = []
+        for record in table.select(data.get("filter"), data.get("orders"), name_type):
+            score = 0
+            for get, weight in getters:
+                value = get(record)
+                if isinstance(value, str) and query in value.lower():
+                    score += weight
+            if score:
+                scored.append((score, record))
+        if not data.get("orders"):
+            scored.sort(key=lambda item: -item[0])
+        return self._page(
+            table, [record for _, record in scored], data, name_type, DEFAULT_SEARCH_LIMIT
+        )
+
+    def _metric(self, table: MockTable, data: Dict[str, Any], name_type: str) -> Any:
+        metric = data.get("metric") or {}
+        field = metric.get("field", "*")
+        aggr = metric.get("aggr", "count")
+        records = table.select(data.get("filter"), None, name_type)
+        if field == "*":
+            values = [r["record_id"] for r in records]
+        else:
+            get = table.getter(field, name_type)
+            values = [get(r) for r in records]
+            values = [v for v in values if v is not None]
+        if metric.get("condition") == "distinct":
+            values = list({json.dumps(v, sort_keys=True): v for v in values}.values())
+        if aggr == "count":
+            return len(values)
+        if aggr == "sum":
+            return sum(values)
+        if aggr == "avg":
+            return sum(values) / len(values) if values else None
+        if aggr == "min":
+            return min(values) if values else None
+        if aggr == "max":
+            return max(values) if values else None
+        raise MockError(400, "invalid_metric", "unknown aggr {}".format(aggr))
+
+    def _update(
+        self, table: MockTable, record_id: Optional[str], data: Dict[str, Any], name_type: str
+    ) -> Dict[str, Any]:
+        values = data.get("fields") or {}
+        table._to_ids(values, name_type)
+        if record_id is not None:
+            record = table.records.get(record_id)
+            if record is None:
+                raise MockError(404, "record_not_found", "record {} not found".format(record_id))
+            table.update(record, values, name_type)
+            return {"record": table.render(record, name_type)}
+        records = table.select(data.get("filter"), None, name_type)
+        for record in records:
+            table.update(record, values, name_type)
+        return {"affect_count": len(records)}
+
+    def _delete(
+        self, table: MockTable, record_id: Optional[str], data: Dict[str, Any], name_type: str
+    ) -> Dict[str, Any]:
+        if record_id is not None:
+            if table.records.pop(record_id, None) is None:
+                raise MockError(404, "record_not_found", "record {} not found".format(record_id))
+            return {"affect_count": 1}
+        records = table.select(data.get("filter"), None, name_type)
+        for record in records:
+            del table.records[record["record_id"]]
+        return {"affect_count": len(records)}
+
+    def _upload(self, route: str, body: bytes, headers: Any) -> Dict[str, Any]:
+        content_type = headers.get("Content-Type", "")
+        boundary = re.search(r"boundary=\"?([^\";]+)", content_type)
+        if not content_type.startswith("multipart/form-data") or boundary is None:
+            raise MockError(400, "bad_request", "upload must be multipart/form-data")
+        field = "file" if route == "upload" else "files"
+        files = []
+        delimiter = b"--" + boundary.group(1).encode("latin-1")
+        # the preamble before the first and the epilogue after the last delimiter are skipped
+        for part in body.split(delimiter)[1:-1]:
+            head, _, content = part[2:].partition(b"\r\n\r\n")
+            content = content[:-2]
+            disposition: Dict[str, str] = {}
+            for line in head.decode("utf-8").split("\r\n"):
+                if line.lower().startswith("content-disposition:"):
+                    disposition = {
+                        name: re.sub(r"\\(.)", r"\1", value)
+                        for name, value in _DISPOSITION_PARAM.findall(line)
+                    }
+            if disposition.get("name") != field:
+                continue
+            file_id = uuid.uuid4().hex
+            filename = disposition.get("filename") or "file"
+            self._files[file_id] = (filename, content)
+            files.append(
+                {
+                    "id": file_id,
+                    "link": "{}/files/{}".format(self.url, file_id),
+                    "meta": {"name": filename, "size": len(content)},
+                }
+            )
+        if not files:
+            raise MockError(400, "bad_request", "no {} part in the upload".format(field))
+        if route == "upload":
+            return {"file": files[0]}
+        return {"files": files}
@@ -0,0 +1,361 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import inspect
+import json
+import threading
+import time
+from leapcell.exp import LeapcellException
+from leapcell.codec import JSONCodec, OrjsonCodec, UjsonCodec
+from leapcell.http_client import HTTPClient
+from leapcell.record import Record
+from leapcell.table import LeapcellFilter, KaithQuery, LeapcellTable
+
+# phase -> functions timed as that phase while profiling is enabled
+PROFILE_PHASES: Dict[str, List[Tuple[type, str]]] = {
+    "json_encode": [(JSONCodec, "dumps"), (OrjsonCodec, "dumps"), (UjsonCodec, "dumps")],
+    "json_decode": [(JSONCodec, "loads"), (OrjsonCodec, "loads"), (UjsonCodec, "loads")],
+    # json.dumps of the body to coalesce identical reads
+    "request_key": [(HTTPClient, "_request_key")],
+    "build_filter": [(LeapcellFilter, "build_filter")],
+    "get_filter": [(KaithQuery, "_get_filter")],
+    "gen_order": [(KaithQuery, "_gen_order")],
+    "record_init": [(Record, "__init__")],
+}
+
+# operations the phases are attributed to, queries by the shape of their
+# filter, orders and fields, table operations by name
+QUERY_OPERATIONS = (
+    "query",
+    "stream",
+    "iter",
+    "first",
+    "count",
+    "update",
+    "delete",
+    "search",
+    "search_stream",
+    "query_columns",
+    "iter_column_batches",
+)
+TABLE_OPERATIONS = (
+    "create",
+    "upsert",
+    "bulk_create",
+    "bulk_upsert",
+    "bulk_create_batches",
+    "get_by_id",
+    "get_many",
+    "get",
+    "delete_by_id",
+    "upload_file",
+    "upload_files",
+    "upload_many",
+    "import_file",
+    "export",
+)
+# phases run outside an operation, e.g. on the worker threads of bulk_create
+NO_OPERATION = "(no operation)"
+
+CLOCKS: Dict[str, Callable[[], int]] = {
+    "wall": time.perf_counter_ns,
+    "cpu": time.thread_time_ns,
+}
+
+_active: Optional["ClientProfiler"] = None
+_active_lock = threading.Lock()
+
+
+def _filter_shape(filter: Any) -> str:
+    if isinstance(filter, dict):
+        return "{" + ",".join(sorted(str(key) for key in filter)) + "}"
+    node = filter.filter["filter"]
+    if node["type"] in ("and", "or", "not"):
+        return "{}({})".format(
+            node["type"], ",".join(_filter_shape(f) for f in node["fields"])
+        )
+    return "{}:{}".format(node["field"], node["type"])
+
+
+def query_shape(operation: str, query: KaithQuery) -> str:
+    """operation and the structure of a query without its values, e.g.
+    "query where and(views:gte,tags:contain) order views:asc" """
+    parts = [operation]
+    if query._filter is not None:
+        parts.append("where " + _filter_shape(query._filter))
+    if query._orders:
+        parts.append(
+            "order " + ",".join(":".join(str(o) for o in order) for order in query._orders)
+        )
+    if query.fields:
+        parts.append("fields {}".format(len(query.fields)))
+    return " ".join(parts)
+
+
+class _ThreadState(object):
+    __slots__ = ("shapes", "frames", "phases", "operations")
+
+    def __init__(self) -> None:
+        self.shapes: List[str] = []
+        # child time of the phases being timed, to keep the self time of each
+        self.frames: List[List[int]] = []
+        # (shape, phase) -> [calls, self time]
+        self.phases: Dict[Tuple[str, str], List[int]] = {}
+        # shape -> [operations, time]
+        self.operations: Dict[str, List[int]] = {}
+
+
+class ClientProfiler(object):
+    """ClientProfiler attributes client-side time to the phases of
+    PROFILE_PHASES (json encoding and decoding, filter and order building,
+    Record construction) per operation shape. A query's shape is its filter
+    fields and operators, orders and field count, not the values, so every
+    `table.select().where(table["views"] > n)` shares one row.
+
+    While enabled, the phase functions and the operations are replaced by
+    timed wrappers for the whole process; disabled, nothing is wrapped and
+    there is no overhead. An operation called by another one (first by get)
+    is part of the outer one. Phase times are self times, a phase called
+    inside another (build_filter inside get_filter) is not counted twice.
+    Phases on other threads than the operation's, e.g. the batch workers of
+    bulk_create, are reported under NO_OPERATION.
+
+    Args:
+        clock (str, optional): "wall" (perf_counter, cheapest) or "cpu" (thread cpu time). Defaults to "wall".
+    """
+
+    def __init__(self, clock: str = "wall") -> None:
+        if clock not in CLOCKS:
+            raise ValueError(
+                "invalid clock {}, it should be one of {}".format(clock, ", ".join(CLOCKS))
+            )
+        self._clock_name = clock
+        self._clock = CLOCKS[clock]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._states: List[_ThreadState] = []
+        self._originals: List[Tuple[type, str, Any]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def _state(self) -> _ThreadState:
+        state = getattr(self._local, "state", None)
+        if state is None:
+            state = _ThreadState()
+            self._local.state = state
+            with self._lock:
+                self._states.append(state)
+        return state
+
+    def _timed(self, phase: str, fn: Callable) -> Callable:
+        clock = self._clock
+        get_state = self._state
+
+        def timed(*args, **kwargs):
+            state = get_state()
+            frame = [0]
+            state.frames.append(frame)
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                state.frames.pop()
+                if state.frames:
+                    state.frames[-1][0] += elapsed
+                key = (state.shapes[-1] if state.shapes else NO_OPERATION, phase)
+                stats = state.phases.get(key)
+                if stats is None:
+                    stats = state.phases[key] = [0, 0]
+                stats[0] += 1
+                stats[1] += elapsed - frame[0]
+
+        return timed
+
+    def _operation(self, name: str, fn: Callable, is_query: bool) -> Callable:
+        clock = self._clock
+        get_state = self._state
+
+        def enter(obj: Any) -> Optional[Tuple[_ThreadState, str, int]]:
+            state = get_state()
+            if state.shapes:
+                # called by another operation (first by get, stream by export),
+                # the phases belong to the outer one
+                return None
+            shape = query_shape(name, obj) if is_query else name
+            state.shapes.append(shape)
+            return state, shape, clock()
+
+        def leave(entered: Optional[Tuple[_ThreadState, str, int]], count: int) -> None:
+            if entered is None:
+                return
+            state, shape, start = entered
+            elapsed = clock() - start
+            state.shapes.pop()
+            stats = state.operations.get(shape)
+            if stats is None:
+                stats = state.operations[shape] = [0, 0]
+            stats[0] += count
+            stats[1] += elapsed
+
+        if inspect.isgeneratorfunction(fn):
+            # the shape is set around every step, not while the caller consumes
+            def timed_generator(obj, *args, **kwargs):
+                generator = fn(obj, *args, **kwargs)
+                first = True
+                while True:
+                    entered = enter(obj)
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        leave(entered, 1 if first else 0)
+                        first = False
+                    yield item
+
+            return timed_generator
+
+        def timed(obj, *args, **kwargs):
+            entered = enter(obj)
+            try:
+                return fn(obj, *args, **kwargs)
+            finally:
+                leave(entered, 1)
+
+        return timed
+
+    def _patch(self, cls: type, name: str, wrap: Callable[[Callable], Callable]) -> None:
+        raw = cls.__dict__[name]
+        self._originals.append((cls, name, raw))
+        if isinstance(raw, staticmethod):
+            setattr(cls, name, staticmethod(wrap(raw.__func__)))
+        else:
+            setattr(cls, name, wrap(raw))
+
+    def enable(self) -> "ClientProfiler":
+        """start profiling
+
+        Raises:
+            LeapcellException: another profiler is enabled
+        """
+        global _active
+        with _active_lock:
+            if _active is self:
+                return self
+            if _active is not None:
+                raise LeapcellException("another ClientProfiler is enabled, disable it first")
+            _active = self
+            for phase, targets in PROFILE_PHASES.items():
+                for cls, name in targets:
+                    if name in cls.__dict__:
+                        self._patch(cls, name, lambda fn, phase=phase: self._timed(phase, fn))
+            for name in QUERY_OPERATIONS:
+                self._patch(KaithQuery, name, lambda fn, name=name: self._operation(name, fn, True))
+            for name in TABLE_OPERATIONS:
+                self._patch(LeapcellTable, name, lambda fn, name=name: self._operation(name, fn, False))
+        return self
+
+    def disable(self) -> None:
+        """stop profiling and restore the original functions, the data is kept"""
+        global _active
+        with _active_lock:
+            if _active is not self:
+                return
+            for cls, name, raw in reversed(self._originals):
+                setattr(cls, name, raw)
+            self._originals = []
+            _active = None
+
+    def __enter__(self) -> "ClientProfiler":
+        return self.enable()
+
+    def __exit__(self, *args) -> None:
+        self.disable()
+
+    def reset(self) -> None:
+        """drop the collected data, threads keep their place in the registry"""
+        with self._lock:
+            for state in self._states:
+                state.phases = {}
+                state.operations = {}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """per operation shape: operations, their total time and per phase
+        the calls, total time and time per operation, in milliseconds and
+        microseconds"""
+        phases: Dict[Tuple[str, str], List[int]] = {}
+        operations: Dict[str, List[int]] = {}
+        with self._lock:
+            states = list(self._states)
+        for state in states:
+            for key, (calls, ns) in list(state.phases.items()):
+                total = phases.setdefault(key, [0, 0])
+                total[0] += calls
+                total[1] += ns
+            for shape, (count, ns) in list(state.operations.items()):
+                total = operations.setdefault(shape, [0, 0])
+                total[0] += count
+                total[1] += ns
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for shape in sorted(set(operations) | {shape for shape, _ in phases}):
+            count, ns = operations.get(shape, (0, 0))
+            out[shape] = {
+                "operations": count,
+                "total_ms": round(ns / 1e6, 3),
+                "phases": {},
+            }
+        for (shape, phase), (calls, ns) in sorted(phases.items()):
+            count = out[shape]["operations"]
+            out[shape]["phases"][phase] = {
+                "calls": calls,
+                "total_ms": round(ns / 1e6, 3),
+                "per_operation_us": round(ns / count / 1e3, 1) if count else None,
+            }
+        for row in out.values():
+            profiled = sum(p["total_ms"] for p in row["phases"].values())
+            row["other_ms"] = round(max(0.0, row["total_ms"] - profiled), 3)
+        return out
+
+    def report(self) -> str:
+        """the snapshot as a text table, shapes with the most time first"""
+        snapshot = self.snapshot()
+        phases = list(PROFILE_PHASES)
+        lines = [
+            "clock: {}, us per operation, other is network and unprofiled code".format(
+                self._clock_name
+            ),
+            "{:>8} {:>10} ".format("ops", "total ms")
+            + " ".join("{:>12}".format(p) for p in phases)
+            + " {:>10}  shape".format("other"),
+        ]
+        rows = sorted(snapshot.items(), key=lambda item: -item[1]["total_ms"])
+        for shape, row in rows:
+            count = row["operations"] or 1
+            cells = []
+            for phase in phases:
+                stats = row["phases"].get(phase)
+                cells.append(
+                    "{:>12.1f}".format(stats["total_ms"] * 1e3 / count) if stats else "{:>12}".format("-")
+                )
+            lines.append(
+                "{:>8} {:>10.1f} {} {:>10.1f}  {}".format(
+                    row["operations"],
+                    row["total_ms"],
+                    " ".join(cells),
+                    row["other_ms"] * 1e3 / count,
+                    shape,
+                )
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """write the snapshot to a json file"""
+        with open(path, "w") as f:
+            json.dump({"clock": self._clock_name, "shapes": self.snapshot()}, f, indent=2)
+
+    def __repr__(self) -> str:
+        return "<client profiler: {}, clock: {}>".format(
+            "enabled" if self.enabled else "disabled", self._clock_name
+        )
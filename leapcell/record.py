@@ -1,13 +1,20 @@
-from typing import Dict, Union, Any, Optional
-from leapcell.table_meta import TableMeta
+from typing import Dict, Union, Any, Optional, List, Iterator, MutableMapping
 from leapcell.http_client import HTTPClient
-from leapcell.const import TableFieldType
+from leapcell.layout import FieldLayout
 import json
 
+# value of a deleted field slot, None is a valid field value
+_MISSING: Any = object()
 
-class Record:
+
+class Record(object):
     """Leapcell Record Instance
 
+    Field values are stored positionally in the order of a FieldLayout shared
+    by all records of the table with the same fields, fields added later go
+    to a small overflow dict and the dict of changed fields is only created by
+    the first change.
+
     Raises:
         KeyError: _description_
 
@@ -15,10 +22,22 @@ class Record:
         _type_: _description_
     """
 
-    _data: Dict[str, Any]
+    __slots__ = (
+        "_layout",
+        "_values",
+        "_extra",
+        "_new_data",
+        "_requester",
+        "_record_id",
+        "_create_time",
+        "_update_time",
+    )
+
+    _layout: FieldLayout
+    _values: List[Any]
+    _extra: Optional[Dict[str, Any]]
+    _new_data: Optional[Dict[str, Any]]
     _record_id: Optional[str]
-    _table_meta: TableMeta
-    _field_type: TableFieldType
 
     def __init__(
         self,
@@ -28,39 +47,95 @@ class Record:
         create_time: Optional[int] = None,
         update_time: Optional[int] = None,
     ) -> None:
-        self._data = {}
-        if fields is not None:
-            for field, item in fields.items():
-                self._data[field] = item
-            self._record_id = record_id
-        self._new_data: Dict[str, Any] = {}
+        keys = tuple(fields) if fields else ()
+        layouts = getattr(requester, "field_layouts", None)
+        layout = layouts.layout(keys) if layouts is not None else FieldLayout(keys)
+        if layout.names == keys:
+            values = list(fields.values()) if fields else []
+        else:
+            values = [fields[name] for name in layout.names]  # type: ignore[index]
+        self._layout = layout
+        self._values = values
+        self._extra = None
+        self._new_data = None
+        self._record_id = record_id
         self._requester = requester
         self._create_time = create_time
         self._update_time = update_time
         return
 
     def __getitem__(self, key: str) -> Any:
-        return self._data[key]
+        i = self._layout.index.get(key)
+        if i is not None:
+            value = self._values[i]
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
 
     def __setitem__(self, key: str, value: Any) -> None:
-        data = value
-        self._data[key] = data
-        self._new_data[key] = data
+        self._set_value(key, value)
+        if self._new_data is None:
+            self._new_data = {}
+        self._new_data[key] = value
 
     def __delitem__(self, key: str) -> None:
-        del self._data[key]
-        del self._new_data[key]
-
-    def __iter__(self):
-        return iter(self._data)
+        self._del_value(key)
+        if self._new_data is not None:
+            self._new_data.pop(key, None)
+
+    def _set_value(self, key: str, value: Any) -> None:
+        i = self._layout.index.get(key)
+        if i is not None:
+            self._values[i] = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def _del_value(self, key: str) -> None:
+        i = self._layout.index.get(key)
+        if i is not None and self._values[i] is not _MISSING:
+            self._values[i] = _MISSING
+        elif i is None and self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        i = self._layout.index.get(key)  # type: ignore[arg-type]
+        if i is not None:
+            return self._values[i] is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for name, value in zip(self._layout.names, self._values):
+            if value is not _MISSING:
+                yield name
+        if self._extra is not None:
+            yield from list(self._extra)
 
     def __len__(self):
-        return len(self._data)
+        return sum(1 for _ in self)
 
-    def data(self) -> Dict[str, Any]:
-        return self._data
+    def data(self) -> "RecordData":
+        """live, writable mapping of the field values, see RecordData"""
+        return RecordData(self)
+
+    def _to_dict(self) -> Dict[str, Any]:
+        data = {
+            name: value
+            for name, value in zip(self._layout.names, self._values)
+            if value is not _MISSING
+        }
+        if self._extra is not None:
+            data.update(self._extra)
+        return data
 
     def updated(self) -> Dict[str, Any]:
+        if self._new_data is None:
+            return {}
         return self._new_data
 
     @property
@@ -84,7 +159,7 @@ class Record:
 
     def __str__(self) -> str:
         return "<record_id: {}, data: {}, create_time: {}, update_time: {}>".format(
-            self._record_id, self._data, self._create_time, self._update_time
+            self._record_id, self._to_dict(), self._create_time, self._update_time
         )
 
     def save(self) -> None:
@@ -95,6 +170,10 @@ class Record:
         if not self._record_id:
             return
 
+        if self._requester.write_behind is not None:
+            self._requester.write_behind.add(self._record_id, update_values)
+            return
+
         self._requester.update_record(
             record_id=self._record_id,
             data={
@@ -112,7 +191,7 @@ class Record:
     def toJSON(self):
         return {
             "record_id": self._record_id,
-            "data": self._data,
+            "data": self._to_dict(),
             "create_time": self._create_time,
             "update_time": self._update_time,
         }
@@ -121,4 +200,45 @@ class Record:
         return self.toJSON()
 
     def get(self, key: str, default: Any = None) -> Any:
-        return self._data.get(key, default)
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class RecordData(MutableMapping[str, Any]):
+    """the field values of a Record as a mapping, as returned by data().
+    It is a view of the record, not a copy: changes to the record show in it
+    and writes to it change the record. Like writes to the dict data() used to
+    return, they are not marked as changed, so save() does not send them.
+    json encoders only take a dict, pass `data().copy()` to them.
+    """
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record: Record) -> None:
+        self._record = record
+
+    def __getitem__(self, key: str) -> Any:
+        return self._record[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._record._set_value(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self._record._del_value(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._record
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._record)
+
+    def __len__(self) -> int:
+        return len(self._record)
+
+    def copy(self) -> Dict[str, Any]:
+        return self._record._to_dict()
+
+    def __repr__(self) -> str:
+        return repr(self._record._to_dict())
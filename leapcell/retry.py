@@ -0,0 +1,112 @@
+from typing import Dict, Optional, Iterable
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# the server refused these before doing any work, retrying is safe for every method
+NOT_PROCESSED_STATUS_CODES = frozenset([429])
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_MAX_BACKOFF_SECS = 30.0
+
+
+class RetryPolicy(object):
+    """RetryPolicy decides which failed responses HTTPClient sends again and how
+    long it waits in between: `backoff_factor * 2 ** (attempt - 1)` seconds,
+    capped at `max_backoff`, with full jitter, or the server's Retry-After.
+
+    Only idempotent requests are retried by default: GET/PUT/DELETE and read
+    queries. Creates are retried only on 429, which the server answers before
+    doing any work, unless `retry_writes` is set.
+
+    Args:
+        max_attempts (int, optional): attempts per request including the first one. Defaults to DEFAULT_MAX_ATTEMPTS.
+        status_codes (Iterable[int], optional): http codes to retry. Defaults to RETRY_STATUS_CODES.
+        backoff_factor (float, optional): base of the exponential backoff in seconds. Defaults to DEFAULT_BACKOFF_FACTOR.
+        max_backoff (float, optional): max seconds to wait between attempts. Defaults to DEFAULT_MAX_BACKOFF_SECS.
+        jitter (bool, optional): randomize the backoff. Defaults to True.
+        respect_retry_after (bool, optional): wait as long as the Retry-After header asks, up to max_backoff. Defaults to True.
+        retry_writes (bool, optional): also retry non-idempotent writes. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        status_codes: Iterable[int] = RETRY_STATUS_CODES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        max_backoff: float = DEFAULT_MAX_BACKOFF_SECS,
+        jitter: bool = True,
+        respect_retry_after: bool = True,
+        retry_writes: bool = False,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.status_codes = frozenset(status_codes)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_writes = retry_writes
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._exhausted = 0
+        self._by_status: Dict[int, int] = {}
+
+    def retries(self, method: str, status: int, read_only: bool = False) -> bool:
+        """whether responses with `status` are retried at all, whatever the attempt"""
+        if status not in self.status_codes:
+            return False
+        return (
+            read_only
+            or self.retry_writes
+            or method.upper() in IDEMPOTENT_METHODS
+            or status in NOT_PROCESSED_STATUS_CODES
+        )
+
+    def should_retry(
+        self, method: str, status: int, attempt: int, read_only: bool = False
+    ) -> bool:
+        """whether the attempt-th response with `status` should be retried"""
+        if not self.retries(method, status, read_only):
+            return False
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self._exhausted += 1
+            return False
+        with self._lock:
+            self._retries += 1
+            self._by_status[status] = self._by_status.get(status, 0) + 1
+        return True
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """seconds to wait before the attempt after `attempt`"""
+        if self.respect_retry_after and retry_after:
+            wait = _parse_retry_after(retry_after)
+            if wait is not None:
+                return min(wait, self.max_backoff)
+        wait = min(self.backoff_factor * 2 ** (attempt - 1), self.max_backoff)
+        if self.jitter:
+            wait = random.uniform(0, wait)
+        return wait
+
+    def stats(self) -> Dict[str, object]:
+        """retries sent, requests that ran out of attempts and retries per http code"""
+        with self._lock:
+            return {
+                "retries": self._retries,
+                "exhausted": self._exhausted,
+                "by_status": dict(self._by_status),
+            }
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,205 @@
+from typing import Dict, Any, List, Tuple, Callable, Iterable, Iterator
+from itertools import islice
+from datetime import datetime
+from leapcell.exp import LeapcellException
+from leapcell.table_meta import TableMeta
+
+# errors kept on a ValidationError, the count is always exact
+MAX_REPORTED_ERRORS = 100
+# records coerced at once by coerce_iter
+COERCE_CHUNK_SIZE = 500
+
+Coerce = Callable[[Any], Any]
+
+
+class ValidationError(LeapcellException):
+    """records do not match the table schema, `errors` holds (row, field,
+    message) of the first MAX_REPORTED_ERRORS problems and `count` all of them"""
+
+    def __init__(self, errors: List[Tuple[int, str, str]], count: int) -> None:
+        self.errors = errors
+        self.count = count
+        row, field, message = errors[0]
+        super().__init__(
+            "{} invalid values, first at row {} field '{}': {}".format(
+                count, row, field, message
+            )
+        )
+
+
+def _to_int(value: Any) -> int:
+    # bool is an int subclass, True is not a number of views
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError("invalid type {}, it should be int".format(type(value)))
+    return int(value)
+
+
+def _to_float(value: Any) -> float:
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise TypeError("invalid type {}, it should be float".format(type(value)))
+    return float(value)
+
+
+def _to_str(value: Any) -> str:
+    if not isinstance(value, str):
+        raise TypeError("invalid type {}, it should be str".format(type(value)))
+    return str(value)
+
+
+def _to_time(value: Any) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError(
+            "invalid type {}, it should be int or datetime".format(type(value))
+        )
+    return int(value)
+
+
+def _to_str_list(value: Any) -> List[str]:
+    if type(value) is list and all(type(item) is str for item in value):
+        return value
+    if not isinstance(value, (list, tuple)):
+        raise TypeError("invalid type {}, it should be list".format(type(value)))
+    for item in value:
+        if not isinstance(item, str):
+            raise TypeError(
+                "invalid item type {}, it should be list of str".format(type(item))
+            )
+    return list(value)
+
+
+_NONE = type(None)
+
+# per field type: exact types passed through untouched (absent fields and
+# nulls included) and the coercer of everything else, following
+# FieldMgr.from_val of field_item.py
+FIELD_COERCERS: Dict[str, Tuple[Tuple[type, ...], Coerce]] = {
+    "INT_NUMBER": ((int, _NONE), _to_int),
+    "FLOAT_NUMBER": ((float, _NONE), _to_float),
+    "TIME": ((int, _NONE), _to_time),
+    "STR": ((str, _NONE), _to_str),
+    "LONG_TEXT": ((str, _NONE), _to_str),
+    "LINK": ((str, _NONE), _to_str),
+    "LABEL": ((str, _NONE), _to_str),
+    "IMAGE": ((str, _NONE), _to_str),
+    # list items are checked too, every list goes through the coercer
+    "LABELS": ((_NONE,), _to_str_list),
+    "IMAGES": ((_NONE,), _to_str_list),
+}
+
+
+class Schema(object):
+    """Schema validates and coerces records before they are written. It is
+    compiled once per table from the field types: every field gets the
+    coercer of its type and a whole batch is checked field by field, values
+    of the expected type are passed through without a call.
+
+    Coercion converts datetimes of TIME fields to epoch seconds, ints of
+    FLOAT_NUMBER fields to float and tuples of LABELS/IMAGES fields to lists.
+    None is accepted for every field. Fields of types unknown to the client
+    are passed through.
+
+    Args:
+        field_types (Dict[str, str]): field name (or id) to field type
+        allow_unknown (bool, optional): accept fields that are not in the table. Defaults to False.
+    """
+
+    def __init__(self, field_types: Dict[str, str], allow_unknown: bool = False) -> None:
+        self._allow_unknown = allow_unknown
+        self._fields = frozenset(field_types)
+        self._coercers: List[Tuple[str, Tuple[type, ...], Coerce]] = [
+            (name,) + FIELD_COERCERS[type]
+            for name, type in field_types.items()
+            if type in FIELD_COERCERS
+        ]
+
+    @classmethod
+    def from_meta(cls, meta: TableMeta, allow_unknown: bool = False) -> "Schema":
+        """compile the schema of a table, fields are keyed like the table's name_type"""
+        return cls(
+            {key: field.type for key, field in meta.field_metas.items()},
+            allow_unknown=allow_unknown,
+        )
+
+    def coerce(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """validate all records and return them with coerced values, records
+        that need a change are copied, the input is never modified
+
+        Raises:
+            ValidationError: some values or fields are invalid, nothing is returned
+        """
+        source = list(records)
+        out = list(source)
+        errors: List[Tuple[int, str, str]] = []
+        count = 0
+        if not self._allow_unknown:
+            fields = self._fields
+            for row, record in enumerate(out):
+                if not fields.issuperset(record):
+                    for name in record:
+                        if name not in fields:
+                            count += 1
+                            if len(errors) < MAX_REPORTED_ERRORS:
+                                errors.append((row, name, "field not found"))
+
+        for name, exact, coerce in self._coercers:
+            # only values of an unexpected type reach the coercer
+            rows = [
+                row
+                for row, record in enumerate(out)
+                if type(record.get(name)) not in exact
+            ]
+            for row in rows:
+                record = out[row]
+                try:
+                    value = coerce(record[name])
+                except TypeError as e:
+                    count += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append((row, name, str(e)))
+                    continue
+                if record is source[row]:
+                    record = dict(record)
+                    out[row] = record
+                record[name] = value
+
+        if count:
+            errors.sort()
+            raise ValidationError(errors, count)
+        return out
+
+    def coerce_iter(
+        self, records: Iterable[Dict[str, Any]], chunk_size: int = COERCE_CHUNK_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """coerce records lazily, `chunk_size` at a time, so inputs of any size
+        (e.g. generators) are never held whole. The ValidationError of a chunk
+        numbers rows from the start of the input, records of the chunks before
+        it have been yielded already.
+
+        Raises:
+            ValidationError: some values or fields of a chunk are invalid
+        """
+        source = iter(records)
+        start = 0
+        while True:
+            chunk = list(islice(source, chunk_size))
+            if not chunk:
+                return
+            try:
+                out = self.coerce(chunk)
+            except ValidationError as e:
+                raise ValidationError(
+                    [(start + row, field, message) for row, field, message in e.errors],
+                    e.count,
+                ) from None
+            start += len(chunk)
+            yield from out
+
+    def validate(self, records: Iterable[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+        """(row, field, message) of the first MAX_REPORTED_ERRORS problems, empty if all records are valid"""
+        try:
+            self.coerce(records)
+        except ValidationError as e:
+            return e.errors
+        return []
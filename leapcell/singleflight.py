@@ -0,0 +1,64 @@
+from typing import Dict, Any, Callable
+import threading
+
+
+class _Call(object):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+
+
+class SingleFlight(object):
+    """SingleFlight lets concurrent callers with the same key share one call,
+    the first caller runs `fn` and every caller waiting on the key gets its
+    result (or exception).
+
+    `generation` counts the writes that finished, callers put it in their key
+    so a read started after a write never shares a call started before it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._shared = 0
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def written(self) -> None:
+        """record a finished write, later keys do not match earlier calls"""
+        with self._lock:
+            self._generation += 1
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        owner = False
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                owner = True
+            else:
+                self._shared += 1
+        if not owner:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"shared": self._shared, "in_flight": len(self._calls)}
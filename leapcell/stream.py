@@ -0,0 +1,168 @@
+from typing import Any, Iterable, Iterator, List, Sequence
+import codecs
+import json
+import re
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# consumed text is dropped from the buffer once this many characters pile up
+_COMPACT_CHARS = 256 * 1024
+
+_TOKEN = re.compile(r'["{}\[\],]')
+# body of a json string after the opening quote, up to and including the closing one
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_SPACE = re.compile(r"[ \t\r\n]*")
+_decoder = json.JSONDecoder()
+
+
+class JSONArrayStream(object):
+    """JSONArrayStream decodes the elements of one array inside a json document
+    as its bytes arrive, e.g. `data.records` of a query response, so the first
+    element is available before the document is complete and only one element
+    is held decoded at a time.
+
+    The array is located by a scanner that only tracks strings and brackets,
+    then each element is decoded in place by the C scanner of the json module
+    (`raw_decode`). An element cut off by the end of the buffer fails to decode
+    or ends the buffer, so it is decoded again once more bytes arrived.
+
+    Args:
+        chunks (Iterable[bytes]): utf-8 document bytes, in any chunk sizes
+        path (Sequence[str], optional): object keys leading to the array. Defaults to ("data", "records").
+
+    A null value at `path` is read as an empty array.
+
+    Raises:
+        KeyError: the document ended without an array at `path`
+        ValueError: the document is not valid json around the array
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        path: Sequence[str] = ("data", "records"),
+    ) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._path = list(path)
+        self._buf = ""
+        self._pos = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        # stack of open containers, an object entry holds the key being read
+        stack: List[List[Any]] = []
+        expect_key = False
+        while True:
+            m = _TOKEN.search(self._buf, self._pos)
+            if m is None:
+                if not self._fill():
+                    raise KeyError(
+                        "json document has no array at {}".format(".".join(self._path))
+                    )
+                continue
+            c = m.group()
+            self._pos = m.end()
+            if c == '"':
+                start = self._pos
+                end = self._skip_string()
+                if expect_key and stack and stack[-1][0] == "{":
+                    stack[-1][1] = self._buf[start : end - 1]
+                    expect_key = False
+                    # a null array is the empty result of a query
+                    if self._at_path(stack) and self._null_value():
+                        return
+            elif c == "{":
+                stack.append(["{", None])
+                expect_key = True
+            elif c == "[":
+                if self._at_path(stack):
+                    yield from self._elements()
+                    return
+                stack.append(["[", None])
+            elif c in "}]":
+                if stack:
+                    stack.pop()
+            elif stack and stack[-1][0] == "{":  # , inside an object
+                expect_key = True
+
+    def _at_path(self, stack: List[List[Any]]) -> bool:
+        return [key for _, key in stack] == self._path and all(
+            kind == "{" for kind, _ in stack
+        )
+
+    def _null_value(self) -> bool:
+        """whether the value of the key just read is null"""
+        self._skip_space()
+        if self._buf[self._pos] != ":":
+            raise ValueError("expected : after key at char {}".format(self._pos))
+        self._pos += 1
+        self._skip_space()
+        while len(self._buf) - self._pos < 4 and self._fill():
+            pass
+        return self._buf.startswith("null", self._pos)
+
+    def _elements(self) -> Iterator[Any]:
+        self._skip_space()
+        if self._buf[self._pos] == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            self._skip_space()
+            c = self._buf[self._pos]
+            self._pos += 1
+            if c == "]":
+                return
+            if c != ",":
+                raise ValueError(
+                    "expected , or ] in array at char {}".format(self._pos - 1)
+                )
+            self._skip_space()
+            if self._pos >= _COMPACT_CHARS:
+                self._buf = self._buf[self._pos :]
+                self._pos = 0
+
+    def _decode_value(self) -> Any:
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # a value is complete once , or ] follows, a number cut off by the
+            # end of the buffer decodes fine but may still be missing digits
+            after = _SPACE.match(self._buf, end).end()  # type: ignore[union-attr]
+            complete = after < len(self._buf) and self._buf[after] in ",]"
+            if complete or not self._fill():
+                self._pos = end
+                return value
+
+    def _skip_string(self) -> int:
+        """move past the string whose opening quote was just read, returns its end"""
+        while True:
+            m = _STRING_REST.match(self._buf, self._pos)
+            if m is not None:
+                self._pos = m.end()
+                return self._pos
+            if not self._fill():
+                raise ValueError("json document ended inside a string")
+
+    def _skip_space(self) -> None:
+        while True:
+            self._pos = _SPACE.match(self._buf, self._pos).end()  # type: ignore[union-attr]
+            if self._pos < len(self._buf):
+                return
+            if not self._fill():
+                raise ValueError("json document is truncated")
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self._buf += text
+                return True
+        text = self._utf8.decode(b"", final=True)
+        if text:
+            self._buf += text
+            return True
+        return False
@@ -1,14 +1,72 @@
-from leapcell.const import TableFieldType
+from leapcell.const import TableFieldType, RECORD_ID_FIELD
 from leapcell.table_meta import TableMeta
-from typing import Dict, Union, Any, List, Tuple, Optional
+from typing import Dict, Union, Any, List, Tuple, Optional, Iterator, Iterable, Callable
 from leapcell.field_meta import FieldMeta
 from leapcell.http_client import HTTPClient
+from leapcell.singleflight import SingleFlight
+from leapcell.retry import RetryPolicy
+from leapcell.throttle import TokenBucket, AdaptiveConcurrency
+from leapcell.codec import JSONCodec
+from leapcell.compress import RequestCompression
+from leapcell.trace import RequestHook
+from leapcell.loader import RecordLoader, AUTO_BATCH_WINDOW_SECS, AUTO_BATCH_MAX_SIZE
+from leapcell.write_behind import (
+    WriteBehindBuffer,
+    ErrorCallback,
+    WRITE_BEHIND_MAX_PENDING,
+    WRITE_BEHIND_FLUSH_INTERVAL_SECS,
+    WRITE_BEHIND_CONCURRENCY,
+    WRITE_BEHIND_MAX_RETRIES,
+)
+from leapcell.cache import (
+    TTLCache,
+    LRUCache,
+    RECORD_CACHE_MAX_ENTRIES,
+    RECORD_CACHE_MAX_BYTES,
+    RECORD_CACHE_TTL_SECS,
+    UploadCache,
+    UPLOAD_CACHE_MAX_ENTRIES,
+    UPLOAD_CACHE_MAX_DISK_ENTRIES,
+    UPLOAD_CACHE_TTL_SECS,
+)
 from leapcell.field_item import FieldMgr, BaseItem
 from leapcell.record import Record
+from leapcell.columnar import ColumnBatch, field_types, COLUMN_CHUNK_SIZE
+from leapcell.schema import Schema
+from leapcell.export import (
+    TableExport,
+    DEFAULT_EXPORT_RANGES,
+    DEFAULT_EXPORT_CONCURRENCY,
+    DEFAULT_EXPORT_PAGE_SIZE,
+)
+from leapcell.importer import FileImport
+from leapcell.upload import (
+    UploadData,
+    UploadResult,
+    run_uploads,
+    DEFAULT_UPLOAD_CONCURRENCY,
+    DEFAULT_UPLOAD_RETRIES,
+)
+from leapcell.bulk import (
+    BatchResult,
+    RecordBatch,
+    run_batches,
+    flatten_batches,
+    batch_retryable,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_BATCH_BYTES,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BATCH_RETRIES,
+)
 from functools import reduce
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from leapcell.file import LeapcellFile
+import urllib3
 import json
 
+GET_MANY_CHUNK_SIZE = 100
+
 support_op = [
     "eq",
     "gt",
@@ -32,6 +90,50 @@ def is_list_of_strings(lst):
     )
 
 
+def create_params(
+    record: Dict[str, Any],
+    on_conflict: List[str] | str | None = None,
+    action: str = "create_if_not_exists",
+) -> Dict[str, Any]:
+    record_values = dict()
+    for key, value in record.items():
+        record_values[key] = value
+    params: Dict[str, Any] = {
+        "record": record_values,
+    }
+    if on_conflict:
+        if isinstance(on_conflict, str):
+            params["on_conflict"] = [on_conflict]
+        elif isinstance(on_conflict, list):
+            params["on_conflict"] = on_conflict
+        params["action"] = action
+    return params
+
+
+def bulk_params(
+    records: List[Dict[str, Any]], on_conflict: List[str] | str | None = None
+) -> Dict[str, Any]:
+    if isinstance(records, RecordBatch):
+        # encoded when the batch was sized, not again
+        params: Dict[str, Any] = {"records": records.json()}
+    else:
+        new_values = []
+        for new_record in records:
+            record_values = dict()
+            for key, value in new_record.items():
+                record_values[key] = value
+            new_values.append(record_values)
+        params = {
+            "records": new_values,
+        }
+    if on_conflict:
+        if isinstance(on_conflict, str):
+            params["on_conflict"] = [on_conflict]
+        elif is_list_of_strings(on_conflict):
+            params["on_conflict"] = on_conflict
+    return params
+
+
 class LeapcellFilter(object):
     def __init__(self, **args):
         type_ = args.get("type", "eq")
@@ -117,7 +219,8 @@ class KaithQuery(object):
     ) -> None:
         self.fields = fields
         self._filter = filter
-        self._orders = orders
+        # order_by appends, the shared default list must not grow across queries
+        self._orders = list(orders)
         self._offset = offset
         self._limit = limit
         self._aggr = aggr
@@ -290,6 +393,217 @@ class KaithQuery(object):
             for record in resp["records"]
         ]
 
+    def stream(self) -> Iterator[Record]:
+        """execute query and yield records while the response is still being
+        read, the first record arrives before the whole page is downloaded and
+        decoded, and only the records not yet consumed are kept in memory
+
+        Returns:
+            Iterator[Record]: Record iterator
+        """
+        for record in self._requester.stream_records(self._query_params()):
+            yield Record(
+                requester=self._requester,
+                record_id=record["record_id"],
+                fields=record["fields"],
+                create_time=record.get("create_time", None),
+                update_time=record.get("update_time", None),
+            )
+
+    def search_stream(
+        self,
+        query: str,
+        search_fields: List[str] = [],
+        boost_fields: Dict[str, int] = {},
+    ) -> Iterator[Record]:
+        """search records by keyword, yielding records while the response is read
+
+        Args:
+            query (str): search keyword
+            fields (List[str], optional): search fields. Defaults to [].
+            boost_fields (Dict[str, int], optional): boost fields. Defaults to {}.
+
+        Returns:
+            Iterator[Record]: Record iterator
+        """
+        req = self._search_params(query, search_fields, boost_fields)
+        for record in self._requester.stream_search(req):
+            yield Record(
+                requester=self._requester,
+                record_id=record["record_id"],
+                fields=record["fields"],
+                create_time=record.get("create_time", None),
+                update_time=record.get("update_time", None),
+            )
+
+    def iter(
+        self,
+        page_size: int = 100,
+        prefetch: bool = True,
+        keyset: Optional[str] = None,
+    ) -> Iterator[Record]:
+        """iterate over all matched records, fetching one page at a time
+
+        Args:
+            page_size (int, optional): records per request. Defaults to 100.
+            prefetch (bool, optional): fetch the next page in the background while the current one is consumed. Defaults to True.
+            keyset (Optional[str], optional): page on this field with `field > last value` instead of offset, the field must be unique and sortable. Defaults to None.
+
+        Returns:
+            Iterator[Record]: Record iterator, at most two pages are held in memory
+        """
+        for records in self._iter_pages(page_size, prefetch, keyset):
+            for record in records:
+                yield Record(
+                    requester=self._requester,
+                    record_id=record["record_id"],
+                    fields=record["fields"],
+                    create_time=record.get("create_time", None),
+                    update_time=record.get("update_time", None),
+                )
+
+    def query_columns(self) -> ColumnBatch:
+        """execute query and return the records column by column, numeric and
+        time fields as typed arrays and str/label fields dictionary encoded.
+        The response is decoded as it streams in and no Record is created.
+
+        Returns:
+            ColumnBatch: columns of the matched records
+        """
+        batch = ColumnBatch(self._field_types())
+        records = self._requester.stream_records(self._query_params())
+        while True:
+            chunk = list(islice(records, COLUMN_CHUNK_SIZE))
+            if not chunk:
+                return batch
+            batch.extend(chunk)
+
+    def iter_column_batches(
+        self,
+        batch_size: int = 1000,
+        prefetch: bool = True,
+        keyset: Optional[str] = None,
+    ) -> Iterator[ColumnBatch]:
+        """iterate over all matched records as column batches, one per page
+
+        Args:
+            batch_size (int, optional): records per request and batch. Defaults to 1000.
+            prefetch (bool, optional): fetch the next page in the background while the current one is consumed. Defaults to True.
+            keyset (Optional[str], optional): page on this field with `field > last value` instead of offset, see iter. Defaults to None.
+
+        Returns:
+            Iterator[ColumnBatch]: column batches
+        """
+        types = self._field_types()
+        for records in self._iter_pages(batch_size, prefetch, keyset):
+            batch = ColumnBatch(types)
+            batch.extend(records)
+            yield batch
+
+    def _field_types(self) -> Dict[str, Optional[str]]:
+        return field_types(
+            self._requester.table_meta(), self._requester.name_type, self.fields
+        )
+
+    def _iter_pages(
+        self,
+        page_size: int,
+        prefetch: bool,
+        keyset: Optional[str],
+    ) -> Iterator[List[Dict[str, Any]]]:
+        if page_size <= 0:
+            raise ValueError("page_size must be positive")
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = self._offset
+            resp = self._page_query(page_size, offset, None)._query()
+            while True:
+                records = (resp or {}).get("records") or []
+                next_resp = None
+                if len(records) == page_size:
+                    offset += page_size
+                    after = self._keyset_value(records[-1], keyset)
+                    next_query = self._page_query(page_size, offset, after, keyset)
+                    if executor is not None:
+                        next_resp = executor.submit(next_query._query)
+                    else:
+                        next_resp = next_query
+                if records:
+                    yield records
+                if next_resp is None:
+                    return
+                if executor is not None:
+                    resp = next_resp.result()
+                else:
+                    resp = next_resp._query()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _page_query(
+        self,
+        page_size: int,
+        offset: int,
+        after: Any,
+        keyset: Optional[str] = None,
+    ) -> "KaithQuery":
+        if keyset is None:
+            return KaithQuery(
+                self._requester,
+                fields=self.fields,
+                filter=self._filter,
+                orders=self._orders,
+                offset=offset,
+                limit=page_size,
+            )
+
+        fields = self.fields
+        if fields and keyset not in fields:
+            fields = fields + [keyset]
+        orders = [o for o in self._orders if o[0] == keyset] or [(keyset, "asc")]
+        filter = self._filter
+        if after is not None:
+            if orders[0][1] == "desc":
+                bound = LeapcellField(keyset) < after
+            else:
+                bound = LeapcellField(keyset) > after
+            filter = self._merge_filter(bound)
+        return KaithQuery(
+            self._requester,
+            fields=fields,
+            filter=filter,
+            orders=orders,
+            offset=self._offset if after is None else 0,
+            limit=page_size,
+        )
+
+    def _merge_filter(self, filter: "LeapcellFilter") -> "LeapcellFilter":
+        # filters are flattened into one level, `&` would nest and mutate self._filter
+        base = self._condition2filter(self._filter)
+        if base is None:
+            return filter
+        base_type = base.filter["filter"]["type"]
+        if base_type == "and":
+            return LeapcellFilter(
+                type="and", fields=list(base.filter["filter"]["fields"]) + [filter]
+            )
+        if base_type in ["or", "not"]:
+            raise ValueError(
+                "keyset paging can not be combined with a '{}' filter".format(base_type)
+            )
+        return LeapcellFilter(type="and", fields=[base, filter])
+
+    @staticmethod
+    def _keyset_value(record: Dict[str, Any], keyset: Optional[str]) -> Any:
+        if keyset is None:
+            return None
+        if keyset in record["fields"]:
+            return record["fields"][keyset]
+        # record attributes like create_time sit next to the fields
+        if keyset in record:
+            return record[keyset]
+        raise KeyError("keyset field '{}' not found in record".format(keyset))
+
     def first(self):
         """get the first record
 
@@ -418,6 +732,12 @@ class KaithQuery(object):
     def _query(
         self,
     ) -> Dict | None:
+        req = self._query_params()
+        resp = self._requester.get_records(req)
+
+        return resp
+
+    def _query_params(self) -> Dict[str, Any]:
         fields = self.fields
         filter = self._filter
         orders = self._orders
@@ -439,39 +759,50 @@ class KaithQuery(object):
             req["fields"] = fields
         if sortByCol:
             req["orders"] = sortByCol
-
-        resp = self._requester.get_records(req)
-
-        return resp
+        return req
 
     def _update(
         self,
         values: Dict[str, Any],
     ) -> Optional[int]:
+        resp = self._requester.update_records(self._update_params(values))
+
+        if not resp:
+            return None
+
+        return resp["affect_count"]
+
+    def _update_params(self, values: Dict[str, Any]) -> Dict[str, Any]:
         filter = self._filter
         record_values = dict()
         for key, value in values.items():
             record_values[key] = value
         query_filter: Optional[Dict] = self._get_filter(filter)
 
-        resp = self._requester.update_records(
-            {
-                "filter": query_filter,
-                "fields": record_values,  # data transform, like datetime to int
-            }
-        )
+        return {
+            "filter": query_filter,
+            "fields": record_values,  # data transform, like datetime to int
+        }
 
+    def _search(
+        self,
+        query: str,
+        search_fields: List[str] = [],
+        boost_fields: Dict[str, int] = {},
+    ) -> Optional[Dict[str, Any]]:
+        req = self._search_params(query, search_fields, boost_fields)
+        resp = self._requester.search(req)
         if not resp:
             return None
 
-        return resp["affect_count"]
+        return resp
 
-    def _search(
+    def _search_params(
         self,
         query: str,
         search_fields: List[str] = [],
         boost_fields: Dict[str, int] = {},
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Dict[str, Any]:
         fields = self.fields
         filter = self._filter
         orders = self._orders
@@ -497,35 +828,39 @@ class KaithQuery(object):
             req["limit"] = limit
         if boost_fields:
             req["boost_fields"] = boost_fields
-
-        resp = self._requester.search(req)
-        if not resp:
-            return None
-
-        return resp
+        return req
 
     def _delete(
         self,
     ) -> Optional[int]:
-        filter = self._filter
-
-        query_filter: Optional[Dict] = self._get_filter(filter)
-
-        resp = self._requester.delete_records(
-            {
-                "filter": query_filter,
-            }
-        )
+        resp = self._requester.delete_records(self._delete_params())
 
         if not resp:
             return None
 
         return resp["affect_count"]
 
+    def _delete_params(self) -> Dict[str, Any]:
+        filter = self._filter
+
+        query_filter: Optional[Dict] = self._get_filter(filter)
+
+        return {
+            "filter": query_filter,
+        }
+
     def _count(
         self,
         distinct: Optional[bool] = None,
     ) -> Optional[int]:
+        resp = self._requester.aggr_record(self._count_params(distinct))
+
+        if not resp or not resp["metric"]:
+            return None
+
+        return resp["metric"]["value"]
+
+    def _count_params(self, distinct: Optional[bool] = None) -> Dict[str, Any]:
         filter = self._filter
 
         query_filter: Optional[Dict] = self._get_filter(filter)
@@ -539,12 +874,7 @@ class KaithQuery(object):
         }
         if distinct:
             params["metric"]["condition"] = "distinct"
-        resp = self._requester.aggr_record(params)
-
-        if not resp or not resp["metric"]:
-            return None
-
-        return resp["metric"]["value"]
+        return params
 
     def _condition2filter(
         self, conditions: Optional[Dict[str, Any] | LeapcellFilter]
@@ -644,6 +974,15 @@ class LeapcellTable(object):
         base_url (str): leapcell base url, default is https://api.leapcell.io
         field_type (str): field_type is the type of the field, it can be "id" or "name". Defaults to "name". if it's "id", the field name will be "13145252145", "13145252147" ...; if it's "name", the field name will be "field-0", "field-1", "field-2", ...,
         version (str): leapcell api version, default is v1
+        pool (urllib3.PoolManager, optional): connection pool shared with other tables, default creates a private one
+        meta_cache (TTLCache, optional): table meta cache shared with other tables, default disables caching
+        single_flight (SingleFlight, optional): coalesces identical concurrent reads, default disables coalescing
+        retry_policy (RetryPolicy, optional): retries of 429/5xx responses, default disables retries
+        rate_limiter (TokenBucket, optional): request rate limit shared with other tables, default is unlimited
+        concurrency_limiter (AdaptiveConcurrency, optional): adaptive limit on requests in flight shared with other tables, default is unlimited
+        codec (JSONCodec, optional): json backend of request and response bodies, default is the fastest installed
+        compression (RequestCompression, optional): compression of large request bodies, default sends them uncompressed
+        hooks (List[RequestHook], optional): request hooks, a list shared with the client so later additions apply, default is none
 
     Raises:
         KeyError: if field not found in table, raise KeyError
@@ -662,6 +1001,15 @@ class LeapcellTable(object):
         base_url: str,
         name_type: str = "name",
         version: str = "v1",
+        pool: Optional[urllib3.PoolManager] = None,
+        meta_cache: Optional[TTLCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrency] = None,
+        codec: Optional[JSONCodec] = None,
+        compression: Optional[RequestCompression] = None,
+        hooks: Optional[List[RequestHook]] = None,
     ) -> None:
         if name_type == "name":
             self._field_name_type = TableFieldType.NAME
@@ -675,8 +1023,18 @@ class LeapcellTable(object):
             table_id=table_id,
             version=version,
             name_type=name_type,
+            pool=pool,
+            meta_cache=meta_cache,
+            single_flight=single_flight,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            codec=codec,
+            compression=compression,
+            hooks=hooks,
         )
         self._table_id = table_id
+        self._loader: Optional[RecordLoader] = None
 
     def __repr__(self) -> str:
         return "table instance <table: {}, resource: {}>".format(
@@ -713,6 +1071,28 @@ class LeapcellTable(object):
         """
         return self._meta(self._table_id)
 
+    def refresh_meta(self) -> TableMeta:
+        """drop the cached table meta and fetch it again
+
+        Returns:
+            TableMeta: table meta information
+        """
+        self._requster.invalidate_table_meta()
+        return self._meta(self._table_id)
+
+    def schema(self, allow_unknown: bool = False) -> Schema:
+        """compile a validator of records from the table meta, it checks field
+        names and value types of whole batches locally and converts datetimes
+        of TIME fields to epoch seconds
+
+        Args:
+            allow_unknown (bool, optional): accept fields that are not in the table. Defaults to False.
+
+        Returns:
+            Schema: compiled schema
+        """
+        return Schema.from_meta(self.meta(), allow_unknown=allow_unknown)
+
     def create(
         self, record: Dict[str, Any], on_conflict: List[str] | str | None = None
     ) -> Record:
@@ -725,21 +1105,8 @@ class LeapcellTable(object):
         Returns:
             Record: _description_
         """
-        record_values = dict()
-        for key, value in record.items():
-            record_values[key] = value
-        params: Dict[str, Any] = {
-            "record": record_values,
-        }
-        if on_conflict:
-            if isinstance(on_conflict, str):
-                params["on_conflict"] = [on_conflict]
-            elif isinstance(on_conflict, list):
-                params["on_conflict"] = on_conflict
-            params["action"] = "create_if_not_exists"
-
         data = self._requster.create_record(
-            params,
+            create_params(record, on_conflict, action="create_if_not_exists"),
         )
         new_record_data = data["record"]
 
@@ -768,21 +1135,8 @@ class LeapcellTable(object):
             Record: Record instance
         """
 
-        record_values = dict()
-        for key, value in record.items():
-            record_values[key] = value
-        params: Dict[str, Any] = {
-            "record": record_values,
-        }
-        if on_conflict:
-            if isinstance(on_conflict, str):
-                params["on_conflict"] = [on_conflict]
-            elif isinstance(on_conflict, list):
-                params["on_conflict"] = on_conflict
-            params["action"] = "upsert"
-
         data = self._requster.create_record(
-            params,
+            create_params(record, on_conflict, action="upsert"),
         )
         new_record_data = data["record"]
 
@@ -796,90 +1150,144 @@ class LeapcellTable(object):
         )
 
     def bulk_upsert(
-        self, records: List[Dict[str, Any]], on_conflict: List[str] | str | None = None
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
     ) -> Optional[List[Record]]:
         """bulk upsert records
 
         Args:
-            records (List[Dict[str, Any]]): records information
+            records (Iterable[Dict[str, Any]]): records information, any iterable including generators
             on_conflict (List[str] | str | None, optional): not create if the field value exist. Default None.
+            batch_size (int, optional): max records per request. Defaults to DEFAULT_BATCH_SIZE.
+            max_batch_bytes (int, optional): max json size of the records per request. Defaults to DEFAULT_BATCH_BYTES.
+            concurrency (int, optional): batches sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+            max_retries (int, optional): retries of a batch that was not processed (connection refused, 429), and with on_conflict of timeouts and 5xx. Defaults to DEFAULT_BATCH_RETRIES.
+            validate (bool, optional): check and coerce every batch against the table schema before it is sent, see schema(). Defaults to False.
+
+        Raises:
+            ValidationError: validate is set and some records do not match the schema, the batches before them may have been sent
+            LeapcellException: some batches still failed after retries, use bulk_create_batches to get per-batch results
 
         Returns:
             Optional[List[Record]]: Record instance list
         """
-        new_values = []
-        for new_record in records:
-            record_values = dict()
-            for key, value in new_record.items():
-                record_values[key] = value
-            new_values.append(record_values)
-
-        params: Dict[str, Any] = {
-            "records": new_values,
-        }
-        if on_conflict:
-            if isinstance(on_conflict, str):
-                params["on_conflict"] = [on_conflict]
-            elif is_list_of_strings(on_conflict):
-                params["on_conflict"] = on_conflict
-        data = self._requster.create_records(
-            params,
+        return self.bulk_create(
+            records,
+            on_conflict=on_conflict,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            validate=validate,
         )
 
-        if not data or not data["records"]:
-            return None
-
-        new_record_datas = data["records"]
-
-        return [
-            Record(
-                record_id=new_record_data["record_id"],
-                fields=new_record_data["fields"],
-                requester=self._requster,
-                create_time=new_record_data.get("create_time", None),
-                update_time=new_record_data.get("update_time", None),
-            )
-            for new_record_data in new_record_datas
-        ]
-
     def bulk_create(
-        self, records: List[Dict[str, Any]], on_conflict: List[str] | str | None = None
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
     ) -> Optional[List[Record]]:
         """bulk create records
 
         Args:
-            records (List[Dict[str, Any]]): records information
+            records (Iterable[Dict[str, Any]]): records information, any iterable including generators
             on_conflict (List[str] | str | None, optional): not create if the field value exist. Default None.
+            batch_size (int, optional): max records per request. Defaults to DEFAULT_BATCH_SIZE.
+            max_batch_bytes (int, optional): max json size of the records per request. Defaults to DEFAULT_BATCH_BYTES.
+            concurrency (int, optional): batches sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+            max_retries (int, optional): retries of a batch that was not processed (connection refused, 429), and with on_conflict of timeouts and 5xx. Defaults to DEFAULT_BATCH_RETRIES.
+            validate (bool, optional): check and coerce every batch against the table schema before it is sent, see schema(). Defaults to False.
 
         Raises:
             KeyError: field not found
+            ValidationError: validate is set and some records do not match the schema, the batches before them may have been sent
+            LeapcellException: some batches still failed after retries, use bulk_create_batches to get per-batch results
 
         Returns:
-            Optional[List[Record]]: Record instance list
+            Optional[List[Record]]: Record instance list, in input order
         """
-        new_values = []
-        for new_record in records:
-            record_values = dict()
-            for key, value in new_record.items():
-                record_values[key] = value
-            new_values.append(record_values)
+        results = self.bulk_create_batches(
+            records,
+            on_conflict=on_conflict,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            validate=validate,
+        )
+        new_records = flatten_batches(results)
+        if not new_records:
+            return None
+        return new_records
 
-        params: Dict[str, Any] = {
-            "records": new_values,
-        }
-        if on_conflict:
-            if isinstance(on_conflict, str):
-                on_conflict = [on_conflict]
-            elif isinstance(on_conflict, list):
-                params["on_conflict"] = on_conflict
+    def bulk_create_batches(
+        self,
+        records: Iterable[Dict[str, Any]],
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        validate: bool = False,
+    ) -> List[BatchResult]:
+        """bulk create records in concurrent batches and report every batch
+
+        Args:
+            records (Iterable[Dict[str, Any]]): records information, any iterable including generators
+            on_conflict (List[str] | str | None, optional): not create if the field value exist. Default None.
+            batch_size (int, optional): max records per request. Defaults to DEFAULT_BATCH_SIZE.
+            max_batch_bytes (int, optional): max json size of the records per request. Defaults to DEFAULT_BATCH_BYTES.
+            concurrency (int, optional): batches sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+            max_retries (int, optional): retries of a batch that was not processed (connection refused, 429), and with on_conflict of timeouts and 5xx. Defaults to DEFAULT_BATCH_RETRIES.
+            validate (bool, optional): check and coerce every batch against the table schema before it is sent, see schema(). Defaults to False.
+
+        Raises:
+            ValidationError: validate is set and some records do not match the schema, the batches before them may have been sent
+
+        Returns:
+            List[BatchResult]: one result per batch in input order, with created records or the last error
+        """
+        if validate:
+            # batch by batch, the input is never loaded whole
+            records = self.schema().coerce_iter(records, batch_size)
+        return run_batches(
+            lambda batch: self._create_batch(batch, on_conflict),
+            records,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            retryable=self._batch_retryable(on_conflict),
+            codec=self._requster.codec,
+        )
+
+    def _batch_retryable(
+        self, on_conflict: List[str] | str | None
+    ) -> Callable[[Exception], bool]:
+        # with on_conflict a batch sent twice creates its records once
+        idempotent = bool(on_conflict)
+        policy = self._requster._retry_policy
+        return lambda e: batch_retryable(e, idempotent, policy)
+
+    def _create_batch(
+        self, records: List[Dict[str, Any]], on_conflict: List[str] | str | None
+    ) -> List[Record]:
         data = self._requster.create_records(
-            params,
+            bulk_params(records, on_conflict),
         )
 
         if not data or not data["records"]:
-            return None
-
-        new_record_datas = data["records"]
+            return []
 
         return [
             Record(
@@ -889,9 +1297,115 @@ class LeapcellTable(object):
                 create_time=new_record_data.get("create_time", None),
                 update_time=new_record_data.get("update_time", None),
             )
-            for new_record_data in new_record_datas
+            for new_record_data in data["records"]
         ]
 
+    def import_file(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        on_conflict: List[str] | str | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_bytes: int = DEFAULT_BATCH_BYTES,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+        max_retries: int = DEFAULT_BATCH_RETRIES,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """create the records of an NDJSON or CSV file in concurrent batches.
+        The file is read chunk by chunk and never loaded whole, every batch is
+        coerced with the table schema (see schema()) before it is sent.
+
+        Progress is checkpointed to `<path>.import.json` after every batch, an
+        interrupted import continues from the last byte offset whose records
+        were all created when it is run again. Batches sent after a failed one
+        may be sent again on resume, use on_conflict to skip existing records.
+
+        Args:
+            path (str): file to import, NDJSON lines of fields or CSV with a header of field names
+            format (Optional[str], optional): "ndjson" or "csv". Defaults to the file extension (.ndjson, .jsonl, .csv).
+            on_conflict (List[str] | str | None, optional): not create if the field value exist. Default None.
+            batch_size (int, optional): max records per request. Defaults to DEFAULT_BATCH_SIZE.
+            max_batch_bytes (int, optional): max file bytes per request. Defaults to DEFAULT_BATCH_BYTES.
+            concurrency (int, optional): batches sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+            max_retries (int, optional): retries of a batch that was not processed (connection refused, 429), and with on_conflict of timeouts and 5xx. Defaults to DEFAULT_BATCH_RETRIES.
+            resume (bool, optional): continue from the checkpoint instead of starting over. Defaults to True.
+
+        Raises:
+            ValidationError: records do not match the schema, the import stops before sending them
+            LeapcellException: a batch failed, import again to resume
+
+        Returns:
+            Dict[str, Any]: the checkpoint, with the number of `rows` created
+        """
+        importer = FileImport(
+            path,
+            send=lambda batch: self._requster.create_records(
+                bulk_params(batch, on_conflict)
+            ),
+            schema=self.schema(),
+            field_types=field_types(
+                self._requster.table_meta(), self._requster.name_type
+            ),
+            format=format,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            retryable=self._batch_retryable(on_conflict),
+            codec=self._requster.codec,
+        )
+        return importer.run(resume=resume)
+
+    def enable_write_behind(
+        self,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL_SECS,
+        on_error: Optional[ErrorCallback] = None,
+        concurrency: int = WRITE_BEHIND_CONCURRENCY,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+    ) -> WriteBehindBuffer:
+        """buffer Record.save() of this table and write the merged changes later
+
+        Repeated saves of a record between flushes become one update. There is
+        no update of many records with different values, so a flush still
+        sends one request per dirty record, `concurrency` at a time, only
+        records with identical changes share a request. Writes that failed
+        with a temporary error are sent again by the next flushes, up to
+        `max_retries` times, then dropped like any other failed write.
+
+        Args:
+            max_pending (int, optional): dirty records that trigger a flush. Defaults to WRITE_BEHIND_MAX_PENDING.
+            flush_interval (float, optional): seconds between background flushes. Defaults to WRITE_BEHIND_FLUSH_INTERVAL_SECS.
+            on_error (ErrorCallback, optional): called with (record_ids, fields, exception) for every dropped write. Defaults to None.
+            concurrency (int, optional): updates sent at once by a flush. Defaults to WRITE_BEHIND_CONCURRENCY.
+            max_retries (int, optional): flushes a failed change is sent again by. Defaults to WRITE_BEHIND_MAX_RETRIES.
+
+        Returns:
+            WriteBehindBuffer: the buffer, pending changes are also flushed at exit
+        """
+        self.disable_write_behind()
+        self._requster.write_behind = WriteBehindBuffer(
+            self._requster,
+            max_pending=max_pending,
+            flush_interval=flush_interval,
+            on_error=on_error,
+            concurrency=concurrency,
+            max_retries=max_retries,
+        )
+        return self._requster.write_behind
+
+    def disable_write_behind(self) -> None:
+        """flush pending changes and make Record.save() write immediately again"""
+        buffer = self._requster.write_behind
+        self._requster.write_behind = None
+        if buffer is not None:
+            buffer.close()
+
+    def flush(self) -> None:
+        """write all changes held by the write-behind buffer now"""
+        if self._requster.write_behind is not None:
+            self._requster.write_behind.flush()
+
     def _table_view2records(self, table_view: Dict[str, Any]) -> List[Record]:
         return [
             Record(
@@ -901,6 +1415,89 @@ class LeapcellTable(object):
             for record in table_view["records"]
         ]
 
+    def enable_record_cache(
+        self,
+        max_entries: int = RECORD_CACHE_MAX_ENTRIES,
+        max_bytes: int = RECORD_CACHE_MAX_BYTES,
+        ttl: float = RECORD_CACHE_TTL_SECS,
+    ) -> None:
+        """cache get_by_id results on this table handle, entries are dropped on
+        Record.save(), Record.delete(), delete_by_id, update and delete made through it
+
+        Args:
+            max_entries (int, optional): max cached records. Defaults to RECORD_CACHE_MAX_ENTRIES.
+            max_bytes (int, optional): max total serialized size of cached records. Defaults to RECORD_CACHE_MAX_BYTES.
+            ttl (float, optional): seconds a record stays cached. Defaults to RECORD_CACHE_TTL_SECS.
+        """
+        self._requster.set_record_cache(LRUCache(max_entries, max_bytes, ttl))
+
+    def disable_record_cache(self) -> None:
+        """stop caching get_by_id results"""
+        self._requster.set_record_cache(None)
+
+    def record_cache_stats(self) -> Dict[str, int]:
+        """hits, misses and evictions of the record cache
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, size and bytes
+        """
+        cache = self._requster._record_cache
+        if cache is None:
+            return {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "bytes": 0}
+        return cache.stats()
+
+    def enable_upload_cache(
+        self,
+        max_entries: int = UPLOAD_CACHE_MAX_ENTRIES,
+        ttl: float = UPLOAD_CACHE_TTL_SECS,
+        path: Optional[str] = None,
+        max_disk_entries: int = UPLOAD_CACHE_MAX_DISK_ENTRIES,
+        verify_on_miss: bool = False,
+    ) -> None:
+        """cache uploaded files by the sha256 of their content, upload_file and
+        upload_many return the file of an identical earlier upload without
+        sending it again
+
+        Args:
+            max_entries (int, optional): max files cached in memory. Defaults to UPLOAD_CACHE_MAX_ENTRIES.
+            ttl (float, optional): seconds a file stays cached. Defaults to UPLOAD_CACHE_TTL_SECS.
+            path (Optional[str], optional): dedicated directory to keep the cache across processes and restarts. Defaults to None.
+            max_disk_entries (int, optional): max files cached on disk, least recently used are removed first. Defaults to UPLOAD_CACHE_MAX_DISK_ENTRIES.
+            verify_on_miss (bool, optional): check with a HEAD request that the link of a file found on disk, not in memory, still resolves before using it. Defaults to False.
+        """
+        self._requster.set_upload_cache(
+            UploadCache(
+                max_entries=max_entries,
+                ttl=ttl,
+                path=path,
+                max_disk_entries=max_disk_entries,
+                verify=self._requster.verify_file if verify_on_miss else None,
+            )
+        )
+
+    def disable_upload_cache(self) -> None:
+        """upload every file again"""
+        self._requster.set_upload_cache(None)
+
+    def upload_cache_stats(self) -> Dict[str, int]:
+        """hits, misses and evictions of the upload cache
+
+        Returns:
+            Dict[str, int]: hits, disk_hits, misses, evictions, verify_failures, size and disk_size
+        """
+        cache = self._requster._upload_cache
+        if cache is None:
+            return {
+                "hits": 0,
+                "disk_hits": 0,
+                "misses": 0,
+                "evictions": 0,
+                "verify_failures": 0,
+                "size": 0,
+                "disk_size": 0,
+            }
+        return cache.stats()
+
     def get_by_id(
         self,
         id: str,
@@ -913,6 +1510,10 @@ class LeapcellTable(object):
         Returns:
             Optional[Record]: Record instance
         """
+        if self._loader is not None:
+            record = self._loader.load(id)
+            return self._to_record(record) if record is not None else None
+
         data = self._requster.get_record(
             record_id=id,
         )
@@ -927,6 +1528,71 @@ class LeapcellTable(object):
             update_time=data["record"].get("update_time", None),
         )
 
+    def get_many(
+        self,
+        ids: List[str],
+        chunk_size: int = GET_MANY_CHUNK_SIZE,
+        concurrency: int = DEFAULT_BULK_CONCURRENCY,
+    ) -> List[Optional[Record]]:
+        """get records by ids with a few `in` queries instead of one request per id
+
+        Args:
+            ids (List[str]): record ids
+            chunk_size (int, optional): ids per query. Defaults to GET_MANY_CHUNK_SIZE.
+            concurrency (int, optional): queries sent at once. Defaults to DEFAULT_BULK_CONCURRENCY.
+
+        Returns:
+            List[Optional[Record]]: records in the order of ids, None for missing ids
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        chunks = [
+            unique_ids[i : i + chunk_size] for i in range(0, len(unique_ids), chunk_size)
+        ]
+        found: Dict[str, Dict[str, Any]] = {}
+        if len(chunks) == 1 or concurrency <= 1:
+            for chunk in chunks:
+                found.update(self._fetch_many(chunk))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for part in executor.map(self._fetch_many, chunks):
+                    found.update(part)
+        return [self._to_record(found[id]) if id in found else None for id in ids]
+
+    def enable_auto_batching(
+        self,
+        window: float = AUTO_BATCH_WINDOW_SECS,
+        max_batch: int = AUTO_BATCH_MAX_SIZE,
+    ) -> None:
+        """collect get_by_id calls made from many threads within `window` seconds into one query
+
+        Args:
+            window (float, optional): seconds to wait for more ids after the first one. Defaults to AUTO_BATCH_WINDOW_SECS.
+            max_batch (int, optional): ids that trigger a query before the window ends. Defaults to AUTO_BATCH_MAX_SIZE.
+        """
+        self._loader = RecordLoader(self._fetch_many, window=window, max_batch=max_batch)
+
+    def disable_auto_batching(self) -> None:
+        """send every get_by_id as its own request again"""
+        self._loader = None
+
+    def _fetch_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        resp = KaithQuery(
+            self._requster,
+            filter=LeapcellField(RECORD_ID_FIELD).in_(ids),
+            orders=[],
+            limit=len(ids),
+        )._query()
+        return {record["record_id"]: record for record in (resp or {}).get("records") or []}
+
+    def _to_record(self, record: Dict[str, Any]) -> Record:
+        return Record(
+            requester=self._requster,
+            record_id=record["record_id"],
+            fields=record["fields"],
+            create_time=record.get("create_time", None),
+            update_time=record.get("update_time", None),
+        )
+
     def get(
         self,
         conditions: Dict[str, Any],
@@ -967,6 +1633,92 @@ class LeapcellTable(object):
         """
         return KaithQuery(self._requster, fields=fields)
 
+    def export(
+        self,
+        path: str,
+        format: str = "ndjson",
+        split_field: str = "create_time",
+        ranges: int = DEFAULT_EXPORT_RANGES,
+        concurrency: int = DEFAULT_EXPORT_CONCURRENCY,
+        page_size: int = DEFAULT_EXPORT_PAGE_SIZE,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """export the whole table into files of a directory. The table is split
+        into ranges of a sortable field, ranges are fetched concurrently and
+        written page by page, one file per range. Progress is kept in
+        `manifest.json` of the directory and an interrupted export continues
+        from the last written page when run again.
+
+        Records created after the export started are not exported, the ranges
+        end at the highest split value found at the start. Records whose split
+        field is null are exported to a range of their own.
+
+        Args:
+            path (str): export directory, created if missing
+            format (str, optional): "ndjson", "csv" or "parquet". Defaults to "ndjson".
+            split_field (str, optional): sortable field to split on, a numeric field or create_time. Defaults to "create_time".
+            ranges (int, optional): number of ranges and files. Defaults to DEFAULT_EXPORT_RANGES.
+            concurrency (int, optional): ranges fetched at once. Defaults to DEFAULT_EXPORT_CONCURRENCY.
+            page_size (int, optional): records per request. Defaults to DEFAULT_EXPORT_PAGE_SIZE.
+            resume (bool, optional): continue the export found in path instead of starting over. Defaults to True.
+
+        Raises:
+            ImportError: parquet format without pyarrow installed
+            LeapcellException: some ranges failed, export again to resume them
+
+        Returns:
+            Dict[str, Any]: the manifest, with files and row counts of every range
+        """
+        exporter = TableExport(
+            path,
+            fetch=lambda r, offset, limit: self._export_page(
+                split_field, r, offset, limit
+            ),
+            columns=field_types(self._requster.table_meta(), self._requster.name_type),
+            format=format,
+            split_field=split_field,
+            ranges=ranges,
+            concurrency=concurrency,
+            page_size=page_size,
+            codec=self._requster.codec,
+        )
+        return exporter.run(lambda: self._export_bounds(split_field), resume=resume)
+
+    def _export_bounds(self, split_field: str) -> Tuple[Any, Any]:
+        bounds = []
+        for direction in ["asc", "desc"]:
+            resp = KaithQuery(
+                self._requster, orders=[(split_field, direction)], limit=1
+            )._query()
+            if not resp["records"]:
+                return None, None
+            bounds.append(KaithQuery._keyset_value(resp["records"][0], split_field))
+        return bounds[0], bounds[1]
+
+    def _export_page(
+        self, split_field: str, r: Dict[str, Any], offset: int, limit: int
+    ) -> List[Dict[str, Any]]:
+        filter = None
+        if r.get("null"):
+            filter = LeapcellField(split_field).is_null()
+        elif r["low"] is not None:
+            field = LeapcellField(split_field)
+            filter = LeapcellFilter(
+                type="and",
+                fields=[
+                    field >= r["low"],
+                    field <= r["high"] if r["last"] else field < r["high"],
+                ],
+            )
+        resp = KaithQuery(
+            self._requster,
+            filter=filter,
+            orders=[(split_field, "asc"), (RECORD_ID_FIELD, "asc")],
+            offset=offset,
+            limit=limit,
+        )._query()
+        return resp["records"] or []
+
     def delete(
         self,
         conditions: Dict[str, Any],
@@ -1052,13 +1804,14 @@ class LeapcellTable(object):
 
     def upload_file(
         self,
-        file: bytes,
+        file: UploadData,
         filename: Optional[str] = None,
     ) -> LeapcellFile:
         """upload file
 
         Args:
-            file (bytes): file bytes(base64)
+            file (UploadData): file bytes, a memoryview, a BytesIO or the path of a file
+            filename (Optional[str], optional): name of the file. Defaults to the base name of a path.
 
         Returns:
             LeapcellFile: file instance
@@ -1072,12 +1825,12 @@ class LeapcellTable(object):
 
     def upload_files(
         self,
-        files: List[bytes],
+        files: List[UploadData],
     ) -> List[LeapcellFile]:
-        """upload files
+        """upload files in one request
 
         Args:
-            files (List[bytes]): files bytes(base64), list length must be less than 10
+            files (List[UploadData]): files bytes or paths, list length must be less than 10
 
         Returns:
             List[LeapcellFile]: file instance list
@@ -1088,6 +1841,37 @@ class LeapcellTable(object):
         assert isinstance(data, list)
         return data
 
+    def upload_many(
+        self,
+        files: Iterable[Union[UploadData, Tuple[str, UploadData]]],
+        concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+        max_retries: int = DEFAULT_UPLOAD_RETRIES,
+        progress: Optional[Callable[[UploadResult], None]] = None,
+    ) -> List[UploadResult]:
+        """upload files concurrently, one request per file. Bodies are streamed
+        from memory or disk without copying the content and paths are opened
+        only when their upload starts, so memory stays flat however many files
+        are uploaded.
+
+        Args:
+            files (Iterable[Union[UploadData, Tuple[str, UploadData]]]): bytes, memoryviews, BytesIO, paths or (filename, data) tuples, any iterable including generators
+            concurrency (int, optional): uploads at once. Defaults to DEFAULT_UPLOAD_CONCURRENCY.
+            max_retries (int, optional): retries of an upload the server did not receive or refused with 429. Defaults to DEFAULT_UPLOAD_RETRIES.
+            progress (Optional[Callable[[UploadResult], None]], optional): called from the upload threads as bytes of a file are sent and when it is done. Defaults to None.
+
+        Returns:
+            List[UploadResult]: one result per file in input order, with the uploaded file or the last error, see uploaded_files()
+        """
+        return run_uploads(
+            self._requster._upload,
+            files,
+            concurrency=concurrency,
+            max_retries=max_retries,
+            progress=progress,
+            # an upload sent twice stores the file twice
+            retryable=self._batch_retryable(None),
+        )
+
     def __getitem__(
         self,
         key: str,
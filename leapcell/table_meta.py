@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Tuple
 from leapcell.field_meta import FieldMeta
 from leapcell.http_client import HTTPClient
 from leapcell.const import TableFieldType
@@ -21,6 +21,8 @@ class TableMeta():
         self._display_field_metas = {
             item.name: item for item in field_metas.values()}
         self._field_name_type = field_name_type
+        # records with all fields of the table share one interned layout
+        requster.field_layouts.register(self.field_names)
 
     @property
     def requster(self):
@@ -50,6 +52,10 @@ class TableMeta():
     def display_field_metas(self):
         return self._display_field_metas
 
+    @property
+    def field_names(self) -> Tuple[str, ...]:
+        return tuple(self.field_metas)
+
     @property
     def field_name_type(self):
         return self._field_name_type
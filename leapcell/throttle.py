@@ -0,0 +1,156 @@
+from typing import Dict, Optional
+import threading
+import time
+
+ADAPTIVE_INITIAL_LIMIT = 8
+ADAPTIVE_MIN_LIMIT = 1
+ADAPTIVE_MAX_LIMIT = 256
+# latency above this multiple of the baseline counts as congestion
+ADAPTIVE_LATENCY_TOLERANCE = 2.0
+# absolute slack so jitter on very fast responses is not taken for congestion
+ADAPTIVE_LATENCY_SLACK_SECS = 0.005
+ADAPTIVE_BACKOFF_RATIO = 0.7
+# status codes the server sends when it is overloaded
+OVERLOAD_STATUS_CODES = frozenset([429, 503])
+
+
+class TokenBucket(object):
+    """thread-safe token bucket rate limiter, one instance can be shared by
+    many clients, tables and threads to keep their combined request rate
+    under `rate` per second with bursts of up to `burst` requests.
+
+    Args:
+        rate (float): tokens added per second
+        burst (int, optional): bucket size. Defaults to max(1, rate).
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = rate
+        self._burst = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waited = 0.0
+        self._acquired = 0
+
+    def reserve(self, tokens: int = 1) -> float:
+        """take tokens now, possibly going into debt, and return the seconds
+        the caller has to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            self._acquired += tokens
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+            self._waited += wait
+            return wait
+
+    def acquire(self, tokens: int = 1) -> float:
+        """block until tokens are available, returns the seconds waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate": self._rate,
+                "acquired": self._acquired,
+                "waited_secs": self._waited,
+            }
+
+
+class AdaptiveConcurrency(object):
+    """AIMD limit on requests in flight. Every healthy response raises the
+    limit by about one per round trip, an overload status (429/503), an error
+    or latency above `latency_tolerance` times the baseline cuts it by
+    `backoff_ratio`, at most once per round trip. The limit settles near the
+    concurrency the server can actually serve.
+
+    Args:
+        initial_limit (int, optional): starting limit. Defaults to ADAPTIVE_INITIAL_LIMIT.
+        min_limit (int, optional): lowest limit. Defaults to ADAPTIVE_MIN_LIMIT.
+        max_limit (int, optional): highest limit. Defaults to ADAPTIVE_MAX_LIMIT.
+        latency_tolerance (float, optional): latency multiple of the baseline treated as congestion. Defaults to ADAPTIVE_LATENCY_TOLERANCE.
+        backoff_ratio (float, optional): factor the limit is multiplied by on congestion. Defaults to ADAPTIVE_BACKOFF_RATIO.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = ADAPTIVE_INITIAL_LIMIT,
+        min_limit: int = ADAPTIVE_MIN_LIMIT,
+        max_limit: int = ADAPTIVE_MAX_LIMIT,
+        latency_tolerance: float = ADAPTIVE_LATENCY_TOLERANCE,
+        backoff_ratio: float = ADAPTIVE_BACKOFF_RATIO,
+    ) -> None:
+        self._min = max(1, min_limit)
+        self._max = max(self._min, max_limit)
+        self._limit = float(min(max(initial_limit, self._min), self._max))
+        self._tolerance = latency_tolerance
+        self._backoff = backoff_ratio
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> float:
+        """block until a slot is free, returns the time the slot was taken"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(
+        self, started: float, status: Optional[int] = None, error: bool = False
+    ) -> None:
+        """free the slot taken at `started` and adjust the limit from the outcome"""
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self._in_flight -= 1
+            if self._baseline is None:
+                self._baseline = latency
+            congested = (
+                error
+                or status in OVERLOAD_STATUS_CODES
+                or latency
+                > max(
+                    self._baseline * self._tolerance,
+                    self._baseline + ADAPTIVE_LATENCY_SLACK_SECS,
+                )
+            )
+            if congested:
+                # one cut per round trip, responses of the same burst don't compound
+                if now - self._last_decrease > self._baseline:
+                    self._limit = max(self._min, self._limit * self._backoff)
+                    self._last_decrease = now
+                    self._decreases += 1
+            else:
+                self._limit = min(self._max, self._limit + 1.0 / self._limit)
+                self._increases += 1
+                # slow moving baseline, follows drifts but not single spikes
+                self._baseline = min(latency, self._baseline * 0.95 + latency * 0.05)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "baseline_latency": self._baseline or 0.0,
+                "increases": self._increases,
+                "decreases": self._decreases,
+            }
@@ -0,0 +1,414 @@
+from typing import Dict, Any, List, Optional
+import http.client
+import socket
+import threading
+import time
+import urllib3
+import urllib3.connection
+import urllib3.connectionpool
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None  # type: ignore
+
+# values below 2^HISTOGRAM_BITS microseconds are exact, larger ones are kept
+# with 2^(HISTOGRAM_BITS-1) buckets per power of two, less than 1% error
+HISTOGRAM_BITS = 8
+HISTOGRAM_PERCENTILES = (50, 90, 99, 99.9)
+# phases of one attempt, in seconds, 0 when a pooled connection was reused
+TIMING_PHASES = ("dns", "connect", "tls", "ttfb", "body")
+
+
+class RequestTrace(object):
+    """one request as seen by the hooks, from before the first attempt to
+    the parsed response or the error. Timings are of the last attempt:
+
+    - dns, connect, tls: opening a new connection, 0 on a reused one
+    - ttfb: from sending the request to the response headers, body upload included
+    - body: reading the response body
+    - duration: the whole request with retries, backoff and limiter waits
+
+    Args:
+        method (str): http method
+        endpoint (str): url template, e.g. "/table/{table_id}/record/{record_id}"
+        resource (str): repository of the table
+        table_id (str): id of the table
+        url (str): full url
+    """
+
+    __slots__ = (
+        "method",
+        "endpoint",
+        "resource",
+        "table_id",
+        "url",
+        "request_bytes",
+        "response_bytes",
+        "status",
+        "retries",
+        "error",
+        "start",
+        "duration",
+        "dns",
+        "connect",
+        "tls",
+        "ttfb",
+        "body",
+        "reused_connection",
+        "context",
+        "_started",
+        "_sent",
+        "_headers",
+    )
+
+    def __init__(
+        self, method: str, endpoint: str, resource: str, table_id: str, url: str
+    ) -> None:
+        self.method = method
+        self.endpoint = endpoint
+        self.resource = resource
+        self.table_id = table_id
+        self.url = url
+        self.request_bytes = 0
+        self.response_bytes: Optional[int] = None
+        self.status: Optional[int] = None
+        self.retries = 0
+        self.error: Optional[Exception] = None
+        self.start = time.time()
+        self.duration = 0.0
+        self.reused_connection = True
+        # per-hook state, e.g. the span of OpenTelemetryHook
+        self.context: Dict[str, Any] = {}
+        self._started = time.perf_counter()
+        self._reset_attempt()
+
+    def _reset_attempt(self) -> None:
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.body = 0.0
+        self.reused_connection = True
+        self._sent = 0.0
+        self._headers = 0.0
+
+    @property
+    def key(self) -> str:
+        """method and endpoint, e.g. "POST /table/{table_id}/record/query" """
+        return "{} {}".format(self.method, self.endpoint)
+
+    def timings(self) -> Dict[str, float]:
+        """seconds of every phase of the last attempt and of the whole request"""
+        out = {phase: getattr(self, phase) for phase in TIMING_PHASES}
+        out["duration"] = self.duration
+        return out
+
+    def __repr__(self) -> str:
+        return "<request: {}, status: {}, retries: {}, duration: {:.4f}s, error: {}>".format(
+            self.key, self.status, self.retries, self.duration, self.error
+        )
+
+
+class RequestHook(object):
+    """base of request hooks, subclasses override what they need. Hooks run
+    on the thread sending the request, in the order they were added, and
+    must not raise."""
+
+    def before_request(self, trace: RequestTrace) -> None:
+        """called once per request before the first attempt, only method, url and sizes are set"""
+
+    def after_request(self, trace: RequestTrace) -> None:
+        """called once per request after the body was read or the request failed"""
+
+
+_local = threading.local()
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """trace of the request being sent on this thread"""
+    return getattr(_local, "trace", None)
+
+
+def set_current_trace(trace: Optional[RequestTrace]) -> None:
+    _local.trace = trace
+
+
+class _TracedResponse(http.client.HTTPResponse):
+    def begin(self) -> None:
+        super().begin()
+        trace = current_trace()
+        if trace is not None and not trace._headers:
+            trace._headers = time.perf_counter()
+            trace.ttfb = trace._headers - trace._sent
+
+
+class _TracedConnectionMixin(object):
+    """times new connections and requests of the traced thread, connections
+    of untraced requests behave like the plain urllib3 ones"""
+
+    response_class = _TracedResponse
+    _tls = False
+
+    def _new_conn(self) -> socket.socket:
+        trace = current_trace()
+        if trace is None:
+            return super()._new_conn()  # type: ignore[misc]
+        start = time.perf_counter()
+        host = self._dns_host  # type: ignore[attr-defined]
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]  # type: ignore[attr-defined]
+        except OSError:
+            # urllib3 resolves again and raises its own error
+            return super()._new_conn()  # type: ignore[misc]
+        resolved = time.perf_counter()
+        self._dns_host = address
+        try:
+            sock = super()._new_conn()  # type: ignore[misc]
+        except urllib3.exceptions.HTTPError:
+            # the other addresses of the host are tried by urllib3
+            self._dns_host = host
+            sock = super()._new_conn()  # type: ignore[misc]
+        finally:
+            self._dns_host = host
+        trace.dns = resolved - start
+        trace.connect = time.perf_counter() - resolved
+        return sock
+
+    def connect(self) -> None:
+        trace = current_trace()
+        if trace is None:
+            return super().connect()  # type: ignore[misc]
+        start = time.perf_counter()
+        super().connect()  # type: ignore[misc]
+        trace.reused_connection = False
+        if self._tls:
+            # https connect() is tcp and then tls, the tcp part was timed above
+            trace.tls = max(0.0, time.perf_counter() - start - trace.dns - trace.connect)
+
+    def request(self, *args: Any, **kwargs: Any) -> None:
+        trace = current_trace()
+        if trace is not None:
+            trace._sent = time.perf_counter()
+        return super().request(*args, **kwargs)  # type: ignore[misc]
+
+
+class TracedHTTPConnection(_TracedConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class TracedHTTPSConnection(_TracedConnectionMixin, urllib3.connection.HTTPSConnection):
+    _tls = True
+
+
+class TracedHTTPConnectionPool(urllib3.connectionpool.HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(urllib3.connectionpool.HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+TRACED_POOL_CLASSES = {
+    "http": TracedHTTPConnectionPool,
+    "https": TracedHTTPSConnectionPool,
+}
+
+
+class LatencyHistogram(object):
+    """LatencyHistogram counts values in log-linear buckets like an HDR
+    histogram: memory is bounded by the range of the values, not their
+    number, and percentiles are within 1% of the recorded values. Values
+    are recorded in seconds and kept as whole microseconds.
+
+    Args:
+        bits (int, optional): precision, 2^(bits-1) buckets per power of two. Defaults to HISTOGRAM_BITS.
+    """
+
+    def __init__(self, bits: int = HISTOGRAM_BITS) -> None:
+        self._bits = bits
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts: Dict[int, int] = {}
+            self.count = 0
+            self._sum = 0
+            self._min = 0
+            self._max = 0
+
+    def _bucket(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self._bits)
+        # monotonic in value: exact below 2^bits, then (shift, top bits)
+        return (shift << self._bits) | (value >> shift)
+
+    def _value(self, bucket: int) -> int:
+        shift = bucket >> self._bits
+        low = (bucket & ((1 << self._bits) - 1)) << shift
+        return low + ((1 << shift) >> 1)
+
+    def record(self, seconds: float) -> None:
+        value = max(0, int(seconds * 1e6))
+        bucket = self._bucket(value)
+        with self._lock:
+            self._counts[bucket] = self._counts.get(bucket, 0) + 1
+            if not self.count or value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+            self.count += 1
+            self._sum += value
+
+    def percentile(self, p: float) -> float:
+        """value in seconds below which p percent of the values are"""
+        with self._lock:
+            return self._percentiles([p])[0]
+
+    def _percentiles(self, ps: List[float]) -> List[float]:
+        if not self.count:
+            return [0.0 for _ in ps]
+        buckets = sorted(self._counts.items())
+        out = []
+        for p in ps:
+            rank = max(1, int(p / 100.0 * self.count + 0.5))
+            seen = 0
+            for bucket, count in buckets:
+                seen += count
+                if seen >= rank:
+                    break
+            value = min(self._max, max(self._min, self._value(bucket)))
+            out.append(value / 1e6)
+        return out
+
+    def snapshot(self) -> Dict[str, float]:
+        """count, min, max, mean and percentiles, in milliseconds"""
+        with self._lock:
+            values = self._percentiles(list(HISTOGRAM_PERCENTILES))
+            out = {
+                "count": self.count,
+                "min_ms": self._min / 1e3,
+                "max_ms": self._max / 1e3,
+                "mean_ms": round(self._sum / self.count / 1e3, 3) if self.count else 0.0,
+            }
+        for p, value in zip(HISTOGRAM_PERCENTILES, values):
+            out["p{:g}_ms".format(p)] = round(value * 1e3, 3)
+        return out
+
+    def __repr__(self) -> str:
+        return "<latency histogram: {} values>".format(self.count)
+
+
+class _EndpointStats(object):
+    def __init__(self) -> None:
+        self.duration = LatencyHistogram()
+        self.ttfb = LatencyHistogram()
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses: Dict[int, int] = {}
+
+
+class HistogramHook(RequestHook):
+    """HistogramHook keeps latency histograms of every endpoint in memory,
+    keyed by method and url template so requests of all records and tables
+    share one histogram, e.g. "GET /table/{table_id}/record/{record_id}".
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointStats] = {}
+
+    def after_request(self, trace: RequestTrace) -> None:
+        key = trace.key
+        stats = self._endpoints.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._endpoints.setdefault(key, _EndpointStats())
+        stats.duration.record(trace.duration)
+        if trace.status is not None:
+            stats.ttfb.record(trace.ttfb)
+        with self._lock:
+            if trace.error is not None:
+                stats.errors += 1
+            stats.retries += trace.retries
+            stats.request_bytes += trace.request_bytes
+            stats.response_bytes += trace.response_bytes or 0
+            if trace.status is not None:
+                stats.statuses[trace.status] = stats.statuses.get(trace.status, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """per endpoint: requests, errors, retries, bytes, http codes and the
+        duration and ttfb histograms in milliseconds"""
+        with self._lock:
+            endpoints = list(self._endpoints.items())
+        out = {}
+        for key, stats in endpoints:
+            with self._lock:
+                counters = {
+                    "requests": stats.duration.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "request_bytes": stats.request_bytes,
+                    "response_bytes": stats.response_bytes,
+                    "statuses": dict(stats.statuses),
+                }
+            counters["duration"] = stats.duration.snapshot()
+            counters["ttfb"] = stats.ttfb.snapshot()
+            out[key] = counters
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints = {}
+
+
+class OpenTelemetryHook(RequestHook):
+    """OpenTelemetryHook emits a client span per request with the http
+    semantic-convention attributes and the phase timings, it needs
+    `pip install leapcell[otel]` and an sdk configured by the application.
+
+    Args:
+        tracer (Any, optional): OpenTelemetry tracer. Defaults to the tracer of the global provider.
+    """
+
+    def __init__(self, tracer: Optional[Any] = None) -> None:
+        if otel_trace is None:
+            raise ImportError(
+                "opentelemetry-api is required for tracing spans, install it with `pip install leapcell[otel]`"
+            )
+        self._tracer = tracer or otel_trace.get_tracer("leapcell")
+
+    def before_request(self, trace: RequestTrace) -> None:
+        trace.context["otel_span"] = self._tracer.start_span(
+            "leapcell {}".format(trace.key),
+            kind=otel_trace.SpanKind.CLIENT,
+            attributes={
+                "http.request.method": trace.method,
+                "url.full": trace.url,
+                "url.template": trace.endpoint,
+                "leapcell.resource": trace.resource,
+                "leapcell.table_id": trace.table_id,
+                "http.request.body.size": trace.request_bytes,
+            },
+        )
+
+    def after_request(self, trace: RequestTrace) -> None:
+        span = trace.context.pop("otel_span", None)
+        if span is None:
+            return
+        if trace.status is not None:
+            span.set_attribute("http.response.status_code", trace.status)
+        if trace.response_bytes is not None:
+            span.set_attribute("http.response.body.size", trace.response_bytes)
+        span.set_attribute("http.request.resend_count", trace.retries)
+        span.set_attribute("leapcell.connection.reused", trace.reused_connection)
+        for phase in TIMING_PHASES:
+            span.set_attribute("leapcell.timing.{}_ms".format(phase), getattr(trace, phase) * 1e3)
+        if trace.error is not None:
+            span.record_exception(trace.error)
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(trace.error)))
+        elif trace.status is not None and trace.status >= 400:
+            span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+        span.end()
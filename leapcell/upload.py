@@ -0,0 +1,270 @@
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Callable, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from io import BytesIO
+import hashlib
+import mimetypes
+import os
+import time
+import uuid
+from leapcell.exp import LeapcellException
+from leapcell.bulk import batch_retryable
+
+# bytes handed to the socket at once, files are read into one reused buffer
+UPLOAD_CHUNK_SIZE = 256 * 1024
+DEFAULT_UPLOAD_CONCURRENCY = 4
+DEFAULT_UPLOAD_RETRIES = 2
+UPLOAD_RETRY_BACKOFF_SECS = 0.5
+
+UploadData = Union[bytes, bytearray, memoryview, BytesIO, str, "os.PathLike[str]"]
+
+
+class UploadSource(object):
+    """one file to upload, from bytes, a memoryview, a BytesIO or a path.
+    In-memory data is sent as slices of a memoryview and never copied, a path
+    is opened and read chunk by chunk only while it is being sent.
+
+    Args:
+        data (UploadData): file content or path of the file
+        filename (Optional[str], optional): name sent with the file. Defaults to the base name of a path or "file".
+    """
+
+    def __init__(self, data: UploadData, filename: Optional[str] = None) -> None:
+        self.path: Optional[str] = None
+        self._view: Optional[memoryview] = None
+        if isinstance(data, (str, os.PathLike)):
+            self.path = os.fspath(data)
+            self.size = os.path.getsize(self.path)
+            if filename is None:
+                filename = os.path.basename(self.path)
+        elif isinstance(data, BytesIO):
+            self._view = data.getbuffer()
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self._view = memoryview(data).cast("B")
+        else:
+            raise TypeError(
+                "invalid data {}, it should be bytes, memoryview, BytesIO or a path".format(
+                    type(data)
+                )
+            )
+        if self._view is not None:
+            self.size = self._view.nbytes
+        self.filename = filename or "file"
+
+    @property
+    def content_type(self) -> str:
+        """type guessed from the filename, as urllib3 form fields do"""
+        return mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+
+    @property
+    def view(self) -> Optional[memoryview]:
+        """the content of an in-memory source, None for a path"""
+        return self._view
+
+    def digest(self) -> str:
+        """sha256 of the content, a path is read chunk by chunk"""
+        h = hashlib.sha256()
+        for chunk in self.chunks():
+            h.update(chunk)
+        return h.hexdigest()
+
+    def chunks(self, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[Any]:
+        if self._view is not None:
+            view = self._view
+            for start in range(0, len(view), chunk_size):
+                yield view[start : start + chunk_size]
+            return
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        with open(self.path, "rb") as f:  # type: ignore[arg-type]
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    return
+                yield view[:n]
+
+    def __repr__(self) -> str:
+        return "<upload source: {}, size: {}>".format(self.filename, self.size)
+
+
+Progress = Callable[[int], None]
+
+
+class MultipartBody(object):
+    """multipart/form-data body streamed part by part, its length is known
+    up front so it is sent with a Content-Length instead of chunked. Every
+    iteration starts over, so the body can be sent again on retry.
+
+    Args:
+        parts (List[Tuple[str, UploadSource]]): form field name and file of every part
+        progress (Optional[Progress], optional): called with the bytes of file content sent so far. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        parts: List[Tuple[str, UploadSource]],
+        progress: Optional[Progress] = None,
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        self._parts = [
+            (self._part_header(field, source), source) for field, source in parts
+        ]
+        self._tail = "--{}--\r\n".format(self.boundary).encode("ascii")
+        self._progress = progress
+        self.length = (
+            sum(len(header) + source.size + 2 for header, source in self._parts)
+            + len(self._tail)
+        )
+
+    def _part_header(self, field: str, source: UploadSource) -> bytes:
+        filename = source.filename.replace("\\", "\\\\").replace('"', '\\"')
+        return (
+            "--{}\r\n"
+            'Content-Disposition: form-data; name="{}"; filename="{}"\r\n'
+            "Content-Type: {}\r\n\r\n".format(
+                self.boundary, field, filename, source.content_type
+            )
+        ).encode("utf-8")
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "multipart/form-data; boundary={}".format(self.boundary),
+            "Content-Length": str(self.length),
+        }
+
+    def __iter__(self) -> Iterator[Any]:
+        sent = 0
+        for header, source in self._parts:
+            yield header
+            for chunk in source.chunks():
+                yield chunk
+                sent += len(chunk)
+                if self._progress is not None:
+                    self._progress(sent)
+            yield b"\r\n"
+        yield self._tail
+
+
+class UploadResult(object):
+    """progress and outcome of one file of an upload batch
+
+    Args:
+        index (int): position of the file in the input
+        source (UploadSource): the file
+    """
+
+    def __init__(self, index: int, source: UploadSource) -> None:
+        self.index = index
+        self.filename = source.filename
+        self.size = source.size
+        self.sent = 0
+        self.file: Optional[Any] = None
+        self.error: Optional[Exception] = None
+        self.attempts = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.file is not None
+
+    @property
+    def done(self) -> bool:
+        return self.file is not None or self.error is not None
+
+    def __repr__(self) -> str:
+        return "<upload: {}, file: {}, sent: {}/{}, attempts: {}, error: {}>".format(
+            self.index, self.filename, self.sent, self.size, self.attempts, self.error
+        )
+
+
+def to_source(item: Union[UploadData, Tuple[str, UploadData], UploadSource]) -> UploadSource:
+    """UploadSource of data, a path or a (filename, data) tuple"""
+    if isinstance(item, UploadSource):
+        return item
+    if isinstance(item, tuple):
+        filename, data = item
+        return UploadSource(data, filename)
+    return UploadSource(item)
+
+
+def _upload_with_retry(
+    send: Callable[[UploadSource, Progress], Any],
+    source: UploadSource,
+    result: UploadResult,
+    max_retries: int,
+    progress: Optional[Callable[[UploadResult], None]],
+    retryable: Callable[[Exception], bool] = batch_retryable,
+) -> UploadResult:
+    def on_sent(sent: int) -> None:
+        result.sent = sent
+        if progress is not None:
+            progress(result)
+
+    while True:
+        result.attempts += 1
+        result.sent = 0
+        try:
+            result.file = send(source, on_sent)
+            result.error = None
+            break
+        except Exception as e:
+            result.error = e
+            if result.attempts > max_retries or not retryable(e):
+                break
+        time.sleep(UPLOAD_RETRY_BACKOFF_SECS * 2 ** (result.attempts - 1))
+    if progress is not None:
+        progress(result)
+    return result
+
+
+def run_uploads(
+    send: Callable[[UploadSource, Progress], Any],
+    files: Iterable[Union[UploadData, Tuple[str, UploadData], UploadSource]],
+    concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+    max_retries: int = DEFAULT_UPLOAD_RETRIES,
+    progress: Optional[Callable[[UploadResult], None]] = None,
+    retryable: Callable[[Exception], bool] = batch_retryable,
+) -> List[UploadResult]:
+    """upload files one request each on up to `concurrency` threads. The input
+    is consumed lazily and paths are opened only when their upload starts, so
+    memory does not grow with the number or size of the files.
+
+    A failed upload is sent again up to `max_retries` times if `retryable`
+    accepts its error, by default only when the server can not have stored
+    the file, see bulk.batch_retryable.
+
+    `progress` is called from the upload threads with the UploadResult of a
+    file as its bytes are sent and once more when it is done or failed."""
+    results: List[UploadResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pending = set()
+        for index, item in enumerate(files):
+            source = to_source(item)
+            result = UploadResult(index, source)
+            results.append(result)
+            pending.add(
+                executor.submit(
+                    _upload_with_retry,
+                    send,
+                    source,
+                    result,
+                    max_retries,
+                    progress,
+                    retryable,
+                )
+            )
+            if len(pending) >= 2 * max(1, concurrency):
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        wait(pending)
+    return results
+
+
+def uploaded_files(results: List[UploadResult]) -> List[Any]:
+    """uploaded files in input order, raises the first upload error"""
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise LeapcellException(
+            "{} of {} uploads failed, first failed file {} ({}), error: {}".format(
+                len(failed), len(results), failed[0].index, failed[0].filename, failed[0].error
+            )
+        )
+    return [r.file for r in results]
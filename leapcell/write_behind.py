@@ -0,0 +1,191 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import json
+import threading
+import warnings
+from leapcell.const import RECORD_ID_FIELD
+from leapcell.exp import LeapcellRequestError
+from leapcell.retry import RETRY_STATUS_CODES
+
+if TYPE_CHECKING:
+    from leapcell.http_client import HTTPClient
+
+WRITE_BEHIND_MAX_PENDING = 100
+WRITE_BEHIND_FLUSH_INTERVAL_SECS = 1.0
+WRITE_BEHIND_CONCURRENCY = 8
+WRITE_BEHIND_MAX_RETRIES = 3
+
+ErrorCallback = Callable[[List[str], Dict[str, Any], Exception], None]
+
+
+class WriteBehindBuffer(object):
+    """WriteBehindBuffer holds the dirty fields of saved records and writes them
+    later. Repeated saves of one record are merged field by field. A flush
+    sends one update per record, `concurrency` at a time, records that end
+    up with identical values share one filter update. The API has no update
+    of many records with different values, so records with different values
+    (e.g. counters) cost one request each.
+
+    A write that failed with an error that may be temporary (connection,
+    timeout, 429, 5xx) is put back and sent again by the next flush, under
+    any newer changes of the record, up to `max_retries` times. Other
+    errors, and changes out of retries, go to `on_error` or are dropped with
+    a warning.
+
+    A flush runs when `max_pending` records are dirty, every `flush_interval`
+    seconds, on flush() and at interpreter exit.
+
+    Args:
+        requester (HTTPClient): table client the updates are sent with
+        max_pending (int, optional): dirty records that trigger a flush. Defaults to WRITE_BEHIND_MAX_PENDING.
+        flush_interval (float, optional): seconds between background flushes. Defaults to WRITE_BEHIND_FLUSH_INTERVAL_SECS.
+        on_error (ErrorCallback, optional): called with (record_ids, fields, exception) for every dropped write. Defaults to None.
+        concurrency (int, optional): updates sent at once. Defaults to WRITE_BEHIND_CONCURRENCY.
+        max_retries (int, optional): flushes a failed change is sent again by. Defaults to WRITE_BEHIND_MAX_RETRIES.
+    """
+
+    def __init__(
+        self,
+        requester: "HTTPClient",
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL_SECS,
+        on_error: Optional[ErrorCallback] = None,
+        concurrency: int = WRITE_BEHIND_CONCURRENCY,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+    ) -> None:
+        self._requester = requester
+        self._max_pending = max_pending
+        self._flush_interval = flush_interval
+        self._on_error = on_error
+        self._max_retries = max_retries
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # record id -> failed writes of its pending changes
+        self._retries: Dict[str, int] = {}
+        self._flush_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, record_id: str, fields: Dict[str, Any]) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind buffer is closed")
+            self._pending.setdefault(record_id, {}).update(fields)
+            if len(self._pending) >= self._max_pending:
+                self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self) -> None:
+        """write all dirty records now. Failed writes are put back if their
+        error may be temporary, other errors go to on_error or are raised."""
+        self._flush(raise_errors=self._on_error is None)
+
+    def close(self) -> None:
+        """flush and stop the background thread, failed writes are not put back"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        atexit.unregister(self.close)
+        self._thread.join()
+        self._flush(raise_errors=False, requeue=False)
+        self._executor.shutdown()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self._max_pending:
+                    self._cond.wait(self._flush_interval)
+                if self._closed:
+                    return
+            self._flush(raise_errors=False)
+
+    def _flush(self, raise_errors: bool, requeue: bool = True) -> None:
+        with self._flush_lock:
+            with self._cond:
+                pending = self._pending
+                self._pending = {}
+            if not pending:
+                return
+
+            groups: Dict[str, List[str]] = {}
+            for record_id, fields in pending.items():
+                key = json.dumps(fields, sort_keys=True, default=str)
+                groups.setdefault(key, []).append(record_id)
+
+            writes: List[Tuple[List[str], Dict[str, Any], Any]] = [
+                (
+                    record_ids,
+                    pending[record_ids[0]],
+                    self._executor.submit(self._write, record_ids, pending[record_ids[0]]),
+                )
+                for record_ids in groups.values()
+            ]
+            errors = []
+            for record_ids, fields, future in writes:
+                try:
+                    future.result()
+                except Exception as e:
+                    if requeue and self._requeue(record_ids, fields, e):
+                        continue
+                    errors.append(e)
+                    if self._on_error is not None:
+                        self._on_error(record_ids, fields, e)
+                    elif not raise_errors:
+                        warnings.warn(
+                            "write-behind update of {} records failed: {}".format(
+                                len(record_ids), e
+                            )
+                        )
+                else:
+                    with self._cond:
+                        for record_id in record_ids:
+                            self._retries.pop(record_id, None)
+            if errors and raise_errors:
+                raise errors[0]
+
+    def _requeue(
+        self, record_ids: List[str], fields: Dict[str, Any], error: Exception
+    ) -> bool:
+        """put the changes of a failed write back under newer ones, False if
+        the error is permanent or the records are out of retries"""
+        # updates are idempotent, a write that may not have been applied can be sent again
+        temporary = isinstance(error, LeapcellRequestError) and (
+            error.status is None or error.status in RETRY_STATUS_CODES
+        )
+        with self._cond:
+            if not temporary or any(
+                self._retries.get(record_id, 0) >= self._max_retries
+                for record_id in record_ids
+            ):
+                for record_id in record_ids:
+                    self._retries.pop(record_id, None)
+                return False
+            for record_id in record_ids:
+                self._retries[record_id] = self._retries.get(record_id, 0) + 1
+                changes = dict(fields)
+                changes.update(self._pending.get(record_id, {}))
+                self._pending[record_id] = changes
+        return True
+
+    def _write(self, record_ids: List[str], fields: Dict[str, Any]) -> None:
+        if len(record_ids) == 1:
+            self._requester.update_record(
+                record_id=record_ids[0],
+                data={"fields": dict(fields)},
+            )
+            return
+        self._requester.update_records(
+            {
+                "filter": {"field": RECORD_ID_FIELD, "op": "in", "val": record_ids},
+                "fields": dict(fields),
+            }
+        )
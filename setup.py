@@ -12,6 +12,14 @@ setup(
     install_requires=[
         "urllib3 >= 2.1.0",
     ],
+    extras_require={
+        "async": ["aiohttp >= 3.8.0"],
+        "numpy": ["numpy >= 1.20"],
+        "pandas": ["pandas >= 1.3", "numpy >= 1.20"],
+        "parquet": ["pyarrow >= 8.0"],
+        "zstd": ["zstandard >= 0.18"],
+        "otel": ["opentelemetry-api >= 1.20"],
+    },
     python_requires=">=3.5",
     packages=["leapcell"],
     classifiers=[
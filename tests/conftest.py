@@ -0,0 +1,33 @@
+from leapcell import Leapcell
+from leapcell.mock import MockLeapcell
+from leapcell.retry import RetryPolicy
+import pytest
+
+RESOURCE = "test/repo"
+TABLE = "posts"
+FIELDS = {"title": "STR", "views": "INT_NUMBER", "tags": "LABELS"}
+
+
+@pytest.fixture
+def server():
+    with MockLeapcell() as server:
+        server.add_table(
+            RESOURCE,
+            TABLE,
+            FIELDS,
+            ({"title": "post {}".format(i), "views": i, "tags": ["news"]} for i in range(50)),
+        )
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    # retries without waiting, so failure paths run fast
+    client = Leapcell("test", base_url=server.url, retry_policy=RetryPolicy(backoff_factor=0))
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def table(client):
+    return client.table(RESOURCE, TABLE)
@@ -0,0 +1,117 @@
+from leapcell import AsyncLeapcell
+from leapcell.exp import LeapcellRequestError
+from leapcell.retry import RetryPolicy
+from conftest import RESOURCE, TABLE
+import asyncio
+import pytest
+
+
+def run(server, fn, **kwargs):
+    async def main():
+        kwargs.setdefault("retry_policy", RetryPolicy(backoff_factor=0))
+        async with AsyncLeapcell("test", base_url=server.url, **kwargs) as client:
+            return await fn(client.table(RESOURCE, TABLE))
+
+    return asyncio.run(main())
+
+
+def test_crud(server):
+    async def crud(table):
+        record = await table.create({"title": "async", "views": 1000})
+        got = await table.get_by_id(record.id)
+        got["views"] = 1001
+        await got.save()
+        saved = (await table.get_by_id(record.id))["views"]
+        updated = await table.select().where(table["views"] >= 1000).update({"title": "changed"})
+        count = await table.count({"title": "changed"})
+        await got.delete()
+        return saved, updated, count, await table.get_by_id(record.id), await table.count()
+
+    assert run(server, crud) == (1001, 1, 1, None, 50)
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+@pytest.mark.parametrize("keyset", [None, "views"])
+def test_iter(server, prefetch, keyset):
+    async def iterate(table):
+        query = table.select().where(table["views"] >= 3).order_by(table["views"].asc())
+        return [r["views"] async for r in query.iter(page_size=8, prefetch=prefetch, keyset=keyset)]
+
+    assert run(server, iterate) == list(range(3, 50))
+
+
+def test_iter_stopped_early_cancels_the_prefetch(server):
+    async def stop(table):
+        async for record in table.select().order_by(table["views"].asc()).iter(page_size=10):
+            if record["views"] == 2:
+                break
+        await asyncio.sleep(0.05)
+        return len(asyncio.all_tasks())
+
+    assert run(server, stop) == 1
+    assert server.requests_by_route["query"] <= 2
+
+
+def test_concurrent_reads(server):
+    async def read(table):
+        records = await table.select().order_by(table["views"].asc()).query()
+        ids = [r.id for r in records]
+        found = await asyncio.gather(*[table.get_by_id(id) for id in ids])
+        many = await table.get_many(ids[:5] + ["missing"], chunk_size=2)
+        return ids, [r.id for r in found], [r.id if r else None for r in many]
+
+    ids, found, many = run(server, read)
+    assert found == ids
+    assert many == ids[:5] + [None]
+
+
+def test_bulk_create_and_retries(server):
+    async def bulk(table):
+        created = await table.bulk_create(
+            ({"title": "bulk {}".format(i), "views": 100 + i} for i in range(25)), batch_size=10
+        )
+        server.fail_next(2, status=503, route="metrics")
+        return len(created), await table.count()
+
+    assert run(server, bulk) == (25, 75)
+    assert server.requests_by_route["create"] == 3
+
+
+def test_errors(server):
+    async def failing(table):
+        server.fail_next(1, status=400, route="query")
+        await table.select().query()
+
+    with pytest.raises(LeapcellRequestError) as e:
+        run(server, failing)
+    assert e.value.status == 400
+
+
+def test_stream_and_columns(server):
+    async def read(table):
+        query = table.select().where(table["views"] >= 40).order_by(table["views"].asc())
+        streamed = [r["views"] async for r in query.stream()]
+        searched = [r["title"] async for r in table.select().search_stream("post 7", ["title"])]
+        columns = await query.query_columns()
+        batches = [len(b) async for b in query.iter_column_batches(batch_size=4)]
+        return streamed, searched, list(columns["views"]), batches
+
+    streamed, searched, views, batches = run(server, read)
+    assert streamed == views == list(range(40, 50))
+    assert "post 7" in searched
+    assert batches == [4, 4, 2]
+
+
+def test_read_after_a_write_does_not_join_an_earlier_read(server):
+    async def read_write_read(table):
+        server.latency = 0.2
+        before = asyncio.ensure_future(table.count())
+        await asyncio.sleep(0.05)
+        server.latency = 0
+        await table.create({"title": "new", "views": 100})
+        after = await table.count()
+        await before
+        return after, server.requests_by_route["metrics"]
+
+    # the mock sleeps before it reads, so only the request count tells them apart
+    assert run(server, read_write_read) == (51, 2)
@@ -0,0 +1,35 @@
+from leapcell import Leapcell
+from leapcell.mock import MockLeapcell
+from benchmarks import suite
+import pytest
+
+
+@pytest.fixture
+def bench():
+    with MockLeapcell() as server:
+        server.add_table(suite.RESOURCE, suite.READ_TABLE, suite.FIELDS, (suite.record(i) for i in range(30)))
+        server.add_table(suite.RESOURCE, suite.WRITE_TABLE, suite.FIELDS)
+        client = Leapcell("bench", base_url=server.url, coalesce_reads=False)
+        yield server, suite.Context(client)
+        client.close()
+
+
+@pytest.mark.parametrize("name", list(suite.SCENARIOS))
+def test_scenario_runs_without_errors(bench, name):
+    server, ctx = bench
+    op, _ = suite.SCENARIOS[name]
+
+    timed = suite.run_timed(ctx, op, 4, 2)
+    assert timed["errors"] == 0 and timed["requests"] == 4
+    assert 0 < timed["p50_ms"] <= timed["p99_ms"] <= timed["max_ms"]
+
+    split = suite.run_split(server.url, op, 2)
+    assert split["total_us_per_request"] > 0
+    assert suite.run_memory(ctx, op, 2)["peak_heap_kb"] > 0
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert suite.percentile(values, 50) == 50.0
+    assert suite.percentile(values, 99) == 99.0
+    assert suite.percentile([], 99) == 0.0
@@ -0,0 +1,154 @@
+from leapcell import AsyncLeapcell, Leapcell
+from leapcell.bulk import batch_retryable, iter_batches
+from leapcell.codec import JSONCodec, RawJSON, encode_body
+from leapcell.exp import LeapcellException, LeapcellRequestError
+from leapcell.retry import RetryPolicy
+from conftest import RESOURCE, TABLE
+import asyncio
+import json
+import socket
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("leapcell.bulk.BATCH_RETRY_BACKOFF_SECS", 0)
+
+
+def rows(count):
+    return ({"title": "new {}".format(i), "views": i} for i in range(count))
+
+
+def test_batch_retryable():
+    refused = LeapcellRequestError("refused", sent=False)
+    timeout = LeapcellRequestError("timeout")
+    unavailable = LeapcellRequestError("unavailable", status=503)
+    throttled = LeapcellRequestError("throttled", status=429)
+    bad = LeapcellRequestError("bad", status=400)
+
+    assert batch_retryable(refused)
+    assert batch_retryable(throttled)
+    # the records may have been written
+    assert not batch_retryable(timeout)
+    assert not batch_retryable(unavailable)
+    assert batch_retryable(timeout, idempotent=True)
+    assert batch_retryable(unavailable, idempotent=True)
+    assert not batch_retryable(bad, idempotent=True)
+    assert not batch_retryable(LeapcellException("client side"), idempotent=True)
+    assert not batch_retryable(ValueError("bad record"), idempotent=True)
+    # the policy already retried them
+    assert not batch_retryable(throttled, policy=RetryPolicy())
+    assert not batch_retryable(unavailable, idempotent=True, policy=RetryPolicy(retry_writes=True))
+    assert batch_retryable(unavailable, idempotent=True, policy=RetryPolicy())
+
+
+def test_5xx_batch_is_not_retried(server, table):
+    server.fail_next(1, status=503, route="create")
+    results = table.bulk_create_batches(rows(10), batch_size=5, concurrency=1)
+
+    assert [r.ok for r in results] == [False, True]
+    assert results[0].attempts == 1
+    assert results[0].error.status == 503
+    assert server.requests_by_route["create"] == 2
+    assert len(server.table(RESOURCE, TABLE).records) == 55
+
+
+def test_5xx_batch_with_on_conflict_is_retried(server, table):
+    server.fail_next(1, status=503, route="create")
+    results = table.bulk_create_batches(rows(10), on_conflict="title", batch_size=5, concurrency=1)
+
+    assert all(r.ok for r in results)
+    assert results[0].attempts == 2
+    assert server.requests_by_route["create"] == 3
+    assert len(server.table(RESOURCE, TABLE).records) == 60
+
+
+def test_429_is_retried_once_by_the_policy(server, table):
+    server.fail_next(1, status=429, route="create")
+    results = table.bulk_create_batches(rows(5), concurrency=1)
+
+    assert results[0].ok
+    # the policy retried the request, the batch was sent once
+    assert results[0].attempts == 1
+    assert server.requests_by_route["create"] == 2
+
+
+def test_429_is_retried_without_policy(server):
+    client = Leapcell("test", base_url=server.url, retry_policy=RetryPolicy(status_codes=[]))
+    server.fail_next(1, status=429, route="create")
+    results = client.table(RESOURCE, TABLE).bulk_create_batches(rows(5), concurrency=1)
+
+    assert results[0].ok
+    assert results[0].attempts == 2
+    client.close()
+
+
+def test_refused_connection_is_retried():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = Leapcell("test", base_url="http://127.0.0.1:{}".format(port))
+    results = client.table(RESOURCE, TABLE).bulk_create_batches(rows(5), max_retries=2)
+
+    assert not results[0].ok
+    assert results[0].attempts == 3
+    assert results[0].error.sent is False
+    client.close()
+
+
+def test_flatten_raises_on_failed_batch(server, table):
+    server.fail_next(1, status=500, route="create")
+    with pytest.raises(LeapcellException):
+        table.bulk_create(rows(5))
+
+
+def test_async_5xx_batch_is_not_retried(server):
+    async def run():
+        async with AsyncLeapcell("test", base_url=server.url) as client:
+            table = client.table(RESOURCE, TABLE)
+            server.fail_next(1, status=503, route="create")
+            failed = await table.bulk_create_batches(rows(5))
+            server.fail_next(1, status=503, route="create")
+            retried = await table.bulk_create_batches(rows(5), on_conflict="title")
+            return failed, retried
+
+    failed, retried = asyncio.run(run())
+    assert not failed[0].ok and failed[0].attempts == 1
+    assert retried[0].ok and retried[0].attempts == 2
+    assert server.requests_by_route["create"] == 3
+
+
+class CountingCodec(JSONCodec):
+    def __init__(self):
+        self.encoded = []
+
+    def dumps(self, obj):
+        self.encoded.append(obj)
+        return super().dumps(obj)
+
+
+def test_iter_batches_sizes_by_encoded_json():
+    records = [{"title": "x" * 90}] * 10
+    codec = CountingCodec()
+    batches = list(iter_batches(records, batch_size=100, max_batch_bytes=350, codec=codec))
+
+    assert [len(b) for b in batches] == [3, 3, 3, 1]
+    assert len(codec.encoded) == 10
+    assert json.loads(batches[0].json().data) == records[:3]
+
+
+def test_encode_body_splices_raw_json():
+    codec = JSONCodec()
+    body = encode_body(codec, {"records": RawJSON(b'[{"a":1}]'), "name_type": "name"})
+    assert json.loads(body) == {"records": [{"a": 1}], "name_type": "name"}
+    assert json.loads(encode_body(codec, {"records": RawJSON(b"[]")})) == {"records": []}
+
+
+def test_records_are_encoded_once_with_the_client_codec(server):
+    codec = CountingCodec()
+    client = Leapcell("test", base_url=server.url, json_codec=codec)
+    created = client.table(RESOURCE, TABLE).bulk_create(rows(10), batch_size=4)
+
+    assert [r["title"] for r in created] == ["new {}".format(i) for i in range(10)]
+    assert sum(1 for obj in codec.encoded if "title" in obj) == 10
+    client.close()
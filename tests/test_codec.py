@@ -0,0 +1,62 @@
+from leapcell.codec import JSONCodec, OrjsonCodec, UjsonCodec, available_codecs, get_codec
+import dataclasses
+import datetime
+import json
+import types
+import pytest
+
+
+@dataclasses.dataclass
+class Point(object):
+    x: int = 1
+
+
+codecs = [get_codec(name) for name in available_codecs()]
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda c: c.name)
+@pytest.mark.parametrize(
+    "value",
+    [datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2), Point(), object()],
+    ids=lambda v: type(v).__name__,
+)
+def test_values_stdlib_rejects_raise_type_error(codec, value):
+    with pytest.raises(TypeError):
+        codec.dumps({"records": [{"at": value}]})
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda c: c.name)
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), -float("inf")], ids=repr)
+def test_non_finite_floats_raise_value_error(codec, value):
+    with pytest.raises(ValueError):
+        codec.dumps({"records": [{"score": value, "x": None}]})
+    with pytest.raises(ValueError):
+        codec.dumps({"big": 2 ** 70, "score": value})
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda c: c.name)
+def test_stdlib_only_inputs_fall_back(codec):
+    body = {"big": 2 ** 70, 1: "int key", "text": "héllo/"}
+    assert json.loads(codec.dumps(body)) == json.loads(JSONCodec().dumps(body))
+
+
+def test_ujson_big_ints_fall_back(monkeypatch):
+    def dumps(obj, **kwargs):
+        raise OverflowError("int too big to convert")
+
+    monkeypatch.setattr("leapcell.codec.ujson", types.SimpleNamespace(dumps=dumps))
+    assert UjsonCodec().dumps({"big": 2 ** 70}) == b'{"big":1180591620717411303424}'
+
+
+def test_ujson_non_finite_floats_raise(monkeypatch):
+    monkeypatch.setattr(
+        "leapcell.codec.ujson", types.SimpleNamespace(dumps=lambda obj, **kwargs: '{"score":NaN}')
+    )
+    with pytest.raises(ValueError):
+        UjsonCodec().dumps({"score": float("nan")})
+
+
+@pytest.mark.skipif("orjson" not in available_codecs(), reason="orjson is not installed")
+def test_orjson_encodes_like_stdlib():
+    body = {"records": [{"title": "héllo", "views": 1, "score": 0.5, "tags": ["a"], "x": None}]}
+    assert OrjsonCodec().dumps(body) == JSONCodec().dumps(body)
@@ -0,0 +1,88 @@
+from leapcell.columnar import ColumnBatch, DictionaryColumn, NumericColumn, numpy, pandas
+import pytest
+
+
+def test_columns_keep_nulls_and_types():
+    batch = ColumnBatch({"views": "INT_NUMBER", "score": "FLOAT_NUMBER", "title": "STR", "tags": "LABELS"})
+    batch.extend(
+        [
+            {"record_id": "a", "fields": {"views": 1, "score": 1, "title": "x", "tags": ["n"]}},
+            {"record_id": "b", "fields": {"views": None, "score": 2.5, "title": "y"}},
+            {"record_id": "c", "fields": {"views": 3, "score": None, "title": "x", "tags": []}},
+        ]
+    )
+    assert isinstance(batch["views"], NumericColumn)
+    assert isinstance(batch["title"], DictionaryColumn)
+    assert batch.to_pydict() == {
+        "record_id": ["a", "b", "c"],
+        "views": [1, None, 3],
+        "score": [1.0, 2.5, None],
+        "title": ["x", "y", "x"],
+        "tags": [["n"], None, []],
+    }
+    assert batch["title"].dictionary == ["x", "y"]
+    assert batch["views"][1] is None and batch["score"][1] == 2.5
+    assert len(batch) == 3
+
+
+def test_query_columns_match_query(table):
+    query = table.select().where(table["views"] < 30).order_by(table["views"].asc()).limit(30)
+    batch = query.query_columns()
+    records = query.query()
+    assert batch["record_id"].to_list() == [r.id for r in records]
+    assert batch["views"].to_list() == list(range(30))
+    assert batch["title"].to_list() == [r["title"] for r in records]
+
+
+def test_column_batches_page_through_the_table(table):
+    batches = list(
+        table.select().order_by(table["views"].asc()).iter_column_batches(batch_size=20, keyset="views")
+    )
+    assert [b.num_rows for b in batches] == [20, 20, 10]
+    assert sum((b["views"].to_list() for b in batches), []) == list(range(50))
+
+
+def test_selected_fields_only(table):
+    batch = table.select(["views"]).order_by(table["views"].asc()).limit(5).query_columns()
+    assert batch.column_names == ["views"]
+
+
+@pytest.mark.skipif(numpy is None or pandas is None, reason="pandas is not installed")
+def test_to_pandas():
+    batch = ColumnBatch({"views": "INT_NUMBER", "title": "STR"})
+    batch.extend([{"record_id": "a", "fields": {"views": 1, "title": "x"}}, {"record_id": "b", "fields": {"title": "x"}}])
+    frame = batch.to_pandas()
+    assert frame["views"].isna().tolist() == [False, True]
+    assert list(frame["title"].cat.categories) == ["x"]
+
+
+@pytest.mark.skipif(numpy is not None, reason="numpy is installed")
+def test_numpy_is_optional():
+    batch = ColumnBatch({"views": "INT_NUMBER"})
+    with pytest.raises(ImportError):
+        batch["views"].to_numpy()
+
+
+def test_values_an_array_can_not_hold_exactly_are_kept():
+    batch = ColumnBatch({"views": "INT_NUMBER", "score": "FLOAT_NUMBER", "at": "TIME"})
+    batch.extend([{"record_id": "a", "fields": {"views": 1, "score": 1, "at": 2.0}}])
+    batch.extend(
+        [
+            {"record_id": "b", "fields": {"views": 2.5, "score": 2 ** 63 + 1, "at": 2 ** 64}},
+            {"record_id": "c", "fields": {"views": None, "score": 0.5, "at": 3}},
+        ]
+    )
+    assert batch.to_pydict() == {
+        "record_id": ["a", "b", "c"],
+        "views": [1, 2.5, None],
+        "score": [1.0, 2 ** 63 + 1, 0.5],
+        "at": [2, 2 ** 64, 3],
+    }
+    assert not any(isinstance(batch[name], NumericColumn) for name in batch.column_names)
+
+
+def test_exact_casts_stay_in_the_array():
+    batch = ColumnBatch({"views": "INT_NUMBER"})
+    batch.extend([{"record_id": "a", "fields": {"views": 1.0}}, {"record_id": "b", "fields": {"views": None}}])
+    assert isinstance(batch["views"], NumericColumn)
+    assert batch["views"].to_list() == [1, None]
@@ -0,0 +1,88 @@
+from leapcell import AsyncLeapcell, Leapcell
+from leapcell.compress import RequestCompression, get_compression, zstandard
+from leapcell.retry import RetryPolicy
+from conftest import RESOURCE, TABLE
+import asyncio
+import gzip
+import pytest
+
+
+class CountingCompression(RequestCompression):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compressed = []
+
+    def compress(self, body):
+        self.compressed.append(len(body))
+        return super().compress(body)
+
+    def compress_bytes(self, body):
+        self.compressed.append(len(body))
+        return super().compress_bytes(body)
+
+
+def rows(count):
+    return [{"title": "compressed {}".format(i), "views": i, "tags": ["news"]} for i in range(count)]
+
+
+def test_compressed_body_can_be_sent_again():
+    body = b'{"title":"repeated"},' * 50000
+    stream = RequestCompression("gzip").compress(body)
+    first = b"".join(stream)
+    assert b"".join(stream) == first
+    assert gzip.decompress(first) == body
+    assert len(first) < len(body) // 10
+
+
+def test_threshold_and_options():
+    compression = RequestCompression(threshold=100)
+    assert compression.applies(b"x" * 100)
+    assert not compression.applies(b"x" * 99)
+    assert get_compression(None) is None
+    assert get_compression("gzip").encoding == "gzip"
+    with pytest.raises(ValueError):
+        RequestCompression("brotli")
+    with pytest.raises(ValueError):
+        RequestCompression(threshold=-1)
+
+
+@pytest.mark.skipif(zstandard is not None, reason="zstandard is installed")
+def test_zstd_needs_zstandard():
+    with pytest.raises(ImportError):
+        RequestCompression("zstd")
+
+
+def test_large_writes_are_compressed(server):
+    compression = CountingCompression(threshold=1024)
+    client = Leapcell(
+        "test",
+        base_url=server.url,
+        compression=compression,
+        retry_policy=RetryPolicy(backoff_factor=0),
+    )
+    table = client.table(RESOURCE, TABLE)
+    table.bulk_create(rows(200))
+    assert len(server.table(RESOURCE, TABLE).records) == 250
+
+    # small bodies are sent as they are
+    table.create({"title": "small", "views": 1})
+    assert len(compression.compressed) == 1
+
+    # a retried update sends the compressed body again
+    server.fail_next(1, status=503, route="update")
+    updated = table.select().where(table["tags"].contain("news")).update({"title": "x" * 2000})
+    assert updated == 250
+    assert server.requests_by_route["update"] == 2
+    client.close()
+
+
+def test_async_large_writes_are_compressed(server):
+    compression = CountingCompression(threshold=1024)
+
+    async def run():
+        async with AsyncLeapcell("test", base_url=server.url, compression=compression) as client:
+            await client.table(RESOURCE, TABLE).bulk_create(rows(200))
+
+    asyncio.run(run())
+    assert len(compression.compressed) == 1
+    assert len(server.table(RESOURCE, TABLE).records) == 250
@@ -0,0 +1,81 @@
+from leapcell.exp import LeapcellException
+from conftest import RESOURCE, TABLE
+import csv
+import json
+import os
+import pytest
+
+
+def exported_ids(path, manifest):
+    ids = []
+    for r in manifest["ranges"]:
+        with open(os.path.join(path, r["file"]), newline="") as f:
+            if manifest["format"] == "csv":
+                ids.extend(row["record_id"] for row in csv.DictReader(f))
+            else:
+                ids.extend(json.loads(line)["record_id"] for line in f)
+    return ids
+
+
+def table_ids(server):
+    return sorted(server.table(RESOURCE, TABLE).records)
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_splits_the_table_into_ranges(server, table, tmp_path, format):
+    manifest = table.export(str(tmp_path), format=format, split_field="views", ranges=3, page_size=7)
+
+    assert manifest["complete"] and manifest["rows"] == 50
+    assert len(manifest["ranges"]) == 4
+    assert all(r["rows"] > 0 for r in manifest["ranges"][:3])
+    assert manifest["ranges"][3]["null"] and manifest["ranges"][3]["rows"] == 0
+    assert sorted(exported_ids(str(tmp_path), manifest)) == table_ids(server)
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_interrupted_export_resumes_from_the_last_page(server, table, tmp_path, format):
+    export_page = table._export_page
+    pages = []
+    fail_after = [3]
+
+    def failing_page(split_field, r, offset, limit):
+        if len(pages) == fail_after[0]:
+            raise LeapcellException("connection lost")
+        pages.append((r["index"], offset))
+        return export_page(split_field, r, offset, limit)
+
+    table._export_page = failing_page
+    with pytest.raises(LeapcellException):
+        table.export(str(tmp_path), format=format, split_field="views", ranges=2, page_size=7, concurrency=1)
+    with open(os.path.join(str(tmp_path), "manifest.json")) as f:
+        partial = json.load(f)
+    assert not partial["complete"]
+    assert partial["ranges"][0]["rows"] == 21
+
+    pages.clear()
+    fail_after[0] = None
+    manifest = table.export(str(tmp_path), format=format, split_field="views", ranges=2, page_size=7, concurrency=1)
+
+    assert manifest["rows"] == 50
+    # pages written before the interruption are not fetched again
+    assert (0, 0) not in pages and (0, 21) in pages
+    ids = exported_ids(str(tmp_path), manifest)
+    assert len(ids) == len(set(ids)) == 50
+    assert sorted(ids) == table_ids(server)
+
+
+def test_records_without_a_split_value_are_exported(server, table, tmp_path):
+    for i in range(3):
+        table.create({"title": "no views {}".format(i)})
+    manifest = table.export(str(tmp_path), split_field="views", ranges=2)
+
+    assert manifest["rows"] == 53
+    assert manifest["ranges"][-1]["rows"] == 3
+    assert sorted(exported_ids(str(tmp_path), manifest)) == table_ids(server)
+
+
+def test_export_of_another_format_is_not_resumed(table, tmp_path):
+    table.export(str(tmp_path), split_field="views")
+    with pytest.raises(LeapcellException):
+        table.export(str(tmp_path), format="csv", split_field="views")
+    assert table.export(str(tmp_path), format="csv", split_field="views", resume=False)["rows"] == 50
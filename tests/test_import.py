@@ -0,0 +1,100 @@
+from leapcell.exp import LeapcellException
+from leapcell.schema import ValidationError
+from conftest import RESOURCE, FIELDS
+import json
+import os
+import pytest
+
+
+def write_ndjson(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"title": "imported {}".format(i), "views": i}) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def empty(server, client):
+    server.add_table(RESOURCE, "copy", FIELDS, [])
+    return client.table(RESOURCE, "copy")
+
+
+def imported(empty):
+    return sorted(r["title"] for r in empty.select().iter())
+
+
+def test_interrupted_import_resumes_from_the_checkpoint(empty, tmp_path):
+    path = write_ndjson(tmp_path / "posts.ndjson", 30)
+    requester = empty._requster
+    create_records = requester.create_records
+    sent = []
+
+    def failing_create(data):
+        if len(sent) == 2:
+            raise LeapcellException("connection lost")
+        sent.append(len(data["records"]))
+        return create_records(data)
+
+    requester.create_records = failing_create
+    with pytest.raises(LeapcellException):
+        empty.import_file(path, batch_size=5, concurrency=1)
+    with open(path + ".import.json") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["rows"] == 10 and not checkpoint["complete"]
+
+    requester.create_records = create_records
+    state = empty.import_file(path, batch_size=5, concurrency=1)
+    assert state["complete"] and state["rows"] == 30
+    assert imported(empty) == sorted("imported {}".format(i) for i in range(30))
+
+    # a finished import is not sent again
+    assert empty.import_file(path)["rows"] == 30
+    assert len(imported(empty)) == 30
+
+
+def test_changed_file_is_not_resumed(empty, tmp_path):
+    path = write_ndjson(tmp_path / "posts.ndjson", 5)
+    empty.import_file(path)
+    write_ndjson(tmp_path / "posts.ndjson", 6)
+    os.utime(path, (0, 0))
+
+    with pytest.raises(LeapcellException):
+        empty.import_file(path)
+    assert empty.import_file(path, resume=False)["rows"] == 6
+
+
+def test_invalid_row_stops_the_import(empty, tmp_path):
+    path = str(tmp_path / "posts.ndjson")
+    with open(path, "w") as f:
+        for i in range(12):
+            views = "many" if i == 7 else i
+            f.write(json.dumps({"title": "imported {}".format(i), "views": views}) + "\n")
+
+    with pytest.raises(ValidationError) as e:
+        empty.import_file(path, batch_size=5, concurrency=1)
+    assert e.value.errors[0][0] == 7
+    assert len(imported(empty)) == 5
+
+
+def test_unreadable_line_checkpoints_the_rows_before_it(empty, tmp_path):
+    path = write_ndjson(tmp_path / "posts.ndjson", 30)
+    with open(path, "a") as f:
+        f.write("{not json\n")
+
+    with pytest.raises(LeapcellException) as e:
+        empty.import_file(path, batch_size=5, concurrency=2)
+    assert "invalid json" in str(e.value)
+    with open(path + ".import.json") as f:
+        checkpoint = json.load(f)
+    # the batch the bad line was read into is not sent
+    assert checkpoint["rows"] == 25 and not checkpoint["complete"]
+    assert len(imported(empty)) == 25
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_exported_files_import_into_another_table(table, empty, tmp_path, format):
+    manifest = table.export(str(tmp_path / "export"), format=format, split_field="views", ranges=2)
+    for r in manifest["ranges"]:
+        empty.import_file(str(tmp_path / "export" / r["file"]))
+
+    assert imported(empty) == sorted(r["title"] for r in table.select().iter())
@@ -0,0 +1,43 @@
+import pytest
+
+
+def views(records):
+    return [r["views"] for r in records]
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+@pytest.mark.parametrize("keyset", [None, "views"])
+def test_iter_pages_through_all_records(table, prefetch, keyset):
+    query = table.select().where(table["views"] >= 5).order_by(table["views"].asc())
+    assert views(query.iter(page_size=7, prefetch=prefetch, keyset=keyset)) == list(range(5, 50))
+
+
+@pytest.mark.parametrize("page_size", [1, 9, 10, 100])
+def test_iter_page_boundaries(server, table, page_size):
+    query = table.select().order_by(table["views"].desc())
+    assert views(query.iter(page_size=page_size, keyset="views")) == list(range(49, -1, -1))
+    # a full last page costs one more request that comes back empty
+    assert server.requests_by_route["query"] == 50 // page_size + 1
+
+
+def test_keyset_pages_filter_on_the_last_value(table):
+    query = table.select().where(table["tags"].contain("news")).order_by(table["views"].asc())
+    pages = list(query._iter_pages(20, False, "views"))
+    assert [len(p) for p in pages] == [20, 20, 10]
+    # the filter of the query is not changed by paging
+    assert views(query.iter(page_size=20, keyset="views")) == list(range(50))
+
+
+def test_keyset_with_or_filter_is_rejected(table):
+    query = table.select().where((table["views"] < 3) | (table["views"] > 40))
+    with pytest.raises(ValueError):
+        list(query.iter(page_size=5, keyset="views"))
+    assert sorted(views(query.iter(page_size=5))) == [0, 1, 2] + list(range(41, 50))
+
+
+def test_iter_stops_early_without_fetching_the_rest(server, table):
+    query = table.select().order_by(table["views"].asc())
+    for record in query.iter(page_size=10, prefetch=False):
+        if record["views"] == 3:
+            break
+    assert server.requests_by_route["query"] == 1
@@ -0,0 +1,69 @@
+from leapcell.exp import LeapcellException
+from leapcell.loader import RecordLoader
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+
+
+def all_ids(server):
+    return list(server.table("test/repo", "posts").records)
+
+
+def test_loader_batches_ids_of_many_threads():
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(sorted(ids))
+        return {id: {"id": id} for id in ids if id != "missing"}
+
+    loader = RecordLoader(fetch, window=0.05, max_batch=100)
+    ids = ["a", "b", "a", "missing", "c"]
+    with ThreadPoolExecutor(len(ids)) as executor:
+        results = list(executor.map(loader.load, ids))
+    assert results == [{"id": "a"}, {"id": "b"}, {"id": "a"}, None, {"id": "c"}]
+    assert fetched == [["a", "b", "c", "missing"]]
+
+
+def test_loader_fetches_a_full_batch_without_waiting():
+    loader = RecordLoader(lambda ids: {id: id for id in ids}, window=60, max_batch=2)
+    barrier = threading.Barrier(2)
+
+    def load(id):
+        barrier.wait()
+        return loader.load(id)
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(load, ["a", "b"])) == ["a", "b"]
+
+
+def test_loader_passes_fetch_errors_to_every_caller():
+    def fetch(ids):
+        raise LeapcellException("query failed")
+
+    loader = RecordLoader(fetch, window=0.01)
+    with pytest.raises(LeapcellException):
+        loader.load("a")
+
+
+def test_get_by_id_is_auto_batched(server, table):
+    ids = all_ids(server)[:20]
+    table.enable_auto_batching(window=0.05)
+    with ThreadPoolExecutor(20) as executor:
+        records = list(executor.map(table.get_by_id, ids + ["missing"]))
+    assert [r.id for r in records[:-1]] == ids and records[-1] is None
+    assert server.requests_by_route.get("get", 0) == 0
+    assert server.requests_by_route["query"] <= 2
+
+    table.disable_auto_batching()
+    table.get_by_id(ids[0])
+    assert server.requests_by_route["get"] == 1
+
+
+def test_get_many_keeps_order_and_duplicates(server, table):
+    ids = all_ids(server)
+    wanted = [ids[3], "missing", ids[1], ids[3]] + ids[10:40]
+    records = table.get_many(wanted, chunk_size=8, concurrency=3)
+    assert [r.id if r is not None else None for r in records] == [
+        ids[3], None, ids[1], ids[3]
+    ] + ids[10:40]
+    assert server.requests_by_route["query"] == 5
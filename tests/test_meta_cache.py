@@ -0,0 +1,42 @@
+from leapcell import Leapcell
+from conftest import RESOURCE, TABLE
+import time
+
+
+def test_meta_is_shared_by_the_tables_of_a_client(server, client):
+    for _ in range(3):
+        client.table(RESOURCE, TABLE).meta()
+    assert server.requests_by_route["meta"] == 1
+    assert client.meta_cache_stats()["hits"] >= 2
+
+    table = client.table(RESOURCE, TABLE)
+    assert sorted(table.refresh_meta().field_metas) == ["tags", "title", "views"]
+    assert server.requests_by_route["meta"] == 2
+
+
+def test_meta_expires(server, monkeypatch):
+    client = Leapcell("test", base_url=server.url, meta_cache_ttl=60)
+    table = client.table(RESOURCE, TABLE)
+    table.meta()
+    now = time.time()
+    monkeypatch.setattr("leapcell.cache.time.time", lambda: now + 61)
+    table.meta()
+    assert server.requests_by_route["meta"] == 2
+    client.close()
+
+
+def test_meta_cache_dir_is_shared_by_clients(server, tmp_path):
+    for _ in range(2):
+        client = Leapcell("test", base_url=server.url, meta_cache_dir=str(tmp_path))
+        client.table(RESOURCE, TABLE).meta()
+        client.close()
+    assert server.requests_by_route["meta"] == 1
+
+
+def test_meta_cache_can_be_disabled(server):
+    client = Leapcell("test", base_url=server.url, meta_cache_ttl=0)
+    client.table(RESOURCE, TABLE).meta()
+    client.table(RESOURCE, TABLE).meta()
+    assert server.requests_by_route["meta"] == 2
+    assert client.meta_cache_stats() == {"hits": 0, "misses": 0, "size": 0}
+    client.close()
@@ -0,0 +1,74 @@
+from leapcell import Leapcell
+from leapcell.exp import LeapcellRequestError
+from leapcell.mock import MockLeapcell
+from leapcell.retry import RetryPolicy
+from conftest import RESOURCE, TABLE, FIELDS
+import pytest
+
+
+def views(records):
+    return [r["views"] for r in records]
+
+
+def test_filters_orders_and_pages(table):
+    f = table["views"]
+    assert views(table.select().where(f > 45).order_by(f.asc()).query()) == [46, 47, 48, 49]
+    assert views(table.select().where((f < 2) | (f >= 48)).order_by(f.desc()).query()) == [49, 48, 1, 0]
+    assert views(table.select().where((f >= 10) & (f != 11) & (f < 13)).order_by(f.asc()).query()) == [10, 12]
+    assert views(table.select().where(f.in_([3, 5, 99])).order_by(f.asc()).query()) == [3, 5]
+    assert table.select().where(f.not_in([3, 5])).count() == 48
+    assert table.select().where(table["tags"].contain("news")).count() == 50
+    page = table.select().order_by(f.asc()).offset(10).limit(5).query()
+    assert views(page) == [10, 11, 12, 13, 14]
+
+
+def test_nulls(server, table):
+    table.create({"title": "no views"})
+    assert table.select().where(table["views"].is_null()).count() == 1
+    assert table.select().where(table["views"].not_null()).count() == 50
+
+
+def test_records_by_field_id(server, client):
+    table = client.table(RESOURCE, TABLE, name_type="id")
+    record = table.select().first()
+    stored = server.table(RESOURCE, TABLE)
+    assert set(record.data()) == {stored.field_id(name, "name") for name in FIELDS}
+
+
+def test_api_key_is_checked():
+    with MockLeapcell(api_key="secret") as server:
+        server.add_table(RESOURCE, TABLE, FIELDS, [])
+        assert Leapcell("secret", base_url=server.url).table(RESOURCE, TABLE).select().count() == 0
+        with pytest.raises(LeapcellRequestError) as e:
+            Leapcell("wrong", base_url=server.url).table(RESOURCE, TABLE).select().count()
+        assert e.value.status == 401
+
+
+def test_injected_errors_are_seeded_and_routed():
+    def errors(seed):
+        with MockLeapcell(error_rate=0.5, error_routes=["metrics"], seed=seed) as server:
+            server.add_table(RESOURCE, TABLE, FIELDS, [])
+            table = Leapcell("test", base_url=server.url, retry_policy=RetryPolicy(max_attempts=1)).table(RESOURCE, TABLE)
+            table.meta()
+            failed = []
+            for _ in range(20):
+                try:
+                    table.select().count()
+                    failed.append(False)
+                except LeapcellRequestError:
+                    failed.append(True)
+            return failed, server.errors
+
+    first, count = errors(1)
+    assert errors(1) == (first, count)
+    assert 0 < count < 20
+    with pytest.raises(ValueError):
+        MockLeapcell(error_routes=["nope"])
+    with pytest.raises(ValueError):
+        MockLeapcell(error_rate=2)
+
+
+def test_missing_table(server, client):
+    with pytest.raises(LeapcellRequestError) as e:
+        client.table(RESOURCE, "missing").select().count()
+    assert e.value.status == 404
@@ -0,0 +1,40 @@
+from leapcell import Leapcell
+from leapcell.http_client import new_pool_manager
+from leapcell.trace import RequestHook
+from conftest import RESOURCE, TABLE
+import socket
+
+
+class ConnectionHook(RequestHook):
+    def __init__(self):
+        self.reused = []
+
+    def after_request(self, trace):
+        self.reused.append(trace.reused_connection)
+
+
+def test_tables_of_a_client_share_connections(server):
+    hook = ConnectionHook()
+    client = Leapcell("test", base_url=server.url, hooks=[hook])
+    first = client.table(RESOURCE, TABLE)
+    second = client.table(RESOURCE, TABLE)
+    assert first._requster._pool is second._requster._pool
+
+    for table in [first, second, first]:
+        table.select().count()
+    # only the first request opens a connection
+    assert hook.reused[0] is False
+    assert all(hook.reused[1:])
+
+    client.close()
+    first.select().count()
+    assert hook.reused[-1] is False
+
+
+def test_pool_options():
+    pool = new_pool_manager(num_pools=2, maxsize=3, block=True, keep_alive=True)
+    assert pool.connection_pool_kw["maxsize"] == 3
+    assert pool.connection_pool_kw["block"] is True
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in pool.connection_pool_kw["socket_options"]
+    plain = new_pool_manager(keep_alive=False)
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) not in plain.connection_pool_kw["socket_options"]
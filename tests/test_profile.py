@@ -0,0 +1,83 @@
+from leapcell.codec import JSONCodec
+from leapcell.exp import LeapcellException
+from leapcell.profile import ClientProfiler, NO_OPERATION, PROFILE_PHASES, query_shape
+from leapcell.record import Record
+from leapcell.table import KaithQuery, LeapcellTable
+import json
+import pytest
+
+
+def patched_functions():
+    targets = [t for targets in PROFILE_PHASES.values() for t in targets]
+    targets += [(KaithQuery, "query"), (KaithQuery, "stream"), (LeapcellTable, "get")]
+    return {(cls, name): cls.__dict__.get(name) for cls, name in targets}
+
+
+def test_disable_restores_every_function():
+    before = patched_functions()
+    with ClientProfiler() as profiler:
+        assert profiler.enabled
+        assert Record.__dict__["__init__"] is not before[(Record, "__init__")]
+    assert patched_functions() == before
+    assert not profiler.enabled
+
+
+def test_one_profiler_at_a_time():
+    with ClientProfiler():
+        with pytest.raises(LeapcellException):
+            ClientProfiler().enable()
+    ClientProfiler().enable().disable()
+    with pytest.raises(ValueError):
+        ClientProfiler(clock="gpu")
+
+
+def test_phases_are_attributed_to_query_shapes(table):
+    with ClientProfiler() as profiler:
+        for n in range(3):
+            table.select().where(table["views"] >= n).order_by(table["views"].asc()).query()
+        table.get({"views": 1})
+
+    snapshot = profiler.snapshot()
+    query = snapshot["query where views:gte order views:asc"]
+    assert query["operations"] == 3
+    assert query["phases"]["record_init"]["calls"] == 3 * 20
+    assert query["phases"]["json_decode"]["calls"] >= 3
+    # get runs a query inside, only the outer operation is counted
+    assert snapshot["get"]["operations"] == 1
+    assert snapshot["get"]["phases"]["record_init"]["calls"] == 1
+    assert [shape for shape in snapshot if shape.startswith("query")] == [
+        "query where views:gte order views:asc"
+    ]
+    assert "query where views:gte order views:asc" in profiler.report()
+
+
+def test_worker_threads_have_no_operation(table):
+    with ClientProfiler() as profiler:
+        table.bulk_create(({"title": "x", "views": i} for i in range(20)), batch_size=5)
+    snapshot = profiler.snapshot()
+    assert snapshot["bulk_create"]["operations"] == 1
+    assert snapshot[NO_OPERATION]["phases"]["json_decode"]["calls"] == 4
+
+
+def test_nested_phases_are_self_time(table):
+    profiler = ClientProfiler(clock="cpu")
+    with profiler:
+        JSONCodec().dumps({"a": 1})
+    profiler.reset()
+    with profiler:
+        query = table.select().where((table["views"] > 1) & (table["views"] < 5))
+        query.query()
+    snapshot = profiler.snapshot()
+    row = snapshot[query_shape("query", query)]
+    assert sum(p["total_ms"] for p in row["phases"].values()) <= row["total_ms"]
+    assert NO_OPERATION not in snapshot
+
+
+def test_dump(table, tmp_path):
+    with ClientProfiler() as profiler:
+        table.select().count()
+    path = tmp_path / "profile.json"
+    profiler.dump(str(path))
+    data = json.loads(path.read_text())
+    assert data["clock"] == "wall"
+    assert data["shapes"]["count"]["operations"] == 1
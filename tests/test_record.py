@@ -0,0 +1,68 @@
+from leapcell.layout import FieldLayouts
+from leapcell.record import Record
+import pytest
+
+
+class Requester(object):
+    write_behind = None
+
+    def __init__(self):
+        self.field_layouts = FieldLayouts(max_layouts=2)
+
+
+def test_record_behaves_like_a_dict():
+    record = Record(Requester(), "id", {"title": "a", "views": 1, "empty": None})
+    assert record["empty"] is None and "empty" in record
+    record["views"] = 2
+    record["extra"] = "new"
+    del record["title"]
+    assert "title" not in record
+    with pytest.raises(KeyError):
+        record["title"]
+    with pytest.raises(KeyError):
+        del record["missing"]
+    assert record.get("title", "default") == "default"
+    assert record.data() == {"views": 2, "empty": None, "extra": "new"}
+    assert list(record) == ["views", "empty", "extra"] and len(record) == 3
+    assert record.updated() == {"views": 2, "extra": "new"}
+    assert not hasattr(record, "__dict__")
+
+
+def test_data_is_a_live_view_of_the_record():
+    record = Record(Requester(), "id", {"title": "a", "views": 1})
+    data = record.data()
+    data["views"] = 2
+    data["extra"] = "new"
+    del data["title"]
+    assert record["views"] == 2 and record["extra"] == "new" and "title" not in record
+    record["views"] = 3
+    assert data["views"] == 3 and len(data) == 2
+    assert data == {"views": 3, "extra": "new"}
+    assert type(data.copy()) is dict
+    # writes through the view are not sent by save, as with the old dict
+    assert record.updated() == {"views": 3}
+
+
+def test_records_of_a_shape_share_one_layout():
+    requester = Requester()
+    requester.field_layouts.register(["title", "views"])
+    a = Record(requester, "a", {"title": "a", "views": 1})
+    b = Record(requester, "b", {"views": 2, "title": "b"})
+    assert a._layout is b._layout
+    assert b.data() == {"title": "b", "views": 2}
+    assert a.updated() == {}
+
+
+def test_layouts_are_bounded():
+    requester = Requester()
+    shapes = [{"a": 1}, {"b": 1}, {"c": 1}]
+    records = [Record(requester, str(i), fields) for i, fields in enumerate(shapes)]
+    assert len(requester.field_layouts) == 2
+    assert [r.data() for r in records] == shapes
+
+
+def test_query_records_share_the_table_layout(table):
+    records = table.select().query()
+    assert len({id(r._layout) for r in records}) == 1
+    partial = table.select(["views"]).query()
+    assert partial[0].data() == {"views": partial[0]["views"]}
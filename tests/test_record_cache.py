@@ -0,0 +1,92 @@
+from leapcell import AsyncLeapcell
+from leapcell.cache import LRUCache, TTLCache, UploadCache
+from conftest import RESOURCE, TABLE
+import asyncio
+
+
+def first_id(table):
+    return table.select().order_by(table["views"].asc()).first().id
+
+
+def test_lru_cache_drops_values_read_before_an_invalidation():
+    cache = LRUCache(max_entries=10, max_bytes=1000, ttl=60)
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set("a", "stale", 1, generation)
+    assert cache.get("a") is None
+
+    cache.set("a", "fresh", 1, cache.generation)
+    assert cache.get("a") == "fresh"
+
+
+def test_other_caches_invalidate_without_generations(tmp_path):
+    for cache in [TTLCache(ttl=60), UploadCache(path=str(tmp_path))]:
+        cache.set("a", {"id": "a"})
+        cache.invalidate("a")
+        assert cache.get("a") is None
+        cache.set("b", {"id": "b"})
+        cache.invalidate()
+        assert cache.get("b") is None
+
+
+def test_get_by_id_is_cached_and_invalidated_by_updates(server, table):
+    table.enable_record_cache()
+    record_id = first_id(table)
+    assert table.get_by_id(record_id)["views"] == 0
+    assert table.get_by_id(record_id)["views"] == 0
+    assert server.requests_by_route["get"] == 1
+
+    record = table.get_by_id(record_id)
+    record["views"] = 10
+    record.save()
+    assert table.get_by_id(record_id)["views"] == 10
+
+    table.select().where(table["views"] == 10).update({"views": 20})
+    assert table.get_by_id(record_id)["views"] == 20
+
+    table.delete_by_id(record_id)
+    assert table.get_by_id(record_id) is None
+
+
+def test_read_racing_an_update_is_not_cached(table):
+    table.enable_record_cache()
+    record_id = first_id(table)
+    requester = table._requster
+    get_record = requester._get_record
+
+    def racing_get(record_id, generation=None):
+        # the update completes after the server answered the read
+        data = get_record(record_id, generation)
+        requester.update_record(record_id, {"fields": {"views": 99}})
+        return data
+
+    requester._get_record = racing_get
+    assert table.get_by_id(record_id)["views"] == 0
+    requester._get_record = get_record
+
+    assert table.record_cache_stats()["size"] == 0
+    assert table.get_by_id(record_id)["views"] == 99
+
+
+def test_async_update_invalidates_after_it_is_sent(server):
+    async def run():
+        async with AsyncLeapcell("test", base_url=server.url) as client:
+            table = client.table(RESOURCE, TABLE)
+            table.enable_record_cache()
+            record_id = (await table.select().order_by(table["views"].asc()).first()).id
+            assert (await table.get_by_id(record_id))["views"] == 0
+
+            update = table._requster.update_record(record_id, {"fields": {"views": 5}})
+            # nothing is sent or invalidated until the update is awaited
+            assert (await table.get_by_id(record_id))["views"] == 0
+            await update
+            assert (await table.get_by_id(record_id))["views"] == 5
+
+            delete = table._requster.delete_record(record_id)
+            assert (await table.get_by_id(record_id))["views"] == 5
+            await delete
+            assert await table.get_by_id(record_id) is None
+
+            assert (await table.select().where(table["views"] == 1).update({"views": 7})) == 1
+
+    asyncio.run(run())
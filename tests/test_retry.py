@@ -0,0 +1,69 @@
+from leapcell import Leapcell
+from leapcell.exp import LeapcellRequestError
+from leapcell.retry import RetryPolicy
+from conftest import RESOURCE, TABLE
+import pytest
+
+
+def test_policy_retries_idempotent_requests_only():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry("GET", 503, 1)
+    assert policy.should_retry("PUT", 500, 2)
+    assert not policy.should_retry("GET", 503, 3)
+    assert not policy.should_retry("GET", 400, 1)
+    # the server may have created the records
+    assert not policy.should_retry("POST", 503, 1)
+    assert policy.should_retry("POST", 503, 1, read_only=True)
+    assert policy.should_retry("POST", 429, 1)
+    assert RetryPolicy(retry_writes=True).should_retry("POST", 503, 1)
+    assert policy.stats() == {"retries": 4, "exhausted": 1, "by_status": {503: 2, 500: 1, 429: 1}}
+
+
+def test_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [policy.backoff(a) for a in range(1, 5)] == [1, 2, 4, 5]
+    assert policy.backoff(1, "3") == 3
+    assert policy.backoff(1, "60") == 5
+    assert policy.backoff(1, "not a date") == 1
+    jittered = RetryPolicy(backoff_factor=1)
+    assert all(0 <= jittered.backoff(3) <= 4 for _ in range(20))
+
+
+def test_reads_are_retried(server, client, table):
+    server.fail_next(2, status=503, route="metrics")
+    assert table.select().count() == 50
+    assert server.requests_by_route["metrics"] == 3
+    assert client.retry_stats()["by_status"] == {503: 2}
+
+
+def test_retries_end_with_the_error(server, client, table):
+    server.fail_next(3, status=502, route="metrics")
+    with pytest.raises(LeapcellRequestError) as e:
+        table.select().count()
+    assert e.value.status == 502
+    assert client.retry_stats()["exhausted"] == 1
+
+
+def test_creates_are_not_retried_on_5xx(server, table):
+    server.fail_next(1, status=500, route="create")
+    with pytest.raises(LeapcellRequestError):
+        table.create({"title": "new", "views": 1})
+    assert server.requests_by_route["create"] == 1
+
+    server.fail_next(1, status=429, route="create")
+    table.create({"title": "new", "views": 1})
+    assert server.requests_by_route["create"] == 3
+
+
+def test_retry_after_is_respected(server):
+    server.retry_after = 0.2
+    client = Leapcell("test", base_url=server.url, retry_policy=RetryPolicy(backoff_factor=0))
+    waits = []
+    policy = client._retry_policy
+    backoff = policy.backoff
+    policy.backoff = lambda attempt, retry_after=None: waits.append(retry_after) or backoff(attempt, retry_after)
+
+    server.fail_next(1, status=429, route="metrics")
+    assert client.table(RESOURCE, TABLE).select().count() == 50
+    assert waits == ["0.2"]
+    client.close()
@@ -0,0 +1,72 @@
+from leapcell import AsyncLeapcell
+from leapcell.schema import Schema, ValidationError
+from conftest import RESOURCE, TABLE
+from datetime import datetime, timezone
+import asyncio
+import itertools
+import pytest
+
+SCHEMA = Schema({"title": "STR", "views": "INT_NUMBER", "time": "TIME", "tags": "LABELS"})
+
+
+def test_coerce():
+    when = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    record = {"title": "a", "time": when, "tags": ("x",)}
+    assert SCHEMA.coerce([record]) == [{"title": "a", "time": int(when.timestamp()), "tags": ["x"]}]
+    # the input is not modified
+    assert record["time"] is when
+
+    with pytest.raises(ValidationError) as e:
+        SCHEMA.coerce([{"title": 1}, {"other": "x"}])
+    assert e.value.count == 2
+    assert [(row, field) for row, field, _ in e.value.errors] == [(0, "title"), (1, "other")]
+
+
+@pytest.mark.parametrize("field", ["views", "time"])
+@pytest.mark.parametrize("value", [True, False])
+def test_bools_are_not_numbers(field, value):
+    with pytest.raises(ValidationError) as e:
+        SCHEMA.coerce([{field: value}])
+    assert e.value.errors[0][:2] == (0, field)
+    assert Schema({"score": "FLOAT_NUMBER"}).coerce([{"score": 1}]) == [{"score": 1.0}]
+    with pytest.raises(ValidationError):
+        Schema({"score": "FLOAT_NUMBER"}).coerce([{"score": value}])
+
+
+def test_coerce_iter_is_lazy_and_numbers_rows_from_the_start():
+    def records():
+        for i in itertools.count():
+            yield {"title": "t", "views": "bad" if i == 17 else i}
+
+    coerced = SCHEMA.coerce_iter(records(), chunk_size=5)
+    assert [next(coerced)["views"] for _ in range(15)] == list(range(15))
+    with pytest.raises(ValidationError) as e:
+        list(coerced)
+    assert e.value.errors[0][:2] == (17, "views")
+
+
+def invalid_at(row):
+    for i in itertools.count():
+        yield {"title": "new {}".format(i), "views": "bad" if i == row else i}
+
+
+def test_bulk_create_validates_batch_by_batch(server, table):
+    # an endless input, coercing it whole would never return
+    with pytest.raises(ValidationError) as e:
+        table.bulk_create(invalid_at(25), batch_size=10, concurrency=1, validate=True)
+
+    assert e.value.errors[0][:2] == (25, "views")
+    # the first batch was sent, the second is held until its chunk is valid
+    assert len(server.table(RESOURCE, TABLE).records) == 60
+
+
+def test_async_bulk_create_validates_batch_by_batch(server):
+    async def run():
+        async with AsyncLeapcell("test", base_url=server.url) as client:
+            table = client.table(RESOURCE, TABLE)
+            await table.bulk_create(invalid_at(25), batch_size=10, concurrency=1, validate=True)
+
+    with pytest.raises(ValidationError) as e:
+        asyncio.run(run())
+    assert e.value.errors[0][:2] == (25, "views")
+    assert len(server.table(RESOURCE, TABLE).records) == 60
@@ -0,0 +1,75 @@
+from leapcell import Leapcell
+from leapcell.singleflight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import pytest
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(flight.do, "key", fn)
+        started.wait(5)
+        others = [executor.submit(flight.do, "key", fn) for _ in range(3)]
+        while flight.stats()["shared"] < 3:
+            time.sleep(0.001)
+        release.set()
+        assert [f.result() for f in [first] + others] == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"shared": 3, "in_flight": 0}
+
+
+def test_error_is_shared_and_not_kept():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("key", lambda: 1) == 1
+
+
+@pytest.mark.parametrize("coalesce", [True, False])
+def test_identical_reads_share_a_request(server, coalesce):
+    client = Leapcell("test", base_url=server.url, coalesce_reads=coalesce)
+    table = client.table("test/repo", "posts")
+    record_id = next(iter(server.table("test/repo", "posts").records))
+    server.latency = 0.2
+
+    with ThreadPoolExecutor(5) as executor:
+        records = list(executor.map(lambda _: table.get_by_id(record_id), range(5)))
+    assert all(r.id == record_id for r in records)
+    assert (server.requests_by_route["get"] == 1) is coalesce
+    client.close()
+
+
+def test_read_after_a_write_does_not_join_an_earlier_read(server, client, table):
+    started = threading.Event()
+    release = threading.Event()
+    send = table._requster._send
+
+    def slow_first_read(method, url, data=None, files=None, read_only=False, **kwargs):
+        result = send(method, url, data, files, read_only, **kwargs)
+        if read_only and not started.is_set():
+            started.set()
+            release.wait(5)
+        return result
+
+    table._requster._send = slow_first_read
+    with ThreadPoolExecutor(2) as executor:
+        before = executor.submit(table.count)
+        started.wait(5)
+        table.create({"title": "new", "views": 100})
+        after = executor.submit(table.count)
+        # a read that joined the earlier one would wait for it
+        assert after.result(5) == 51
+        release.set()
+        assert before.result(5) == 50
@@ -0,0 +1,77 @@
+from leapcell.exp import LeapcellRequestError
+from leapcell.stream import JSONArrayStream
+import json
+import pytest
+
+DOCUMENT = json.dumps(
+    {
+        "code": 0,
+        "meta": {"records": [1, 2], "note": 'a "quoted" [not an array]'},
+        "data": {
+            "total": 3,
+            "records": [
+                {"title": "héllo ✓", "views": 12345, "tags": ["a", "b"]},
+                {"title": 'es\\caped " , ]', "score": -1.25e3, "nested": {"records": [[]]}},
+                9876543210,
+            ],
+        },
+    },
+    ensure_ascii=False,
+).encode("utf-8")
+EXPECTED = json.loads(DOCUMENT)["data"]["records"]
+
+
+def test_every_split_point():
+    for i in range(len(DOCUMENT) + 1):
+        assert list(JSONArrayStream([DOCUMENT[:i], DOCUMENT[i:]])) == EXPECTED, i
+
+
+def test_one_byte_chunks():
+    chunks = [DOCUMENT[i : i + 1] for i in range(len(DOCUMENT))]
+    assert list(JSONArrayStream(chunks)) == EXPECTED
+
+
+def test_number_cut_by_a_chunk_is_not_truncated():
+    assert list(JSONArrayStream([b'{"data":{"records":[12', b"34]}}"])) == [1234]
+
+
+def test_empty_array():
+    assert list(JSONArrayStream([b'{"data":{"records":', b" [ ] }}"])) == []
+
+
+@pytest.mark.parametrize("split", range(1, 27))
+def test_null_array_is_empty(split):
+    document = b'{"data":{"records" : null,"total":0}}'
+    assert list(JSONArrayStream([document[:split], document[split:]])) == []
+
+
+@pytest.mark.parametrize(
+    "document",
+    [b'{"code":"error","error":"boom"}', b'{"data":{"total":0}}', b'{"data":{"records":0}}', b""],
+)
+def test_missing_array_raises(document):
+    with pytest.raises(KeyError):
+        list(JSONArrayStream([document]))
+
+
+def test_truncated_document_raises():
+    with pytest.raises(ValueError):
+        list(JSONArrayStream([b'{"data":{"records":[{"a":1},{"a"']))
+
+
+def test_stream_matches_query(table):
+    query = table.select().where(table["views"] >= 10).order_by(table["views"].asc())
+    assert [r.id for r in query.stream()] == [r.id for r in query.query()]
+
+
+def test_stream_of_a_response_without_records_raises(server, table, monkeypatch):
+    monkeypatch.setattr(server, "_dispatch", lambda *args: {"total": 0})
+    with pytest.raises(LeapcellRequestError) as e:
+        list(table.select().stream())
+    assert e.value.status == 200
+
+
+def test_stream_of_a_null_result_is_empty(server, table, monkeypatch):
+    monkeypatch.setattr(server, "_dispatch", lambda *args: {"total": 0, "records": None})
+    assert table.select().query() == []
+    assert list(table.select().stream()) == []
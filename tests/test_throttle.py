@@ -0,0 +1,82 @@
+from leapcell import Leapcell
+from leapcell.retry import RetryPolicy
+from leapcell.throttle import AdaptiveConcurrency, TokenBucket
+from conftest import RESOURCE, TABLE
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import pytest
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.reserve() == pytest.approx(0.01, abs=0.002)
+    assert bucket.reserve() == pytest.approx(0.02, abs=0.002)
+    assert bucket.stats()["acquired"] == 7
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_client_rate_is_limited(server):
+    bucket = TokenBucket(rate=50, burst=1)
+    client = Leapcell("test", base_url=server.url, rate_limiter=bucket)
+    table = client.table(RESOURCE, TABLE)
+    start = time.monotonic()
+    for _ in range(10):
+        table.select().count()
+    assert time.monotonic() - start >= 0.17
+    assert client.throttle_stats()["rate"]["acquired"] >= 10
+    client.close()
+
+
+def test_adaptive_limit_grows_and_backs_off():
+    limiter = AdaptiveConcurrency(initial_limit=4, min_limit=2, max_limit=6)
+    for _ in range(40):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 6
+
+    limiter.release(limiter.acquire(), status=429)
+    assert limiter.limit == 4
+    for _ in range(5):
+        time.sleep(0.001)
+        limiter.release(limiter.acquire(), error=True)
+    assert limiter.limit == 2
+
+
+def test_adaptive_limit_bounds_requests_in_flight():
+    limiter = AdaptiveConcurrency(initial_limit=2, min_limit=2, max_limit=2)
+    running = [0, 0]
+    lock = threading.Lock()
+
+    def work(_):
+        started = limiter.acquire()
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        limiter.release(started)
+
+    with ThreadPoolExecutor(6) as executor:
+        list(executor.map(work, range(12)))
+    assert running[1] == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_client_adapts_to_overload(server):
+    limiter = AdaptiveConcurrency(initial_limit=8)
+    client = Leapcell(
+        "test",
+        base_url=server.url,
+        concurrency_limiter=limiter,
+        retry_policy=RetryPolicy(backoff_factor=0),
+    )
+    table = client.table(RESOURCE, TABLE)
+    table.select().count()
+    server.fail_next(1, status=429, route="metrics")
+    table.select().count()
+    assert client.throttle_stats()["concurrency"]["decreases"] >= 1
+    assert limiter.limit < 8
+    client.close()
@@ -0,0 +1,93 @@
+from leapcell import Leapcell
+from leapcell.exp import LeapcellRequestError
+from leapcell.retry import RetryPolicy
+from leapcell.trace import HistogramHook, LatencyHistogram, RequestHook, TIMING_PHASES
+from conftest import RESOURCE, TABLE
+import random
+import pytest
+
+
+class RecordingHook(RequestHook):
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_request(self, trace):
+        self.before.append(trace)
+
+    def after_request(self, trace):
+        self.after.append(trace)
+
+
+@pytest.fixture
+def hooked(server):
+    hook = RecordingHook()
+    client = Leapcell(
+        "test", base_url=server.url, hooks=[hook], retry_policy=RetryPolicy(backoff_factor=0)
+    )
+    yield client.table(RESOURCE, TABLE), hook
+    client.close()
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    rng = random.Random(1)
+    values = [rng.uniform(0.0001, 2.0) for _ in range(10000)]
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for p in (50, 90, 99):
+        expected = values[int(p / 100.0 * len(values)) - 1]
+        assert histogram.percentile(p) == pytest.approx(expected, rel=0.01)
+    assert histogram.snapshot()["count"] == 10000
+
+    exact = LatencyHistogram()
+    for us in range(1, 101):
+        exact.record(us / 1e6)
+    assert exact.percentile(50) == 50 / 1e6
+    assert exact.snapshot()["max_ms"] == 0.1
+
+
+def test_hooks_see_every_request_once(hooked, server):
+    table, hook = hooked
+    record = table.select().order_by(table["views"].asc()).first()
+    server.fail_next(1, status=503, route="get")
+    table.get_by_id(record.id)
+
+    assert len(hook.before) == len(hook.after) == server.requests_by_route.get("meta", 0) + 2
+    trace = hook.after[-1]
+    assert trace.key == "GET /table/{table_id}/record/{record_id}"
+    assert (trace.status, trace.retries, trace.error) == (200, 1, None)
+    assert trace.response_bytes > 0
+    assert set(trace.timings()) == set(TIMING_PHASES) | {"duration"}
+    assert trace.duration >= trace.ttfb > 0
+
+
+def test_failed_and_streamed_requests_are_traced(hooked, server):
+    table, hook = hooked
+    list(table.select().where(table["views"] < 10).stream())
+    assert hook.after[-1].key == "POST /table/{table_id}/record/query"
+    assert hook.after[-1].status == 200 and hook.after[-1].response_bytes > 0
+
+    server.fail_next(1, status=400, route="query")
+    with pytest.raises(LeapcellRequestError):
+        table.select().query()
+    assert hook.after[-1].status == 400
+
+
+def test_histogram_hook_groups_by_endpoint(server):
+    hook = HistogramHook()
+    client = Leapcell("test", base_url=server.url)
+    client.add_hook(hook)
+    table = client.table(RESOURCE, TABLE)
+    for record in table.select().query()[:5]:
+        table.get_by_id(record.id)
+    client.remove_hook(hook)
+    table.select().count()
+
+    snapshot = hook.snapshot()
+    gets = snapshot["GET /table/{table_id}/record/{record_id}"]
+    assert gets["requests"] == 5 and gets["statuses"] == {200: 5}
+    assert gets["duration"]["p50_ms"] > 0
+    assert not any("metrics" in key for key in snapshot)
+    client.close()
@@ -0,0 +1,127 @@
+from leapcell.exp import LeapcellException, LeapcellRequestError
+from leapcell.http_client import FILE_UPLOAD_MAX_SIZE
+from leapcell.upload import MultipartBody, UploadSource, run_uploads, uploaded_files
+from io import BytesIO
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("leapcell.upload.UPLOAD_RETRY_BACKOFF_SECS", 0)
+
+
+def stored(server, file):
+    return server._files[file.id()]
+
+
+def test_multipart_body_length_and_repeat(tmp_path):
+    path = tmp_path / "b.bin"
+    path.write_bytes(b"\x00\x01" * 300000)
+    sent = []
+    body = MultipartBody(
+        [("files", UploadSource(b"a" * 1000, 'we"ird.txt')), ("files", UploadSource(str(path)))],
+        progress=sent.append,
+    )
+    first = b"".join(bytes(chunk) for chunk in body)
+    assert len(first) == body.length == int(body.headers["Content-Length"])
+    assert b"".join(bytes(chunk) for chunk in body) == first
+    assert sent[-1] == 1000 + 600000
+    assert b'filename="we\\"ird.txt"' in first
+
+
+def test_upload_file_from_every_source(server, table, tmp_path):
+    path = tmp_path / "cover.png"
+    path.write_bytes(b"png" * 1000)
+    content = b"jpeg" * 1000
+
+    from_path = table.upload_file(str(path))
+    assert stored(server, from_path) == ("cover.png", b"png" * 1000)
+    assert stored(server, table.upload_file(content, "a.jpg")) == ("a.jpg", content)
+    assert stored(server, table.upload_file(BytesIO(content), "b.jpg"))[1] == content
+    assert stored(server, table.upload_file(memoryview(content)[4:], "c.jpg"))[1] == content[4:]
+    with pytest.raises(TypeError):
+        table.upload_file(12345)
+
+
+def test_upload_files_in_one_request(server, table):
+    files = table.upload_files([b"one", b"two", b"three"])
+    assert [stored(server, f)[1] for f in files] == [b"one", b"two", b"three"]
+    assert server.requests_by_route["upload_multi"] == 1
+
+
+def test_part_content_type_is_guessed_from_the_filename():
+    body = MultipartBody(
+        [("files", UploadSource(b"png", "logo.png")), ("files", UploadSource(b"raw", "blob"))]
+    )
+    content = b"".join(bytes(chunk) for chunk in body)
+    assert b'filename="logo.png"\r\nContent-Type: image/png\r\n' in content
+    assert b'filename="blob"\r\nContent-Type: application/octet-stream\r\n' in content
+
+
+def test_upload_many_keeps_input_order(server, table, tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / "file{}.txt".format(i)
+        path.write_bytes("content {}".format(i).encode() * 100)
+        paths.append(str(path))
+    updates = []
+
+    results = table.upload_many(iter(paths), concurrency=3, progress=updates.append)
+    files = uploaded_files(results)
+    assert [stored(server, f)[0] for f in files] == ["file{}.txt".format(i) for i in range(6)]
+    assert all(r.attempts == 1 and r.sent == r.size for r in results)
+    assert {id(r) for r in updates} == {id(r) for r in results}
+
+
+def test_upload_that_was_not_sent_is_retried():
+    errors = [LeapcellRequestError("connection refused", sent=False)] * 2
+    sent = []
+
+    def send(source, progress):
+        if errors:
+            raise errors.pop()
+        sent.append(source.filename)
+        return source.filename
+
+    results = run_uploads(send, [("a.txt", b"a")], max_retries=2)
+    assert results[0].ok and results[0].attempts == 3
+    assert sent == ["a.txt"]
+
+
+@pytest.mark.parametrize("status", [400, 503, None])
+def test_upload_the_server_may_have_stored_is_not_retried(server, table, status):
+    if status is None:
+        # rejected before anything is sent
+        results = table.upload_many([("big.bin", b"x" * (FILE_UPLOAD_MAX_SIZE + 1))], max_retries=2)
+    else:
+        server.fail_next(3, status=status, route="upload")
+        results = table.upload_many([("only.txt", b"data")], max_retries=2, concurrency=1)
+    assert not results[0].ok
+    assert results[0].attempts == 1
+    with pytest.raises(LeapcellException):
+        uploaded_files(results)
+
+
+def test_identical_content_is_uploaded_once(server, table):
+    table.enable_upload_cache()
+    first = table.upload_file(b"same" * 100, "a.txt")
+    again = table.upload_many([("b.txt", b"same" * 100), ("c.txt", b"other")])
+    assert uploaded_files(again)[0].id() == first.id()
+    assert server.requests_by_route["upload"] == 2
+    assert table.upload_cache_stats()["hits"] == 1
+
+
+def test_upload_cache_on_disk_is_verified(server, client, tmp_path):
+    table = client.table("test/repo", "posts")
+    table.enable_upload_cache(path=str(tmp_path / "cache"))
+    first = table.upload_file(b"kept" * 100)
+    gone = table.upload_file(b"gone" * 100)
+
+    other = client.table("test/repo", "posts")
+    other.enable_upload_cache(path=str(tmp_path / "cache"), verify_on_miss=True)
+    del server._files[gone.id()]
+    assert other.upload_file(b"kept" * 100).id() == first.id()
+    assert other.upload_file(b"gone" * 100).id() != gone.id()
+    stats = other.upload_cache_stats()
+    assert (stats["disk_hits"], stats["verify_failures"]) == (1, 1)
+    assert server.requests_by_route["upload"] == 3
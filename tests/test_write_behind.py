@@ -0,0 +1,91 @@
+from leapcell.retry import DEFAULT_MAX_ATTEMPTS
+import threading
+
+
+def records_by_views(table, count):
+    return list(table.select().order_by(table["views"].asc()).query()[:count])
+
+
+def test_distinct_changes_are_written_concurrently(server, table):
+    buffer = table.enable_write_behind(flush_interval=60, concurrency=4)
+    records = records_by_views(table, 8)
+    sent = []
+    # serial writes would never get two updates past the barrier
+    together = threading.Barrier(4, timeout=5)
+    update_record = table._requster.update_record
+
+    def counting_update(record_id, data):
+        sent.append(record_id)
+        together.wait()
+        return update_record(record_id, data)
+
+    table._requster.update_record = counting_update
+    for record in records:
+        record["views"] = record["views"] + 100
+        record.save()
+    assert buffer.pending() == 8
+
+    table.flush()
+    assert sorted(sent) == sorted(r.id for r in records)
+    assert [table.get_by_id(r.id)["views"] for r in records] == list(range(100, 108))
+    table.disable_write_behind()
+
+
+def test_failed_write_is_requeued_under_newer_changes(server, table):
+    errors = []
+    buffer = table.enable_write_behind(
+        flush_interval=60, on_error=lambda ids, fields, e: errors.append(e)
+    )
+    record = records_by_views(table, 1)[0]
+    record["views"] = 100
+    record["title"] = "changed"
+    record.save()
+
+    # the retry policy gives up on the update
+    server.fail_next(DEFAULT_MAX_ATTEMPTS, status=503, route="update")
+    table.flush()
+    assert errors == []
+    assert buffer.pending() == 1
+
+    record["views"] = 200
+    record.save()
+    table.flush()
+    stored = table.get_by_id(record.id)
+    assert (stored["views"], stored["title"]) == (200, "changed")
+    assert buffer.pending() == 0
+    table.disable_write_behind()
+
+
+def test_write_is_dropped_after_max_retries(server, table):
+    errors = []
+    buffer = table.enable_write_behind(
+        flush_interval=60, max_retries=1, on_error=lambda ids, fields, e: errors.append((ids, e))
+    )
+    record = records_by_views(table, 1)[0]
+    record["views"] = 100
+    record.save()
+
+    server.fail_next(2 * DEFAULT_MAX_ATTEMPTS, status=503, route="update")
+    table.flush()
+    assert errors == [] and buffer.pending() == 1
+    table.flush()
+    assert buffer.pending() == 0
+    assert errors[0][0] == [record.id]
+    assert errors[0][1].status == 503
+    table.disable_write_behind()
+
+
+def test_permanent_error_is_not_requeued(server, table):
+    errors = []
+    buffer = table.enable_write_behind(
+        flush_interval=60, on_error=lambda ids, fields, e: errors.append(e)
+    )
+    record = records_by_views(table, 1)[0]
+    record["views"] = 100
+    record.save()
+
+    server.fail_next(1, status=400, route="update")
+    table.flush()
+    assert buffer.pending() == 0
+    assert errors[0].status == 400
+    table.disable_write_behind()